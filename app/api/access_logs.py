@@ -1,34 +1,101 @@
 """Access logs API endpoints."""
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from pydantic import TypeAdapter, ValidationError
 from datetime import datetime
+import uuid
 
 from ..models import AccessLog, AccessLogCreate, Session
-from ..services import Database
+from ..core.config import settings
+from ..services import AccessLogWriter, Database
+from ..services.access_log_store import normalize_timestamp
 from .auth import get_current_session
+from .dependencies import get_access_log_writer, get_database
+from .export import export_response
 
 router = APIRouter(prefix="/access-logs", tags=["access-logs"])
-database = Database()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+access_log_list_adapter = TypeAdapter(List[AccessLogCreate])
+
+
+def _build_access_log(log_data: AccessLogCreate) -> AccessLog:
+    """Build an access log entry from its creation schema."""
+    return AccessLog(
+        log_id=str(uuid.uuid4()),
+        timestamp=normalize_timestamp(log_data.timestamp) if log_data.timestamp else datetime.now(),
+        user_id=log_data.user_id,
+        room_id=log_data.room_id,
+        access_granted=log_data.access_granted,
+        device_id=log_data.device_id
+    )
+
+
+async def _read_ndjson(request: Request) -> AsyncIterator[Tuple[int, AccessLogCreate]]:
+    """Parse an NDJSON request body line by line while it streams in.
+    
+    Yields every entry with its line number.
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, _parse_ndjson_line(line, line_number)
+    if buffer.strip():
+        yield line_number + 1, _parse_ndjson_line(buffer, line_number + 1)
+
+
+def _parse_ndjson_line(line: bytes, line_number: int) -> AccessLogCreate:
+    """Validate a single NDJSON line."""
+    try:
+        return AccessLogCreate.model_validate_json(line)
+    except ValidationError as e:
+        raise ValueError(f"Invalid entry on line {line_number}: {e}")
+
+
+async def _create_access_logs_ndjson(request: Request, writer: AccessLogWriter) -> Dict[str, Any]:
+    """Commit NDJSON entries in batches, reporting the committed part on errors."""
+    count = 0
+    committed_line = 0  # Every line up to this one has been committed
+    try:
+        batch: List[AccessLog] = []
+        async for line_number, log_data in _read_ndjson(request):
+            batch.append(_build_access_log(log_data))
+            if len(batch) >= writer.max_batch_size:
+                await writer.write(batch)
+                count += len(batch)
+                committed_line = line_number
+                batch = []
+        await writer.write(batch)
+        count += len(batch)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": f"Failed to create access logs: {str(e)}",
+                "committed": count,
+                "committed_through_line": committed_line
+            }
+        )
+    return {"message": "Access logs created successfully", "count": count}
 
 
 @router.post("/", response_model=AccessLog)
 async def create_access_log(
     log_data: AccessLogCreate,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    writer: AccessLogWriter = Depends(get_access_log_writer)
 ):
     """Create a new access log entry."""
     try:
-        import uuid
-        
-        access_log = AccessLog(
-            log_id=str(uuid.uuid4()),
-            timestamp=datetime.now(),
-            user_id=log_data.user_id,
-            room_id=log_data.room_id,
-        )
+        access_log = _build_access_log(log_data)
         
-        database.save_access_log(access_log)
+        await writer.write([access_log])
         return access_log
     except Exception as e:
         raise HTTPException(
@@ -37,9 +104,36 @@ async def create_access_log(
         )
 
 
+@router.post("/batch")
+async def create_access_logs(
+    request: Request,
+    current_session: Session = Depends(get_current_session),
+    writer: AccessLogWriter = Depends(get_access_log_writer)
+):
+    """Create many access log entries from a JSON array or an NDJSON stream.
+    
+    A JSON array is committed as a whole or not at all. NDJSON entries
+    are committed in batches while the body streams in; if a later line
+    is invalid, the error lists how many entries were committed and the
+    line up to which they were read, so the client can resume after it.
+    """
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        return await _create_access_logs_ndjson(request, writer)
+    try:
+        entries = access_log_list_adapter.validate_json(await request.body())
+        await writer.write([_build_access_log(log_data) for log_data in entries])
+        return {"message": "Access logs created successfully", "count": len(entries)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create access logs: {str(e)}"
+        )
+
+
 @router.get("/", response_model=List[AccessLog])
 async def get_access_logs(
     current_session: Session = Depends(get_current_session),
+    database: Database = Depends(get_database),
     user_id: Optional[str] = Query(None, description="Filter by user ID"),
     room_id: Optional[str] = Query(None, description="Filter by room ID"),
     start_date: Optional[datetime] = Query(None, description="Start date filter"),
@@ -48,9 +142,13 @@ async def get_access_logs(
 ):
     """Get access logs with optional filters."""
     try:
-        # Build query based on filters
-        logs = []
-        # Query Logs from the database
+        logs = database.get_access_logs(
+            user_id=user_id,
+            room_id=room_id,
+            limit=limit,
+            start_date=start_date,
+            end_date=end_date
+        )
         
         return logs
     except Exception as e:
@@ -60,16 +158,45 @@ async def get_access_logs(
         )
 
 
+@router.get("/export")
+async def export_access_logs(
+    current_session: Session = Depends(get_current_session),
+    database: Database = Depends(get_database),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv or ndjson"),
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+    user_id: Optional[str] = Query(None, description="Filter by user ID"),
+    room_id: Optional[str] = Query(None, description="Filter by room ID"),
+    start_date: Optional[datetime] = Query(None, description="Start date filter"),
+    end_date: Optional[datetime] = Query(None, description="End date filter")
+):
+    """Stream all matching access logs, oldest first, as CSV or NDJSON.
+    
+    Logs are read from the store in chunks while the response is sent,
+    so memory use does not grow with the size of the export.
+    """
+    chunks = (
+        [log.model_dump() for log in logs]
+        for logs in database.iter_access_logs(
+            user_id=user_id,
+            room_id=room_id,
+            start_date=start_date,
+            end_date=end_date,
+            chunk_size=settings.export_chunk_size
+        )
+    )
+    return export_response(chunks, format, list(AccessLog.model_fields), "access_logs", gzip=gzip)
+
+
 @router.get("/user/{user_id}", response_model=List[AccessLog])
 async def get_user_access_logs(
     user_id: str,
     current_session: Session = Depends(get_current_session),
+    database: Database = Depends(get_database),
     limit: int = Query(50, ge=1, le=500, description="Maximum number of logs to return")
 ):
     """Get access logs for a specific user."""
     try:
-        logs = []
-        # Fetch access logs frmo database
+        logs = database.get_access_logs(user_id=user_id, limit=limit)
         return logs
     except Exception as e:
         raise HTTPException(
@@ -82,12 +209,12 @@ async def get_user_access_logs(
 async def get_room_access_logs(
     room_id: str,
     current_session: Session = Depends(get_current_session),
+    database: Database = Depends(get_database),
     limit: int = Query(50, ge=1, le=500, description="Maximum number of logs to return")
 ):
     """Get access logs for a specific room."""
     try:
-        logs = []
-        # Fetch access logs from the database
+        logs = database.get_access_logs(room_id=room_id, limit=limit)
         
         return logs
     except Exception as e:
@@ -3,18 +3,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from ..core.config import settings
 from ..models import Credentials, Session, Token
 from ..services import SessionManager
+from .dependencies import get_session_manager
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
-session_manager = SessionManager()
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: Credentials):
+async def login(
+    credentials: Credentials,
+    session_manager: SessionManager = Depends(get_session_manager)
+):
     """Authenticate user and create session."""
-    session = session_manager.create_session(credentials)
+    session = await session_manager.create_session(credentials)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,17 +27,19 @@ async def login(credentials: Credentials):
         )
     
     return Token(
-        access_token=session.session_id,
+        access_token=session_manager.issue_token(session),
         token_type="bearer",
-        expires_in=1800  # 30 minutes
+        expires_in=settings.access_token_expire_minutes * 60
     )
 
 
 @router.post("/logout")
-async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session_manager: SessionManager = Depends(get_session_manager)
+):
     """Logout user and invalidate session."""
-    session_id = credentials.credentials
-    success = session_manager.invalidate_session(session_id)
+    success = session_manager.revoke_token(credentials.credentials)
     
     if not success:
         raise HTTPException(
@@ -45,30 +51,35 @@ async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def refresh_token(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session_manager: SessionManager = Depends(get_session_manager)
+):
     """Refresh authentication token."""
-    session_id = credentials.credentials
-    session = session_manager.refresh_session(session_id)
+    refreshed = session_manager.refresh_token(credentials.credentials)
     
-    if not session:
+    if not refreshed:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired session",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    access_token, session = refreshed
     return Token(
-        access_token=session.session_id,
+        access_token=access_token,
         token_type="bearer",
-        expires_in=1800
+        expires_in=settings.access_token_expire_minutes * 60
     )
 
 
 @router.get("/me", response_model=Session)
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session_manager: SessionManager = Depends(get_session_manager)
+):
     """Get current user session information."""
-    session_id = credentials.credentials
-    session = session_manager.validate_session(session_id)
+    session = session_manager.verify_token(credentials.credentials)
     
     if not session:
         raise HTTPException(
@@ -81,10 +92,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 
 
 # Dependency to get current session
-async def get_current_session(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Session:
+async def get_current_session(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session_manager: SessionManager = Depends(get_session_manager)
+) -> Session:
     """Dependency to validate and get current session."""
-    session_id = credentials.credentials
-    session = session_manager.validate_session(session_id)
+    session = session_manager.verify_token(credentials.credentials)
     
     if not session:
         raise HTTPException(
@@ -0,0 +1,56 @@
+"""Dependencies providing the shared services to API endpoints."""
+
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+
+from ..services import (
+    AccessLogWriter,
+    Database,
+    PermissionManager,
+    SessionManager,
+    GatewayCommService,
+    CardUpdateDispatcher,
+    ReportJobQueue,
+    ServiceContainer,
+)
+
+
+def get_services(connection: HTTPConnection) -> ServiceContainer:
+    """Get the service container created in the application lifespan."""
+    # HTTPConnection covers both HTTP requests and WebSocket connections
+    return connection.app.state.services
+
+
+def get_database(services: ServiceContainer = Depends(get_services)) -> Database:
+    """Get the shared database."""
+    return services.database
+
+
+def get_access_log_writer(services: ServiceContainer = Depends(get_services)) -> AccessLogWriter:
+    """Get the shared group-committing access log writer."""
+    return services.access_log_writer
+
+
+def get_permission_manager(services: ServiceContainer = Depends(get_services)) -> PermissionManager:
+    """Get the shared permission manager."""
+    return services.permission_manager
+
+
+def get_session_manager(services: ServiceContainer = Depends(get_services)) -> SessionManager:
+    """Get the shared session manager."""
+    return services.session_manager
+
+
+def get_gateway_service(services: ServiceContainer = Depends(get_services)) -> GatewayCommService:
+    """Get the shared gateway communication service."""
+    return services.gateway_service
+
+
+def get_card_dispatcher(services: ServiceContainer = Depends(get_services)) -> CardUpdateDispatcher:
+    """Get the shared card update dispatcher."""
+    return services.card_dispatcher
+
+
+def get_report_jobs(services: ServiceContainer = Depends(get_services)) -> ReportJobQueue:
+    """Get the shared report job queue."""
+    return services.report_jobs
@@ -0,0 +1,30 @@
+"""Streaming export responses shared by the API endpoints."""
+
+from typing import Any, Dict, Iterable, List, Sequence
+from fastapi.responses import StreamingResponse
+
+from ..services.export import EXPORT_MEDIA_TYPES, encode_rows, gzip_chunks
+
+
+def export_response(chunks: Iterable[List[Dict[str, Any]]],
+                    export_format: str,
+                    fields: Sequence[str],
+                    filename: str,
+                    gzip: bool = False) -> StreamingResponse:
+    """Stream chunks of rows as a CSV or NDJSON download, optionally gzipped.
+
+    Synchronous chunk iterators are consumed in a worker thread by
+    StreamingResponse, so reading and encoding never block the event loop.
+    """
+    content = encode_rows(chunks, export_format, fields)
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+    filename = f"{filename}.{export_format}"
+    if gzip:
+        content = gzip_chunks(content)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,20 +1,31 @@
 """Gateway management API endpoints."""
 
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, WebSocket, WebSocketDisconnect
+import asyncio
+import json
 
-from ..models import Gateway, DeviceStatus, Session
-from ..services import GatewayCommService
+from ..models import Gateway, DeviceStatus, Session, BulkCardUpdate, CardUpdateResult
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..services import AccessLogWriter, GatewayCommService, CardUpdateDispatcher, SessionManager
 from .auth import get_current_session
+from .dependencies import (
+    get_access_log_writer,
+    get_gateway_service,
+    get_card_dispatcher,
+    get_session_manager,
+)
 
 router = APIRouter(prefix="/gateways", tags=["gateways"])
-gateway_service = GatewayCommService()
+logger = get_logger(__name__)
 
 
 @router.post("/", response_model=Gateway)
 async def register_gateway(
     gateway_data: Dict[str, Any],
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
 ):
     """Register a new gateway."""
     try:
@@ -26,10 +37,12 @@ async def register_gateway(
             location=gateway_data["location"],
             is_online=True,
             last_heartbeat=datetime.now(),
-            ip_address=gateway_data.get("ip_address")
+            ip_address=gateway_data.get("ip_address"),
+            port=gateway_data.get("port"),
+            rooms=gateway_data.get("rooms", [])
         )
         
-        gateway_service.register_gateway(gateway)
+        await gateway_service.register_gateway(gateway)
         return gateway
     except Exception as e:
         raise HTTPException(
@@ -38,9 +51,26 @@ async def register_gateway(
         )
 
 
+@router.post("/card-updates", response_model=List[CardUpdateResult])
+async def send_bulk_card_updates(
+    bulk_update: BulkCardUpdate,
+    current_session: Session = Depends(get_current_session),
+    card_dispatcher: CardUpdateDispatcher = Depends(get_card_dispatcher)
+):
+    """Send many cards (by user ID or as hex card data) to the gateways serving their rooms."""
+    try:
+        return await card_dispatcher.send_bulk(bulk_update.items)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to send card updates: {str(e)}"
+        )
+
+
 @router.get("/", response_model=List[Gateway])
 async def get_gateways(
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
 ):
     """Get all registered gateways."""
     return list(gateway_service.gateway_connections.values())
@@ -49,7 +79,8 @@ async def get_gateways(
 @router.get("/{gateway_id}", response_model=Gateway)
 async def get_gateway(
     gateway_id: str,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
 ):
     """Get a specific gateway."""
     gateway = gateway_service.gateway_connections.get(gateway_id)
@@ -64,7 +95,8 @@ async def get_gateway(
 @router.delete("/{gateway_id}")
 async def unregister_gateway(
     gateway_id: str,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
 ):
     """Unregister a gateway."""
     if gateway_id not in gateway_service.gateway_connections:
@@ -73,15 +105,49 @@ async def unregister_gateway(
             detail="Gateway not found"
         )
     
-    gateway_service.unregister_gateway(gateway_id)
+    await gateway_service.unregister_gateway(gateway_id)
     return {"message": f"Gateway {gateway_id} unregistered successfully"}
 
 
+@router.get("/{gateway_id}/devices", response_model=List[DeviceStatus])
+async def get_gateway_devices(
+    gateway_id: str,
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
+):
+    """Get the latest status of the devices behind a gateway."""
+    if gateway_id not in gateway_service.gateway_connections:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gateway not found"
+        )
+    
+    return gateway_service.devices.get_gateway_devices(gateway_id)
+
+
+@router.post("/{gateway_id}/heartbeat")
+async def receive_heartbeat(
+    gateway_id: str,
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
+):
+    """Receive a heartbeat from a gateway."""
+    if gateway_id not in gateway_service.gateway_connections:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gateway not found"
+        )
+    
+    gateway_service.record_heartbeat(gateway_id)
+    return {"message": "Heartbeat received successfully"}
+
+
 @router.post("/{gateway_id}/sync")
 async def sync_gateway(
     gateway_id: str,
     background_tasks: BackgroundTasks,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
 ):
     """Synchronize with a specific gateway."""
     if gateway_id not in gateway_service.gateway_connections:
@@ -90,10 +156,9 @@ async def sync_gateway(
             detail="Gateway not found"
         )
     
-    # Direct call since it's no longer async
-    success = gateway_service.sync_with_gateway(gateway_id)
-    if success:
-        return {"message": f"Sync initiated for gateway {gateway_id}"}
+    result = await gateway_service.sync_with_gateway(gateway_id)
+    if result is not None:
+        return {"message": f"Gateway {gateway_id} synchronized", "sync": result}
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -106,7 +171,8 @@ async def send_card_update(
     gateway_id: str,
     card_data: Dict[str, str],
     background_tasks: BackgroundTasks,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
 ):
     """Send card update to a specific gateway."""
     if gateway_id not in gateway_service.gateway_connections:
@@ -114,12 +180,18 @@ async def send_card_update(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Gateway not found"
         )
+    if not gateway_service.is_reachable(gateway_id):
+        # Waiting for the connection would hold the request for up to the gateway timeout;
+        # the gateway gets its cards through delta sync once it reconnects
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Gateway is not connected"
+        )
     
     try:
         # Convert hex string back to bytes
         card_bytes = bytes.fromhex(card_data["card_data"])
-        # Direct call since it's no longer async
-        success = gateway_service.send_card_update(gateway_id, card_bytes)
+        success = await gateway_service.send_card_update(gateway_id, card_bytes)
         if success:
             return {"message": f"Card update sent to gateway {gateway_id}"}
         else:
@@ -139,7 +211,9 @@ async def receive_access_log(
     gateway_id: str,
     access_log_data: Dict[str, Any],
     background_tasks: BackgroundTasks,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service),
+    writer: AccessLogWriter = Depends(get_access_log_writer)
 ):
     """Receive access log from gateway."""
     if gateway_id not in gateway_service.gateway_connections:
@@ -149,8 +223,9 @@ async def receive_access_log(
         )
     
     try:
-        # Direct call since it's no longer async
+        gateway_service.record_heartbeat(gateway_id)
         access_log = gateway_service.receive_access_log(access_log_data)
+        await writer.write([access_log])
         return {"message": "Access log received successfully", "log": access_log}
     except Exception as e:
         raise HTTPException(
@@ -164,7 +239,8 @@ async def receive_device_status(
     gateway_id: str,
     status_data: Dict[str, Any],
     background_tasks: BackgroundTasks,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    gateway_service: GatewayCommService = Depends(get_gateway_service)
 ):
     """Receive device status from gateway."""
     if gateway_id not in gateway_service.gateway_connections:
@@ -174,11 +250,148 @@ async def receive_device_status(
         )
     
     try:
-        # Direct call since it's no longer async
-        device_status = gateway_service.receive_device_status(status_data)
+        gateway_service.record_heartbeat(gateway_id)
+        device_status = gateway_service.receive_device_status(status_data, gateway_id)
         return {"message": "Device status received successfully", "status": device_status}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to process device status: {str(e)}"
         )
+
+
+@router.websocket("/{gateway_id}/ws")
+async def gateway_telemetry(
+    websocket: WebSocket,
+    gateway_id: str,
+    token: Optional[str] = None,
+    session_manager: SessionManager = Depends(get_session_manager),
+    gateway_service: GatewayCommService = Depends(get_gateway_service),
+    writer: AccessLogWriter = Depends(get_access_log_writer)
+):
+    """Receive batched access logs and device statuses from a gateway.
+    
+    Authenticate with a ``token`` query parameter or a bearer Authorization
+    header. Every frame is a JSON object ``{"seq": n, "access_logs": [...],
+    "device_status": [...]}`` and is acknowledged in order with
+    ``{"type": "ack", "seq": n, "accepted": count, "access_logs_accepted": count,
+    "device_status_accepted": count, "errors": [...]}`` once its access logs
+    are stored. Device statuses are applied on receipt, so if storing the
+    access logs fails only ``access_logs_accepted`` drops to 0 and the
+    gateway resends just the access logs. Up to ``gateway_ingest_window`` frames are
+    processed at a time; beyond that, frames are not read until earlier
+    ones are acknowledged.
+    """
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    if token is None or session_manager.verify_token(token) is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid or expired token")
+        return
+    if gateway_id not in gateway_service.gateway_connections:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Gateway not found")
+        return
+    
+    await websocket.accept()
+    # Frames whose access logs are being stored, in arrival order
+    in_flight: asyncio.Queue = asyncio.Queue(maxsize=settings.gateway_ingest_window)
+    acknowledger = asyncio.create_task(_acknowledge_telemetry(websocket, in_flight, gateway_id))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = _ingest_telemetry_frame(
+                message.get("text") or message.get("bytes"), gateway_id, gateway_service, writer
+            )
+            if not await _queue_frame(in_flight, frame, acknowledger):
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        acknowledger.cancel()
+
+
+async def _queue_frame(in_flight: asyncio.Queue, frame: Dict[str, Any], acknowledger: asyncio.Task) -> bool:
+    """Queue a frame for acknowledgement; False if the acknowledger has stopped.
+    
+    A full window is waited on together with the acknowledger, so a
+    failed acknowledger does not leave the connection blocked.
+    """
+    if acknowledger.done():
+        return False
+    if not in_flight.full():
+        in_flight.put_nowait(frame)
+        return True
+    put = asyncio.ensure_future(in_flight.put(frame))
+    await asyncio.wait({put, acknowledger}, return_when=asyncio.FIRST_COMPLETED)
+    if not put.done():
+        put.cancel()
+        return False
+    return True
+
+
+def _ingest_telemetry_frame(
+    frame: Any,
+    gateway_id: str,
+    gateway_service: GatewayCommService,
+    writer: AccessLogWriter
+) -> Dict[str, Any]:
+    """Parse a telemetry frame and start storing its access logs without waiting."""
+    try:
+        batch = json.loads(frame)
+        if not isinstance(batch, dict):
+            raise ValueError("Frame must be a JSON object")
+    except (TypeError, ValueError) as e:
+        return {
+            "seq": None, "write": None, "access_logs_accepted": 0, "device_status_accepted": 0,
+            "errors": [{"error": f"Invalid frame: {str(e)}"}]
+        }
+    
+    access_logs, device_statuses, errors = gateway_service.receive_telemetry(gateway_id, batch)
+    # Concurrent frames share the writer's group commits
+    write = asyncio.ensure_future(writer.write(access_logs)) if access_logs else None
+    return {
+        "seq": batch.get("seq"),
+        "write": write,
+        "access_logs_accepted": len(access_logs),
+        "device_status_accepted": len(device_statuses),
+        "errors": errors
+    }
+
+
+async def _acknowledge_telemetry(websocket: WebSocket, in_flight: asyncio.Queue, gateway_id: str) -> None:
+    """Acknowledge telemetry frames in order once their access logs are stored.
+    
+    If an acknowledgement cannot be sent, the socket is closed, which
+    also ends the receive loop.
+    """
+    while True:
+        frame = await in_flight.get()
+        access_logs_accepted, errors = frame["access_logs_accepted"], frame["errors"]
+        if frame["write"] is not None:
+            try:
+                await frame["write"]
+            except Exception as e:
+                # The device statuses of the frame were applied regardless
+                access_logs_accepted = 0
+                errors = errors + [{"kind": "access_logs", "error": f"Failed to store access logs: {str(e)}"}]
+        try:
+            await websocket.send_json({
+                "type": "ack",
+                "seq": frame["seq"],
+                "accepted": access_logs_accepted + frame["device_status_accepted"],
+                "access_logs_accepted": access_logs_accepted,
+                "device_status_accepted": frame["device_status_accepted"],
+                "errors": errors
+            })
+        except Exception as e:
+            logger.warning("Failed to acknowledge telemetry, closing the connection", extra={
+                "gateway_id": gateway_id,
+                "error": str(e)
+            })
+            try:
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            except Exception:
+                pass  # Already closed
+            return
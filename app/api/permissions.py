@@ -2,19 +2,29 @@
 
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
 
-from ..models import Permission, PermissionCreate, PermissionUpdate, Session
+from ..models import (
+    Permission,
+    PermissionCreate,
+    PermissionUpdate,
+    AccessCheck,
+    AccessDecision,
+    Session,
+)
+from ..core.config import settings
 from ..services import PermissionManager
 from .auth import get_current_session
+from .dependencies import get_permission_manager
 
 router = APIRouter(prefix="/permissions", tags=["permissions"])
-permission_manager = PermissionManager()
 
 
 @router.post("/", response_model=Permission)
 async def create_permission(
     permission_data: PermissionCreate,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
 ):
     """Create a new permission."""
     try:
@@ -34,7 +44,8 @@ async def create_permission(
 @router.get("/user/{user_id}", response_model=List[Permission])
 async def get_user_permissions(
     user_id: str,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
 ):
     """Get all permissions for a specific user."""
     try:
@@ -52,7 +63,8 @@ async def update_permission(
     user_id: str,
     room_id: str,
     permission_data: PermissionUpdate,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
 ):
     """Update an existing permission."""
     try:
@@ -73,7 +85,8 @@ async def update_permission(
 async def revoke_permission(
     user_id: str,
     room_id: str,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
 ):
     """Revoke a user's permission for a specific room."""
     try:
@@ -89,7 +102,8 @@ async def revoke_permission(
 @router.post("/generate-card/{user_id}")
 async def generate_card_data(
     user_id: str,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
 ):
     """Generate card data for a user."""
     try:
@@ -97,6 +111,7 @@ async def generate_card_data(
         return {
             "user_id": user_id,
             "card_data": card_data.hex(),  # Return as hex string
+            "format": settings.card_format,
             "message": "Card data generated successfully"
         }
     except Exception as e:
@@ -104,3 +119,76 @@ async def generate_card_data(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to generate card data: {str(e)}"
         )
+
+
+@router.get("/card-size/{user_id}")
+async def get_card_size_report(
+    user_id: str,
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
+):
+    """Compare the size of a user's card in the JSON and binary encodings."""
+    try:
+        return {
+            "user_id": user_id,
+            **permission_manager.get_card_size_report(user_id)
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to build card size report: {str(e)}"
+        )
+
+
+@router.post("/check", response_model=AccessDecision)
+async def check_access(
+    access_check: AccessCheck,
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
+):
+    """Check whether a user may open a room at a given time (default: now)."""
+    try:
+        timestamp = access_check.timestamp or datetime.now()
+        return AccessDecision(
+            user_id=access_check.user_id,
+            room_id=access_check.room_id,
+            timestamp=timestamp,
+            access_granted=permission_manager.check_access(
+                access_check.user_id, access_check.room_id, timestamp
+            )
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to check access: {str(e)}"
+        )
+
+
+@router.post("/check/batch", response_model=List[AccessDecision])
+async def check_access_batch(
+    access_checks: List[AccessCheck],
+    current_session: Session = Depends(get_current_session),
+    permission_manager: PermissionManager = Depends(get_permission_manager)
+):
+    """Check many (user, room, timestamp) combinations in one call."""
+    try:
+        now = datetime.now()
+        checks = [
+            (check.user_id, check.room_id, check.timestamp or now)
+            for check in access_checks
+        ]
+        results = permission_manager.check_access_batch(checks)
+        return [
+            AccessDecision(
+                user_id=user_id,
+                room_id=room_id,
+                timestamp=timestamp,
+                access_granted=granted
+            )
+            for (user_id, room_id, timestamp), granted in zip(checks, results)
+        ]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to check access: {str(e)}"
+        )
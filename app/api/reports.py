@@ -1,41 +1,34 @@
 """Reports API endpoints."""
 
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
-from datetime import datetime
-
-from ..models import Report, ReportRequest, ReportType, Session
-from ..services import Database
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from ..core.config import settings
+from ..models import ReportJob, ReportJobStatus, ReportRequest, ReportType, Session
+from ..services import ReportJobQueue
+from ..services.export import EXPORT_MEDIA_TYPES
+from ..services.report_generator import report_rows
 from .auth import get_current_session
+from .dependencies import get_report_jobs
+from .export import export_response
 
 router = APIRouter(prefix="/reports", tags=["reports"])
-database = Database()
 
 
-@router.post("/", response_model=Report)
+@router.post("/", response_model=ReportJob, status_code=status.HTTP_202_ACCEPTED)
 async def generate_report(
     report_request: ReportRequest,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    report_jobs: ReportJobQueue = Depends(get_report_jobs)
 ):
-    """Generate a new report."""
+    """Submit a report for generation.
+    
+    Returns the job at once; poll ``GET /reports/{job_id}`` for the report.
+    Reports whose data has not changed since an identical request are
+    returned completed.
+    """
     try:
-        import uuid
-        
-        # Generate report data based on type
-        report_data = await _generate_report_data(report_request.report_type, report_request.parameters)
-        
-        report = Report(
-            report_id=str(uuid.uuid4()),
-            report_type=report_request.report_type,
-            title=report_request.title,
-            generated_at=datetime.now(),
-            generated_by=current_session.user_id,
-            parameters=report_request.parameters,
-            data=report_data,
-            format=report_request.format
-        )
-        
-        return report
+        return report_jobs.submit(report_request, current_session.user_id)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -74,104 +67,54 @@ async def get_report_types(
     }
 
 
-async def _generate_report_data(report_type: ReportType, parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate report data based on type and parameters."""
-    
-    if report_type == ReportType.ACCESS_SUMMARY:
-        return await _generate_access_summary_report(parameters)
-    elif report_type == ReportType.PERMISSION_AUDIT:
-        return await _generate_permission_audit_report(parameters)
-    elif report_type == ReportType.DEVICE_STATUS:
-        return await _generate_device_status_report(parameters)
-    elif report_type == ReportType.SECURITY_INCIDENTS:
-        return await _generate_security_incidents_report(parameters)
-    else:
-        raise ValueError(f"Unsupported report type: {report_type}")
-
-
-async def _generate_access_summary_report(parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate access summary report."""
-    start_date = parameters.get("start_date")
-    end_date = parameters.get("end_date")
-    
-    room_stats = []
-    # Fetch room statistics from the DB
-    
-    return {
-        "summary": {
-            "period": {"start": start_date, "end": end_date},
-            "total_rooms": len(room_stats),
-            "room_statistics": room_stats
-        }
-    }
-
-
-async def _generate_permission_audit_report(parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate permission audit report."""
-    user_id = parameters.get("user_id")
-    
-    # Build example SQL query
-    query = """
-        SELECT 
-            p.user_id,
-            u.username,
-            u.full_name,
-            p.room_id,
-            p.is_active,
-            p.created_at
-        FROM permissions p
-        JOIN users u ON p.user_id = u.user_id
-    """
-    
-    query_params = []
-    if user_id:
-        query += " WHERE p.user_id = ?"
-        query_params.append(user_id)
-    
-    query += " ORDER BY p.user_id, p.room_id"
-    
-    permissions = []
-   
-    # Send query to database to fetch permission report
-    
-    return {
-        "audit": {
-            "permissions": permissions,
-            "total_permissions": len(permissions),
-            "active_permissions": len([p for p in permissions if p["is_active"]])
-        }
-    }
-
-
-async def _generate_device_status_report(parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate device status report."""
-    # This would typically query gateway and device status
-    # For now, return mock data
-    return {
-        "devices": {
-            "total_gateways": 0,
-            "online_gateways": 0,
-            "offline_gateways": 0,
-            "total_devices": 0,
-            "active_devices": 0,
-            "low_battery_devices": 0
-        }
-    }
+@router.get("/{job_id}", response_model=ReportJob)
+async def get_report(
+    job_id: str,
+    current_session: Session = Depends(get_current_session),
+    report_jobs: ReportJobQueue = Depends(get_report_jobs)
+):
+    """Get a report job, including the report once it is completed."""
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not found"
+        )
+    return job
 
 
-async def _generate_security_incidents_report(parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate security incidents report."""
-    start_date = parameters.get("start_date")
-    end_date = parameters.get("end_date")
-    
-    # Build SQL query and fetch access log records where access was not granted
+@router.get("/{job_id}/export")
+async def export_report(
+    job_id: str,
+    current_session: Session = Depends(get_current_session),
+    report_jobs: ReportJobQueue = Depends(get_report_jobs),
+    format: Optional[str] = Query(None, description="csv or ndjson (default: the requested report format if exportable, else csv)"),
+    gzip: bool = Query(False, description="Compress the export with gzip")
+):
+    """Stream the rows of a completed report as CSV or NDJSON."""
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not found"
+        )
+    if job.status != ReportJobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report is not completed (status: {job.status.value})"
+        )
     
-    incidents = []
+    export_format = format
+    if export_format is None:
+        # Reports are requested as JSON by default, which exports as CSV
+        export_format = job.report.format if job.report.format in EXPORT_MEDIA_TYPES else "csv"
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format: {export_format}"
+        )
     
-    return {
-        "security_incidents": {
-            "period": {"start": start_date, "end": end_date},
-            "total_incidents": len(incidents),
-            "incidents": incidents
-        }
-    }
+    fields, rows = report_rows(job.report.report_type, job.report.data)
+    chunk_size = settings.export_chunk_size
+    chunks = (rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size))
+    return export_response(chunks, export_format, fields, f"report_{job_id}", gzip=gzip)
@@ -4,25 +4,32 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from ..models import User, UserCreate, UserUpdate, Session
-from ..services import Database
+from ..services import Database, SessionManager
 from .auth import get_current_session
+from .dependencies import get_database, get_session_manager
 
 router = APIRouter(prefix="/users", tags=["users"])
-database = Database()
 
 
 @router.post("/", response_model=User)
 async def create_user(
     user_data: UserCreate,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    database: Database = Depends(get_database),
+    session_manager: SessionManager = Depends(get_session_manager)
 ):
     """Create a new user."""
     try:
         import uuid
         from datetime import datetime
         
+        for login in (user_data.username, user_data.email):
+            if login and database.get_user_by_login(login):
+                raise ValueError(f"User {login} already exists")
+        
         user = User(
             user_id=str(uuid.uuid4()),
+            username=user_data.username,
             email=user_data.email,
             full_name=user_data.full_name,
             is_active=True,
@@ -30,6 +37,7 @@ async def create_user(
         )
         
         database.save_user(user)
+        await session_manager.set_password(user.user_id, user_data.password)
         return user
     except Exception as e:
         raise HTTPException(
@@ -41,7 +49,8 @@ async def create_user(
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: str,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    database: Database = Depends(get_database)
 ):
     """Get a user by ID."""
     user = database.get_user_by_id(user_id)
@@ -57,7 +66,8 @@ async def get_user(
 async def update_user(
     user_id: str,
     user_data: UserUpdate,
-    current_session: Session = Depends(get_current_session)
+    current_session: Session = Depends(get_current_session),
+    database: Database = Depends(get_database)
 ):
     """Update user information."""
     user = database.get_user_by_id(user_id)
@@ -67,7 +77,19 @@ async def update_user(
             detail="User not found"
         )
     
+    # Usernames and emails are logins, so they must stay unique
+    for login in (user_data.username, user_data.email):
+        if login:
+            existing = database.get_user_by_login(login)
+            if existing and existing.user_id != user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Failed to update user: User {login} already exists"
+                )
+    
     # Update user fields
+    if user_data.username is not None:
+        user.username = user_data.username
     if user_data.email is not None:
         user.email = user_data.email
     if user_data.full_name is not None:
@@ -1,5 +1,6 @@
 """Core configuration and settings."""
 
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 
@@ -8,13 +9,53 @@ class Settings(BaseSettings):
     """
     debug: bool = False
     
+    log_level: str = "INFO"
+    log_format: str = "json"  # json, text
+    # Fraction of high-rate events that are logged
+    log_sample_rates: Dict[str, float] = {
+        "access_log.received": 0.01,
+        "device_status.received": 0.01,
+    }
+    
     secret_key: str = "prototype-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    session_sweep_interval_seconds: int = 30
+    session_sweep_batch_size: int = 1000
+    password_hash_iterations: int = 100_000
     
     gateway_timeout: int = 30
+    gateway_port: int = 7000
+    gateway_keepalive_interval: int = 10
+    gateway_ingest_window: int = 8  # Unacknowledged telemetry frames per WebSocket
+    device_active_timeout: int = 300  # Seconds without status until a device counts as inactive
+    device_low_battery_percent: int = 20
     max_retry_attempts: int = 3
     
+    database_backend: str = "memory"  # memory, sqlite
+    database_url: str = "sqlite:///./smart_lock.db"
+    database_pool_size: int = 5
+    
+    access_log_batch_size: int = 500
+    access_log_batch_delay_ms: int = 10
+    
+    permission_cache_max_empty_users: int = 10_000  # Cached users found without permissions
+    access_engine_max_denied_pairs: int = 100_000  # Cached (user, room) pairs without a permission
+    
+    card_cache_max_bytes: int = 16 * 1024 * 1024
+    card_format: str = "json"  # json, binary (opt-in compact encoding)
+    
+    card_update_concurrency: int = 10
+    card_update_delay_ms: int = 50
+    card_batch_size: int = 100  # Cards per gateway message in bulk updates
+    card_change_history: int = 100_000  # Permission changes retained for delta syncs
+    card_digest_cache_size: int = 64  # Card digests of gateway room sets kept between syncs
+    
+    report_workers: int = 2  # Threads generating reports
+    report_cache_size: int = 128  # Generated reports kept for identical requests
+    report_job_history: int = 1000  # Finished report jobs kept for lookup
+    export_chunk_size: int = 1000  # Rows read from the database per chunk of a streamed export
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,132 @@
+"""Structured, non-blocking logging.
+
+Log calls only put records on a queue; a background thread formats and
+writes them, so slow stdout never stalls the event loop. Records are
+rendered as one JSON object (or ``key=value`` text) per line, including
+the fields passed via ``extra`` and, for ``logger.exception``, the
+traceback as a separate ``exception`` field. Message arguments are
+formatted on the writer thread too, so pass values that are not mutated
+after the call.
+
+High-rate events are sampled: a record logged with ``extra={"event": name}``
+is kept once every ``1 / rate`` occurrences when ``name`` has a rate in
+``settings.log_sample_rates``.
+"""
+
+from typing import Dict, Optional
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+
+from .config import settings
+
+
+LOGGER_NAME = "app"
+
+# Attributes of every LogRecord; everything else was passed via ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Get the logger of an application module (pass ``__name__``)."""
+    return logging.getLogger(name)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in every ``1 / rate`` records of each sampled event."""
+
+    def __init__(self, sample_rates: Dict[str, float]):
+        super().__init__()
+        self.intervals = {
+            event: max(1, round(1 / rate)) if rate > 0 else 0
+            for event, rate in sample_rates.items()
+        }
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        interval = self.intervals.get(event)
+        if interval is None:
+            return True
+        if interval == 0:
+            return False
+        with self._lock:
+            count = self.counters.get(event, 0)
+            self.counters[event] = count + 1
+        if count % interval:
+            return False
+        record.sample_rate = 1 / interval
+        return True
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted, leaving all formatting to the writer thread.
+
+    The stdlib QueueHandler formats the message and drops ``exc_info`` on
+    the calling thread so records can be pickled; records here never leave
+    the process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records with their extra fields as JSON or ``key=value`` text."""
+
+    def __init__(self, json_output: bool = True):
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                fields[key] = value
+        if record.exc_info:
+            fields["exception"] = self.formatException(record.exc_info)
+
+        if self.json_output:
+            return json.dumps(fields, default=str)
+        return " ".join(f"{key}={value}" for key, value in fields.items())
+
+
+def setup_logging() -> None:
+    """Route application logs through a queue to a background writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(json_output=settings.log_format == "json"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = RecordQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.log_sample_rates))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [queue_handler]
+    logger.setLevel(settings.log_level.upper())
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Write all queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,17 +1,28 @@
 """Data models for the smart lock system."""
 
-from .permission import Permission, TimeSlot, PermissionCreate, PermissionUpdate
+from .permission import (
+    Permission,
+    TimeSlot,
+    PermissionCreate,
+    PermissionUpdate,
+    AccessCheck,
+    AccessDecision,
+    PermissionChange,
+)
 from .access_log import AccessLog, AccessLogCreate
 from .user import User, UserCreate, UserUpdate
-from .gateway import Gateway, DeviceStatus
+from .gateway import Gateway, DeviceStatus, CardUpdateItem, BulkCardUpdate, CardUpdateResult
 from .session import Session, Credentials, Token
-from .report import Report, ReportRequest, ReportType
+from .report import Report, ReportRequest, ReportType, ReportJob, ReportJobStatus
 
 __all__ = [
     "Permission",
     "TimeSlot",
     "PermissionCreate",
     "PermissionUpdate",
+    "AccessCheck",
+    "AccessDecision",
+    "PermissionChange",
     "AccessLog",
     "AccessLogCreate",
     "User",
@@ -19,10 +30,15 @@ __all__ = [
     "UserUpdate",
     "Gateway",
     "DeviceStatus",
+    "CardUpdateItem",
+    "BulkCardUpdate",
+    "CardUpdateResult",
     "Session",
     "Credentials",
     "Token",
     "Report",
     "ReportRequest",
     "ReportType",
+    "ReportJob",
+    "ReportJobStatus",
 ]
@@ -11,6 +11,8 @@ class AccessLog(BaseModel):
     timestamp: datetime
     user_id: str
     room_id: str
+    access_granted: bool = True
+    device_id: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -20,5 +22,6 @@ class AccessLogCreate(BaseModel):
     """Schema for creating a new access log."""
     user_id: str
     room_id: str
+    timestamp: Optional[datetime] = None
     access_granted: bool = True
     device_id: Optional[str] = None
@@ -1,6 +1,6 @@
 """Gateway and Message models."""
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from enum import Enum
@@ -22,13 +22,37 @@ class Gateway(BaseModel):
     is_online: bool = False
     last_heartbeat: Optional[datetime] = None
     ip_address: Optional[str] = None
+    port: Optional[int] = None
+    rooms: List[str] = []  # Rooms whose locks are served by this gateway
     
     class Config:
         from_attributes = True
 
 
+class CardUpdateItem(BaseModel):
+    """One card of a bulk card update: a user's current card or a raw card."""
+    user_id: Optional[str] = None
+    card_data: Optional[str] = None  # Hex-encoded card data
+    gateway_ids: Optional[List[str]] = None  # Default: gateways serving the card's rooms
+
+
+class BulkCardUpdate(BaseModel):
+    """Schema for sending many cards to the responsible gateways."""
+    items: List[CardUpdateItem]
+
+
+class CardUpdateResult(BaseModel):
+    """Delivery result of one item of a bulk card update."""
+    index: int
+    user_id: Optional[str] = None
+    delivered: Dict[str, bool] = {}  # gateway_id -> card delivered
+    error: Optional[str] = None
+
+
 class DeviceStatus(BaseModel):
     """Represents the status of a device."""
     device_id: str
     is_online: bool
     last_heartbeat: datetime
+    gateway_id: Optional[str] = None
+    battery_level: Optional[int] = None  # Percent
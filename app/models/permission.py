@@ -2,7 +2,7 @@
 
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import time
+from datetime import datetime, time
 
 
 class TimeSlot(BaseModel):
@@ -35,3 +35,29 @@ class PermissionCreate(BaseModel):
 class PermissionUpdate(BaseModel):
     """Schema for updating an existing permission."""
     time_slots: List[TimeSlot]
+
+
+class PermissionChange(BaseModel):
+    """An entry of the permission change journal."""
+    change_id: Optional[int] = None
+    timestamp: datetime
+    action: str  # granted, updated, revoked
+    user_id: str
+    room_id: str
+    permission_id: Optional[str] = None
+    time_slots: List[TimeSlot] = []  # Time slots after the change
+
+
+class AccessCheck(BaseModel):
+    """Schema for asking whether a user may open a room."""
+    user_id: str
+    room_id: str
+    timestamp: Optional[datetime] = None
+
+
+class AccessDecision(BaseModel):
+    """Result of an access check."""
+    user_id: str
+    room_id: str
+    timestamp: datetime
+    access_granted: bool
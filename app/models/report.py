@@ -35,3 +35,23 @@ class ReportRequest(BaseModel):
     title: str
     parameters: Dict[str, Any]
     format: str = "json"
+
+
+class ReportJobStatus(str, Enum):
+    """States of a report generation job."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ReportJob(BaseModel):
+    """A submitted report; carries the report once generated."""
+    job_id: str
+    report_type: ReportType
+    status: ReportJobStatus = ReportJobStatus.PENDING
+    submitted_at: datetime
+    completed_at: Optional[datetime] = None
+    cached: bool = False  # Served from the result cache without generating
+    report: Optional[Report] = None
+    error: Optional[str] = None
@@ -16,6 +16,7 @@ class UserRole(Enum):
 class User(BaseModel):
     """Represents a user in the system."""
     user_id: Optional[str] = None
+    username: Optional[str] = None
     email: EmailStr
     full_name: str
     role: UserRole = UserRole.STUDENT
@@ -28,6 +29,7 @@ class User(BaseModel):
 
 class UserCreate(BaseModel):
     """Schema for creating a new user."""
+    username: Optional[str] = None
     email: EmailStr
     full_name: str
     password: str
@@ -35,6 +37,7 @@ class UserCreate(BaseModel):
 
 class UserUpdate(BaseModel):
     """Schema for updating user information."""
+    username: Optional[str] = None
     email: Optional[EmailStr] = None
     full_name: Optional[str] = None
     is_active: Optional[bool] = None
@@ -1,16 +1,43 @@
 """Service layer modules."""
 
+from .access_log_store import AccessLogStore
 from .database import Database
+from .access_log_writer import AccessLogWriter
+from .sqlite_database import SQLiteDatabase
+from .access_decision import AccessDecisionEngine, AccessSchedule
+from .permission_cache import ActivePermissionCache
+from .card_cache import CardCache
 from .permission_manager import PermissionManager
+from .gateway_liveness import GatewayLivenessMonitor
+from .device_registry import DeviceRegistry
 from .gateway_comm_service import GatewayCommService
+from .token_service import TokenService
 from .session_manager import SessionManager
 from .webinterface import WebInterface, WebServer
+from .card_dispatcher import CardUpdateDispatcher
+from .report_generator import ReportGenerator
+from .report_jobs import ReportJobQueue
+from .container import ServiceContainer
 
 __all__ = [
+    "AccessLogStore",
     "Database",
-    "PermissionManager", 
+    "AccessLogWriter",
+    "SQLiteDatabase",
+    "AccessDecisionEngine",
+    "AccessSchedule",
+    "ActivePermissionCache",
+    "CardCache",
+    "PermissionManager",
+    "GatewayLivenessMonitor",
+    "DeviceRegistry",
     "GatewayCommService",
+    "TokenService",
     "SessionManager",
     "WebInterface",
     "WebServer",
+    "CardUpdateDispatcher",
+    "ReportGenerator",
+    "ReportJobQueue",
+    "ServiceContainer",
 ]
@@ -0,0 +1,121 @@
+"""Access decision engine evaluating compiled permission time slots."""
+
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, time
+
+from ..models import Permission, TimeSlot
+
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+SECONDS_PER_DAY = 24 * 60 * 60
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+
+
+def day_index(day_of_week: str) -> int:
+    """Get the weekday index (Monday is 0) for names like "mon" or "Monday"."""
+    day = day_of_week.strip().lower()[:3]
+    if day not in DAYS:
+        raise ValueError(f"Invalid day of week: {day_of_week}")
+    return DAYS.index(day)
+
+
+def _seconds(value: time) -> int:
+    """Get the number of seconds since midnight."""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def second_of_week(timestamp: datetime) -> int:
+    """Get the number of seconds since Monday 00:00 for a timestamp."""
+    return timestamp.weekday() * SECONDS_PER_DAY + _seconds(timestamp.time())
+
+
+class AccessSchedule:
+    """Weekly interval table compiled from the time slots of one permission.
+
+    Intervals are half-open [start, end) offsets in seconds from Monday
+    00:00, merged and sorted so a lookup is a single bisect.
+    """
+
+    def __init__(self, time_slots: Iterable[TimeSlot]):
+        intervals = []
+        for slot in time_slots:
+            if not slot.is_active:
+                continue
+            start = day_index(slot.day_of_week) * SECONDS_PER_DAY + _seconds(slot.start_time)
+            length = (_seconds(slot.end_time) - _seconds(slot.start_time)) % SECONDS_PER_DAY
+            if length == 0:
+                # Equal start and end times cover the whole day
+                length = SECONDS_PER_DAY
+            end = start + length
+            if end <= SECONDS_PER_WEEK:
+                intervals.append((start, end))
+            else:
+                # Sunday night slots wrap around to Monday morning
+                intervals.append((start, SECONDS_PER_WEEK))
+                intervals.append((0, end - SECONDS_PER_WEEK))
+
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def allows(self, timestamp: datetime) -> bool:
+        """Check whether the schedule grants access at the given time."""
+        offset = second_of_week(timestamp)
+        position = bisect_right(self.starts, offset) - 1
+        return position >= 0 and offset < self.ends[position]
+
+
+class AccessDecisionEngine:
+    """Answers whether a user may open a room at a given time.
+
+    Schedules are compiled once per (user_id, room_id) and replaced
+    incrementally when a permission changes. Pairs known to hold no
+    permission are kept as negative entries in an LRU set of at most
+    ``max_denied`` pairs, so denied checks are answered without loading
+    permissions while probing arbitrary pairs cannot grow the table
+    without bound. Granting a permission replaces its negative entry.
+    """
+
+    def __init__(self, max_denied: int = 100_000):
+        self.schedules: Dict[Tuple[str, str], AccessSchedule] = {}
+        self.max_denied = max_denied
+        self.denied: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self.schedules or key in self.denied
+
+    def set_schedule(self, user_id: str, room_id: str, schedule: Optional[AccessSchedule]) -> None:
+        """Store the compiled schedule of a user for a room (None if they hold no permission)."""
+        key = (user_id, room_id)
+        if schedule is None:
+            self.schedules.pop(key, None)
+            if self.max_denied > 0:
+                self.denied[key] = None
+                self.denied.move_to_end(key)
+                if len(self.denied) > self.max_denied:
+                    self.denied.popitem(last=False)
+        else:
+            self.denied.pop(key, None)
+            self.schedules[key] = schedule
+
+    def load(self, permission: Optional[Permission], user_id: str, room_id: str) -> None:
+        """Compile and store the schedule of a permission loaded from storage."""
+        schedule = AccessSchedule(permission.time_slots) if permission else None
+        self.set_schedule(user_id, room_id, schedule)
+
+    def is_allowed(self, user_id: str, room_id: str, timestamp: datetime) -> bool:
+        """Check access for one user, room and time."""
+        key = (user_id, room_id)
+        schedule = self.schedules.get(key)
+        if schedule is None:
+            if key in self.denied:
+                self.denied.move_to_end(key)
+            return False
+        return schedule.allows(timestamp)
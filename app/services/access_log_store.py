@@ -0,0 +1,188 @@
+"""Append-only, time-ordered access log store."""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime
+
+from ..models import AccessLog
+
+
+def normalize_timestamp(value: datetime) -> datetime:
+    """Convert a timezone-aware timestamp to naive local time.
+
+    Stored timestamps are naive local time (as from ``datetime.now()``),
+    so aware values must be converted before they are stored or compared.
+    """
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def check_access_log(log: AccessLog) -> None:
+    """Check that an access log can be stored and indexed, normalizing its timestamp.
+
+    Models are not re-validated when fields are assigned, so batches are
+    checked entry by entry before any of them is stored.
+    """
+    if not isinstance(log.timestamp, datetime):
+        raise TypeError(f"Access log timestamp must be a datetime, not {type(log.timestamp).__name__}")
+    if not isinstance(log.user_id, str) or not isinstance(log.room_id, str):
+        raise TypeError("Access log user_id and room_id must be strings")
+    log.timestamp = normalize_timestamp(log.timestamp)
+
+
+class LogSeries:
+    """Access logs kept in timestamp order with a parallel timestamp list for bisecting."""
+
+    def __init__(self):
+        self.timestamps: List[datetime] = []
+        self.logs: List[AccessLog] = []
+
+    def __len__(self) -> int:
+        return len(self.logs)
+
+    def append(self, log: AccessLog) -> None:
+        """Add a log entry, keeping the series ordered by timestamp."""
+        if not self.timestamps or log.timestamp >= self.timestamps[-1]:
+            # Common case: logs arrive in chronological order
+            self.timestamps.append(log.timestamp)
+            self.logs.append(log)
+            return
+
+        # Late arrival (e.g. buffered on a gateway): insert after equal timestamps
+        position = bisect_right(self.timestamps, log.timestamp)
+        self.timestamps.insert(position, log.timestamp)
+        self.logs.insert(position, log)
+
+    def bounds(self,
+               start_date: Optional[datetime] = None,
+               end_date: Optional[datetime] = None) -> Tuple[int, int]:
+        """Get the index range of logs within [start_date, end_date]."""
+        lo = bisect_left(self.timestamps, normalize_timestamp(start_date)) if start_date else 0
+        hi = bisect_right(self.timestamps, normalize_timestamp(end_date)) if end_date else len(self.timestamps)
+        return lo, hi
+
+    def newest(self,
+               start_date: Optional[datetime] = None,
+               end_date: Optional[datetime] = None,
+               limit: int = 100) -> List[AccessLog]:
+        """Get the newest logs within [start_date, end_date], most recent first."""
+        lo, hi = self.bounds(start_date, end_date)
+        return self.logs[max(lo, hi - limit):hi][::-1]
+
+    def chunks(self,
+               start_date: Optional[datetime] = None,
+               end_date: Optional[datetime] = None,
+               chunk_size: int = 1000) -> Iterator[List[AccessLog]]:
+        """Iterate over the logs within [start_date, end_date] in chunks, oldest first.
+
+        Late entries inserted while the chunks are consumed shift list
+        positions, so each chunk resumes by timestamp: after the entries
+        already returned with the last timestamp, which a late entry of
+        the same timestamp is always inserted behind. No entry is returned
+        twice or skipped; late entries older than the last chunk are not
+        returned.
+        """
+        lo, hi = self.bounds(start_date, end_date)
+        while lo < hi:
+            end = min(lo + chunk_size, hi)
+            last = self.timestamps[end - 1]
+            returned_at_last = end - bisect_left(self.timestamps, last, 0, end)
+            yield self.logs[lo:end]
+            lo = bisect_left(self.timestamps, last) + returned_at_last
+            _, hi = self.bounds(start_date, end_date)
+
+
+class AccessLogStore:
+    """Access log storage with per-user and per-room indexes.
+
+    Every index is a LogSeries, so filtered queries are a bisect on the
+    most selective series followed by a slice. Denied attempts get their
+    own series, so incident queries never touch granted traffic.
+    """
+
+    def __init__(self):
+        self.all = LogSeries()
+        self.by_user: Dict[str, LogSeries] = {}
+        self.by_room: Dict[str, LogSeries] = {}
+        self.by_user_room: Dict[Tuple[str, str], LogSeries] = {}
+        self.denied = LogSeries()
+
+    def __len__(self) -> int:
+        return len(self.all)
+
+    def append(self, log: AccessLog) -> None:
+        """Add a log entry to the store and all indexes."""
+        self.all.append(log)
+        self.by_user.setdefault(log.user_id, LogSeries()).append(log)
+        self.by_room.setdefault(log.room_id, LogSeries()).append(log)
+        self.by_user_room.setdefault((log.user_id, log.room_id), LogSeries()).append(log)
+        if not log.access_granted:
+            self.denied.append(log)
+
+    def series(self,
+               user_id: Optional[str] = None,
+               room_id: Optional[str] = None) -> LogSeries:
+        """Get the index series matching the given filters."""
+        if user_id and room_id:
+            return self.by_user_room.get((user_id, room_id), _EMPTY_SERIES)
+        if user_id:
+            return self.by_user.get(user_id, _EMPTY_SERIES)
+        if room_id:
+            return self.by_room.get(room_id, _EMPTY_SERIES)
+        return self.all
+
+    def query(self,
+              user_id: Optional[str] = None,
+              room_id: Optional[str] = None,
+              start_date: Optional[datetime] = None,
+              end_date: Optional[datetime] = None,
+              limit: int = 100) -> List[AccessLog]:
+        """Get the newest matching logs, most recent first."""
+        return self.series(user_id, room_id).newest(start_date, end_date, limit)
+
+    def iter_chunks(self,
+                    user_id: Optional[str] = None,
+                    room_id: Optional[str] = None,
+                    start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None,
+                    chunk_size: int = 1000) -> Iterator[List[AccessLog]]:
+        """Iterate over the matching logs in chunks, oldest first."""
+        return self.series(user_id, room_id).chunks(start_date, end_date, chunk_size)
+
+    def room_counts(self,
+                    start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None) -> Dict[str, int]:
+        """Count the logs per room within [start_date, end_date]."""
+        return _counts(self.by_room, start_date, end_date)
+
+    def user_counts(self,
+                    start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None) -> Dict[str, int]:
+        """Count the logs per user within [start_date, end_date]."""
+        return _counts(self.by_user, start_date, end_date)
+
+    def query_denied(self,
+                     start_date: Optional[datetime] = None,
+                     end_date: Optional[datetime] = None,
+                     offset: int = 0,
+                     limit: int = 100) -> Tuple[List[AccessLog], int]:
+        """Get a page of denied attempts, most recent first, and their total count."""
+        lo, hi = self.denied.bounds(start_date, end_date)
+        end = max(lo, hi - offset)
+        return self.denied.logs[max(lo, end - limit):end][::-1], hi - lo
+
+
+def _counts(index: Dict[str, LogSeries],
+            start_date: Optional[datetime],
+            end_date: Optional[datetime]) -> Dict[str, int]:
+    """Count the logs of every series of an index within [start_date, end_date]."""
+    counts = {}
+    for key, series in index.items():
+        lo, hi = series.bounds(start_date, end_date)
+        if hi > lo:
+            counts[key] = hi - lo
+    return counts
+
+
+_EMPTY_SERIES = LogSeries()
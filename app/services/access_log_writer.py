@@ -0,0 +1,122 @@
+"""Group-committing access log writer."""
+
+from typing import List, Optional, Tuple
+import asyncio
+
+from ..models import AccessLog
+from .database import Database
+
+
+class AccessLogWriter:
+    """Buffers access logs and persists them in groups.
+
+    Callers of ``write`` are acknowledged once the group containing their
+    logs has been saved. A group is committed when it reaches
+    ``max_batch_size`` logs or ``max_delay`` seconds after its first entry,
+    whichever comes first.
+    """
+
+    def __init__(self, database: Database, max_batch_size: int = 500, max_delay: float = 0.01):
+        self.database = database
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start the background commit task."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Commit everything still buffered and stop the background task."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def write(self, logs: List[AccessLog]) -> None:
+        """Persist access logs, returning once they have been committed."""
+        if not logs:
+            return
+        if self._task is None:
+            # Not started (e.g. outside the application lifespan): write directly
+            await self._save(logs)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((logs, future))
+        await future
+
+    async def _run(self) -> None:
+        """Collect queued writes into groups and commit them."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            group: List[Tuple[List[AccessLog], asyncio.Future]] = [item]
+            size = len(item[0])
+            deadline = loop.time() + self.max_delay
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+                size += len(item[0])
+
+            await self._commit(group)
+
+    async def _commit(self, group: List[Tuple[List[AccessLog], asyncio.Future]]) -> None:
+        """Save one group and acknowledge all of its writers.
+
+        Batch saves are all-or-nothing, so if the group fails every writer's
+        logs are saved again on their own and only the failing writers get
+        the error.
+        """
+        logs = [log for entries, _ in group for log in entries]
+        try:
+            await self._save(logs)
+        except Exception as e:
+            if len(group) == 1:
+                self._acknowledge(group[0][1], e)
+                return
+            for entries, future in group:
+                try:
+                    await self._save(entries)
+                except Exception as writer_error:
+                    self._acknowledge(future, writer_error)
+                else:
+                    self._acknowledge(future)
+            return
+
+        for _, future in group:
+            self._acknowledge(future)
+
+    @staticmethod
+    def _acknowledge(future: asyncio.Future, error: Optional[Exception] = None) -> None:
+        """Complete a writer's future unless it was cancelled."""
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    async def _save(self, logs: List[AccessLog]) -> None:
+        """Save logs, moving blocking disk I/O off the event loop."""
+        if self.database.is_durable:
+            await asyncio.to_thread(self.database.save_access_logs, logs)
+        else:
+            self.database.save_access_logs(logs)
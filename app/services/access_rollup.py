@@ -0,0 +1,156 @@
+"""Pre-aggregated access counts for reports."""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import threading
+
+from ..models import AccessLog
+
+
+_RESOLUTION = timedelta(microseconds=1)  # Timestamps are stored with microseconds
+
+
+def hour_index(value: datetime) -> int:
+    """Number of the hour containing a timestamp."""
+    return value.toordinal() * 24 + value.hour
+
+
+def hour_start(hour: int) -> datetime:
+    """Start of an hour numbered by ``hour_index``."""
+    return datetime.fromordinal(hour // 24) + timedelta(hours=hour % 24)
+
+
+def whole_hours(start_date: Optional[datetime],
+                end_date: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+    """Get the first and last hour lying entirely within [start_date, end_date].
+
+    An open end of the range (None) stays open.
+    """
+    first = last = None
+    if start_date is not None:
+        first = hour_index(start_date)
+        if start_date > hour_start(first):
+            first += 1
+    if end_date is not None:
+        last = hour_index(end_date)
+        if end_date < hour_start(last + 1) - _RESOLUTION:
+            last -= 1
+    return first, last
+
+
+def partial_hours(start_date: Optional[datetime],
+                  end_date: Optional[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Get the parts of [start_date, end_date] outside the hours lying entirely within it."""
+    if start_date is not None and end_date is not None and start_date > end_date:
+        return []
+    first, last = whole_hours(start_date, end_date)
+    if first is not None and last is not None and first > last:
+        return [(start_date, end_date)]
+    edges = []
+    if first is not None and start_date < hour_start(first):
+        edges.append((start_date, hour_start(first) - _RESOLUTION))
+    if last is not None and end_date >= hour_start(last + 1):
+        edges.append((hour_start(last + 1), end_date))
+    return edges
+
+
+def add_counts(counts: Dict[str, int], more: Dict[str, int]) -> None:
+    """Add per-key counts to a dict of per-key counts."""
+    for key, count in more.items():
+        counts[key] = counts.get(key, 0) + count
+
+
+class RollupSeries:
+    """Access counts of one room or user, bucketed by hour and by day."""
+
+    def __init__(self):
+        self.hours: Dict[int, int] = {}  # hour_index -> count
+        self.days: Dict[int, int] = {}  # date ordinal -> count
+        self.total = 0
+
+    def add(self, hour: int, count: int = 1) -> None:
+        """Count accesses in an hour bucket."""
+        self.hours[hour] = self.hours.get(hour, 0) + count
+        day = hour // 24
+        self.days[day] = self.days.get(day, 0) + count
+        self.total += count
+
+    def count(self, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> int:
+        """Count the accesses in the hours [start_hour, end_hour].
+
+        Whole days in the range are read from the day buckets and only
+        the partial days at either end from the hour buckets.
+        """
+        if start_hour is None and end_hour is None:
+            return self.total
+        if not self.days:
+            return 0
+        if start_hour is None:
+            start_hour = min(self.days) * 24
+        if end_hour is None:
+            end_hour = max(self.days) * 24 + 23
+        if start_hour > end_hour:
+            return 0
+
+        first_day, last_day = start_hour // 24, end_hour // 24
+        if first_day == last_day:
+            return self._sum_hours(start_hour, end_hour)
+
+        total = self._sum_hours(start_hour, first_day * 24 + 23)
+        total += self._sum_hours(last_day * 24, end_hour)
+        if last_day - first_day - 1 < len(self.days):
+            total += sum(self.days.get(day, 0) for day in range(first_day + 1, last_day))
+        else:
+            # Sparse series: fewer stored days than days in the range
+            total += sum(count for day, count in self.days.items() if first_day < day < last_day)
+        return total
+
+    def _sum_hours(self, start_hour: int, end_hour: int) -> int:
+        return sum(self.hours.get(hour, 0) for hour in range(start_hour, end_hour + 1))
+
+
+class AccessRollups:
+    """Per-room and per-user access counts, updated as access logs are saved.
+
+    Reports combine bucket counts instead of scanning the access logs.
+    Only the hours lying entirely within [start_date, end_date] are
+    counted; the partial hours at either end (see ``partial_hours``)
+    are counted from the access logs themselves.
+    """
+
+    def __init__(self):
+        self.by_room: Dict[str, RollupSeries] = {}
+        self.by_user: Dict[str, RollupSeries] = {}
+        # Durable databases save logs from worker threads
+        self._lock = threading.Lock()
+
+    def add(self, log: AccessLog) -> None:
+        """Count a saved access log."""
+        self.add_count(log.user_id, log.room_id, hour_index(log.timestamp))
+
+    def add_count(self, user_id: str, room_id: str, hour: int, count: int = 1) -> None:
+        """Count accesses of a user to a room within an hour."""
+        with self._lock:
+            self.by_room.setdefault(room_id, RollupSeries()).add(hour, count)
+            self.by_user.setdefault(user_id, RollupSeries()).add(hour, count)
+
+    def room_counts(self,
+                    start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None) -> Dict[str, int]:
+        """Count the accesses per room within the whole hours of [start_date, end_date]."""
+        return self._counts(self.by_room, start_date, end_date)
+
+    def user_counts(self,
+                    start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None) -> Dict[str, int]:
+        """Count the accesses per user within the whole hours of [start_date, end_date]."""
+        return self._counts(self.by_user, start_date, end_date)
+
+    def _counts(self,
+                series: Dict[str, RollupSeries],
+                start_date: Optional[datetime],
+                end_date: Optional[datetime]) -> Dict[str, int]:
+        start_hour, end_hour = whole_hours(start_date, end_date)
+        with self._lock:
+            counts = {key: rollup.count(start_hour, end_hour) for key, rollup in series.items()}
+        return {key: count for key, count in counts.items() if count}
@@ -0,0 +1,59 @@
+"""LRU cache for generated card data."""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class CardCache:
+    """Caches card bytes per user, tagged with the permission version they encode.
+
+    Entries are evicted least recently used first once their total size
+    exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str, version: int) -> Optional[bytes]:
+        """Get the cached card of a user if it was built for the given version."""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user_id: str, version: int, card_data: bytes) -> None:
+        """Store the card of a user, evicting old entries to stay within the cap."""
+        self.invalidate(user_id)
+        if len(card_data) > self.max_bytes:
+            return
+        self._entries[user_id] = (version, card_data)
+        self.size += len(card_data)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the cached card of a user."""
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache size and hit/miss counters."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,233 @@
+"""Card update dispatch from the PermissionManager to the gateways."""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+
+from ..core.config import settings
+from ..models import CardUpdateItem, CardUpdateResult
+from .card_format import decode_card
+from .permission_manager import PermissionManager
+from .gateway_comm_service import GatewayCommService
+
+
+class CardUpdateDispatcher:
+    """Queues card updates and sends them to the gateways serving the affected rooms.
+
+    Updates scheduled for the same user within ``delay`` seconds are
+    coalesced, so a burst of permission edits results in one transmission
+    of the latest card per gateway. Each (gateway, user) pair is sent by
+    one tracked task at a time; a newer card queued while it is sending
+    replaces any older one still waiting. Transmissions run with bounded
+    concurrency and are retried up to ``max_retry_attempts`` times while
+    the gateway stays reachable. Unreachable gateways are skipped and
+    catch up through delta sync when they reconnect.
+    """
+
+    def __init__(
+        self,
+        permission_manager: PermissionManager,
+        gateway_service: GatewayCommService,
+        concurrency: int = 10,
+        delay: float = 0.05,
+        retry_delay: float = 0.1,
+        max_retry_attempts: int = settings.max_retry_attempts
+    ):
+        self.permission_manager = permission_manager
+        self.gateway_service = gateway_service
+        self.concurrency = concurrency
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self.max_retry_attempts = max_retry_attempts
+        self.pending: Dict[str, Set[str]] = {}  # user_id -> affected room_ids
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0  # Transmissions to unreachable gateways, left to delta sync
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._queued: Dict[Tuple[str, str], bytes] = {}  # (gateway_id, user_id) -> latest card
+        self._senders: Dict[Tuple[str, str], asyncio.Task] = {}  # (gateway_id, user_id) -> task
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        """Start the background dispatch task."""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        if self.pending:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop the dispatch task after sending all pending updates."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._wakeup = None
+        await self.flush()
+
+    def schedule(self, user_id: str, room_ids: Iterable[str]) -> None:
+        """Queue a card update of a user for the gateways serving the given rooms."""
+        self.pending.setdefault(user_id, set()).update(room_ids)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Send all pending card updates now and wait for every transmission."""
+        self._dispatch()
+        while self._senders:
+            await asyncio.gather(*list(self._senders.values()))
+
+    def stats(self) -> Dict[str, int]:
+        """Get transmission counters and the number of queued updates."""
+        return {
+            "pending_users": len(self.pending),
+            "in_flight": len(self._senders),
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+        }
+
+    def _dispatch(self) -> None:
+        """Start the transmissions of all pending card updates without waiting for them."""
+        pending, self.pending = self.pending, {}
+
+        # One transmission per (gateway, user), carrying the latest card
+        for user_id, room_ids in pending.items():
+            gateway_ids = set()
+            for room_id in room_ids:
+                gateway_ids.update(self.gateway_service.get_gateways_for_room(room_id))
+            if not gateway_ids:
+                continue
+            card_data = self.permission_manager.generate_card_data(user_id)
+            for gateway_id in gateway_ids:
+                if not self.gateway_service.is_reachable(gateway_id):
+                    self.skipped += 1
+                    continue
+                key = (gateway_id, user_id)
+                self._queued[key] = card_data
+                if key not in self._senders:
+                    self._senders[key] = asyncio.create_task(self._send_queued(key))
+
+    async def _send_queued(self, key: Tuple[str, str]) -> None:
+        """Send the latest queued card of a (gateway, user) pair until none is left."""
+        gateway_id, _ = key
+        try:
+            while key in self._queued:
+                card_data = self._queued.pop(key)
+                if await self._send_with_retry(gateway_id, card_data):
+                    self.sent += 1
+                else:
+                    self.failed += 1
+        finally:
+            del self._senders[key]
+
+    async def send_bulk(self, items: List[CardUpdateItem]) -> List[CardUpdateResult]:
+        """Send many cards to the gateways responsible for their rooms.
+        
+        Cards are grouped per gateway, so each gateway receives them in a
+        few batched messages. Gateways are served concurrently; offline
+        gateways are skipped and catch up on their next sync.
+        """
+        results: List[CardUpdateResult] = []
+        per_gateway: Dict[str, List[Tuple[int, bytes]]] = {}  # gateway_id -> (item index, card)
+        for index, item in enumerate(items):
+            result = CardUpdateResult(index=index, user_id=item.user_id)
+            results.append(result)
+            try:
+                result.user_id, card_data, room_ids = self._resolve_card(item)
+            except (ValueError, KeyError, IndexError) as e:
+                result.error = f"Invalid card update: {str(e)}"
+                continue
+            
+            gateway_ids = item.gateway_ids
+            if gateway_ids is None:
+                gateway_ids = {
+                    gateway_id
+                    for room_id in room_ids
+                    for gateway_id in self.gateway_service.get_gateways_for_room(room_id)
+                }
+            if not gateway_ids:
+                result.error = "No gateway serves the rooms of this card"
+            for gateway_id in gateway_ids:
+                per_gateway.setdefault(gateway_id, []).append((index, card_data))
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def transmit(gateway_id: str, entries: List[Tuple[int, bytes]]) -> None:
+            if not self.gateway_service.is_reachable(gateway_id):
+                delivered = [False] * len(entries)
+            else:
+                async with semaphore:
+                    delivered = await self._send_batch_with_retry(gateway_id, [card for _, card in entries])
+            for (index, _), ok in zip(entries, delivered):
+                results[index].delivered[gateway_id] = ok
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+        
+        await asyncio.gather(*(transmit(*entry) for entry in per_gateway.items()))
+        return results
+    
+    def _resolve_card(self, item: CardUpdateItem) -> Tuple[str, bytes, List[str]]:
+        """Get the user ID, card data and rooms of a bulk card update item."""
+        if item.card_data is not None:
+            card_data = bytes.fromhex(item.card_data)
+            card = decode_card(card_data)
+            return card["user_id"], card_data, [p["room_id"] for p in card["permissions"]]
+        if item.user_id is not None:
+            room_ids = [p.room_id for p in self.permission_manager.get_user_permissions(item.user_id)]
+            return item.user_id, self.permission_manager.generate_card_data(item.user_id), room_ids
+        raise ValueError("Either user_id or card_data is required")
+    
+    async def _run(self) -> None:
+        """Wait for scheduled updates and dispatch them after the coalescing delay.
+
+        Transmissions run as their own tasks, so retries to a slow gateway
+        do not hold back the next batch.
+        """
+        while not self._stopping:
+            await self._wakeup.wait()
+            if not self._stopping:
+                await asyncio.sleep(self.delay)
+            self._wakeup.clear()
+            self._dispatch()
+
+    async def _send_with_retry(self, gateway_id: str, card_data: bytes) -> bool:
+        """Send a card to a gateway, retrying with exponential backoff while it is reachable."""
+        for attempt in range(self.max_retry_attempts):
+            if attempt > 0:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+                if not self.gateway_service.is_reachable(gateway_id):
+                    # The gateway catches up through delta sync on reconnect
+                    return False
+            try:
+                async with self._semaphore:
+                    if await self.gateway_service.send_card_update(gateway_id, card_data):
+                        return True
+            except Exception:
+                pass
+        return False
+    
+    async def _send_batch_with_retry(self, gateway_id: str, cards: List[bytes]) -> List[bool]:
+        """Send cards to a gateway in batches, retrying only the undelivered cards."""
+        delivered = [False] * len(cards)
+        remaining = list(range(len(cards)))
+        for attempt in range(self.max_retry_attempts):
+            try:
+                results = await self.gateway_service.send_card_updates(
+                    gateway_id, [cards[index] for index in remaining]
+                )
+            except Exception:
+                results = [False] * len(remaining)
+            for index, ok in zip(remaining, results):
+                delivered[index] = ok
+            remaining = [index for index, ok in zip(remaining, results) if not ok]
+            if not remaining:
+                break
+            if attempt + 1 < self.max_retry_attempts:
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        return delivered
@@ -0,0 +1,228 @@
+"""Card data encodings.
+
+Two encodings are supported:
+
+* ``json``: UTF-8 JSON with ISO time strings.
+* ``binary``: a compact, versioned format for card memory and gateway links.
+
+Binary layout (all integers are unsigned LEB128 varints unless noted)::
+
+    magic "SC" (2 bytes) | format version (1 byte) | card version
+    user_id length | user_id (UTF-8)
+    room count | per room: length | room_id (UTF-8)      -- interned room table
+    permission count | per permission:
+        room index | slot count | per slot:
+            day mask (1 byte, bit 0 = Monday) | start minute | end minute
+
+Slots with the same start and end time on several days share one entry
+with a combined day mask. Times are minute offsets from midnight.
+Inactive slots are left out of both encodings.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+from datetime import time
+import json
+
+from ..models import Permission
+from .access_decision import DAYS, day_index
+
+
+MAGIC = b"SC"
+FORMAT_VERSION = 1
+
+
+def encode_card_json(user_id: str, version: int, permissions: Iterable[Permission]) -> bytes:
+    """Encode card data as UTF-8 JSON."""
+    card_data = {
+        "user_id": user_id,
+        "version": version,
+        "permissions": [
+            {
+                "room_id": permission.room_id,
+                "time_slots": [
+                    {
+                        "start_time": ts.start_time.isoformat(),
+                        "end_time": ts.end_time.isoformat(),
+                        "day_of_week": ts.day_of_week
+                    }
+                    for ts in permission.time_slots
+                    if ts.is_active
+                ]
+            }
+            for permission in permissions
+        ]
+    }
+    return json.dumps(card_data).encode("utf-8")
+
+
+def encode_card_binary(user_id: str, version: int, permissions: Iterable[Permission]) -> bytes:
+    """Encode card data in the compact binary format."""
+    permissions = list(permissions)
+    rooms: Dict[str, int] = {}
+    for permission in permissions:
+        rooms.setdefault(permission.room_id, len(rooms))
+
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _write_varint(out, version)
+    _write_string(out, user_id)
+
+    _write_varint(out, len(rooms))
+    for room_id in rooms:
+        _write_string(out, room_id)
+
+    _write_varint(out, len(permissions))
+    for permission in permissions:
+        # Merge slots sharing the same times into one day mask
+        masks: Dict[Tuple[int, int], int] = {}
+        for ts in permission.time_slots:
+            if not ts.is_active:
+                continue
+            key = (_minutes(ts.start_time), _minutes(ts.end_time))
+            masks[key] = masks.get(key, 0) | (1 << day_index(ts.day_of_week))
+
+        _write_varint(out, rooms[permission.room_id])
+        _write_varint(out, len(masks))
+        for (start, end), mask in masks.items():
+            out.append(mask)
+            _write_varint(out, start)
+            _write_varint(out, end)
+
+    return bytes(out)
+
+
+def decode_card_binary(data: bytes) -> Dict[str, Any]:
+    """Decode a binary card into the structure of the JSON encoding.
+
+    Raises ValueError if the data is not a complete binary card.
+    """
+    if data[:2] != MAGIC:
+        raise ValueError("Not a binary card")
+    if len(data) < 3:
+        raise ValueError("Truncated binary card")
+    if data[2] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported card format version: {data[2]}")
+    try:
+        return _read_card(data)
+    except IndexError:
+        # Reads past the end of the data, or a room index beyond the room table
+        raise ValueError("Truncated or corrupt binary card") from None
+
+
+def _read_card(data: bytes) -> Dict[str, Any]:
+    """Read the fields of a binary card after its header."""
+    position = 3
+    version, position = _read_varint(data, position)
+    user_id, position = _read_string(data, position)
+
+    room_count, position = _read_varint(data, position)
+    rooms: List[str] = []
+    for _ in range(room_count):
+        room_id, position = _read_string(data, position)
+        rooms.append(room_id)
+
+    permission_count, position = _read_varint(data, position)
+    permissions = []
+    for _ in range(permission_count):
+        room_index, position = _read_varint(data, position)
+        slot_count, position = _read_varint(data, position)
+        time_slots = []
+        for _ in range(slot_count):
+            mask = data[position]
+            start, position = _read_varint(data, position + 1)
+            end, position = _read_varint(data, position)
+            for day, name in enumerate(DAYS):
+                if mask & (1 << day):
+                    time_slots.append({
+                        "start_time": _time(start).isoformat(),
+                        "end_time": _time(end).isoformat(),
+                        "day_of_week": name
+                    })
+        permissions.append({"room_id": rooms[room_index], "time_slots": time_slots})
+
+    return {"user_id": user_id, "version": version, "permissions": permissions}
+
+
+def decode_card(data: bytes) -> Dict[str, Any]:
+    """Decode a card in either encoding.
+
+    Raises ValueError if the data is not a card of the JSON structure.
+    """
+    if data[:2] == MAGIC:
+        return decode_card_binary(data)
+    card = json.loads(data)
+    _check_card(card)
+    return card
+
+
+def card_size_report(user_id: str, version: int, permissions: Iterable[Permission]) -> Dict[str, Any]:
+    """Compare the size of a card in both encodings."""
+    permissions = list(permissions)
+    json_bytes = len(encode_card_json(user_id, version, permissions))
+    binary_bytes = len(encode_card_binary(user_id, version, permissions))
+    return {
+        "json_bytes": json_bytes,
+        "binary_bytes": binary_bytes,
+        "ratio": round(binary_bytes / json_bytes, 3),
+    }
+
+
+CARD_ENCODERS = {
+    "json": encode_card_json,
+    "binary": encode_card_binary,
+}
+
+
+def _check_card(card: Any) -> None:
+    """Check the structure of a decoded JSON card."""
+    if not isinstance(card, dict):
+        raise ValueError("Card must be a JSON object")
+    if not isinstance(card.get("user_id"), str):
+        raise ValueError("Card user_id must be a string")
+    permissions = card.get("permissions")
+    if not isinstance(permissions, list):
+        raise ValueError("Card permissions must be a list")
+    for permission in permissions:
+        if not isinstance(permission, dict) or not isinstance(permission.get("room_id"), str):
+            raise ValueError("Card permissions must be objects with a room_id")
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _write_string(out: bytearray, value: str) -> None:
+    encoded = value.encode("utf-8")
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_string(data: bytes, position: int) -> Tuple[str, int]:
+    length, position = _read_varint(data, position)
+    end = position + length
+    if end > len(data):
+        raise IndexError("String extends past the end of the data")
+    return data[position:end].decode("utf-8"), end
@@ -0,0 +1,118 @@
+"""Delta synchronisation of cards between the server and gateways.
+
+A gateway stores the cards of every user with a permission in one of its
+rooms. Syncing uses two mechanisms:
+
+* **Deltas.** Every permission change is recorded in a CardChangeFeed
+  under its permission version. A gateway that acknowledged version ``v``
+  only receives the cards of users changed after ``v``.
+* **Digests.** Cards are spread over a fixed number of buckets by user ID.
+  A bucket's value is the XOR of the hashes of its cards, and the root is
+  a hash over all buckets. Comparing roots detects drift; comparing the
+  buckets finds the few buckets that need resending.
+
+Both sides compute digests with the functions below, so a gateway only
+needs ``card_bucket`` and ``card_hash`` to take part.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import bisect
+import hashlib
+import zlib
+
+
+DIGEST_BUCKETS = 256
+
+
+class CardChangeFeed:
+    """Bounded, version-ordered history of (user_id, room_id) card changes."""
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.versions: List[int] = []
+        self.changes: List[Tuple[str, str]] = []
+        self.oldest_version = 0  # every change after this version is retained
+
+    def record(self, version: int, user_id: str, room_id: str) -> None:
+        """Record a change; versions must be recorded in increasing order."""
+        self.versions.append(version)
+        self.changes.append((user_id, room_id))
+        if len(self.versions) > 2 * self.max_entries:
+            # Trim in bulk so recording stays amortised O(1)
+            drop = len(self.versions) - self.max_entries
+            self.oldest_version = self.versions[drop - 1]
+            del self.versions[:drop]
+            del self.changes[:drop]
+
+    def since(self, version: int) -> Optional[List[Tuple[str, str]]]:
+        """Get the changes after a version, or None if they are no longer retained."""
+        if version < self.oldest_version:
+            return None
+        return self.changes[bisect.bisect_right(self.versions, version):]
+
+
+class CardSetDigest:
+    """Bucket digest of a set of cards, kept up to date card by card.
+
+    Replacing or removing a card XORs its old hash out of its bucket and
+    the new hash in, so updates cost O(1) regardless of the number of
+    cards. ``version`` is the permission version the digest reflects.
+    """
+
+    def __init__(self, bucket_count: int = DIGEST_BUCKETS):
+        self.bucket_count = bucket_count
+        self.buckets = [0] * bucket_count
+        self.hashes: Dict[str, int] = {}  # user_id -> hash of the card in the digest
+        self.version = 0
+
+    def set_card(self, user_id: str, card_data: Optional[bytes]) -> None:
+        """Replace the card of a user in the digest (None removes it)."""
+        bucket = card_bucket(user_id, self.bucket_count)
+        previous = self.hashes.pop(user_id, None)
+        if previous is not None:
+            self.buckets[bucket] ^= previous
+        if card_data is not None:
+            value = card_hash(card_data)
+            self.hashes[user_id] = value
+            self.buckets[bucket] ^= value
+
+    def users_in_buckets(self, buckets: Iterable[int]) -> List[str]:
+        """Get the users whose cards fall into the given buckets."""
+        buckets = set(buckets)
+        return [user_id for user_id in self.hashes if card_bucket(user_id, self.bucket_count) in buckets]
+
+
+def card_bucket(user_id: str, bucket_count: int = DIGEST_BUCKETS) -> int:
+    """Get the digest bucket of a user's card."""
+    return zlib.crc32(user_id.encode("utf-8")) % bucket_count
+
+
+def card_hash(card_data: bytes) -> int:
+    """Get the 64-bit hash of a card."""
+    return int.from_bytes(hashlib.blake2b(card_data, digest_size=8).digest(), "big")
+
+
+def card_digest(cards: Dict[str, bytes], bucket_count: int = DIGEST_BUCKETS) -> List[int]:
+    """Compute the bucket digest of a set of cards keyed by user ID."""
+    buckets = [0] * bucket_count
+    for user_id, card_data in cards.items():
+        buckets[card_bucket(user_id, bucket_count)] ^= card_hash(card_data)
+    return buckets
+
+
+def digest_root(buckets: Iterable[int]) -> str:
+    """Hash a bucket digest into a single root value."""
+    root = hashlib.blake2b(digest_size=16)
+    for bucket in buckets:
+        root.update(bucket.to_bytes(8, "big"))
+    return root.hexdigest()
+
+
+def encode_digest(buckets: Iterable[int]) -> List[str]:
+    """Encode bucket values as hex strings for transmission."""
+    return [format(bucket, "016x") for bucket in buckets]
+
+
+def decode_digest(buckets: Iterable[str]) -> List[int]:
+    """Decode bucket values received from a gateway."""
+    return [int(bucket, 16) for bucket in buckets]
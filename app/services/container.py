@@ -0,0 +1,76 @@
+"""Application-scoped service container."""
+
+from typing import Optional
+
+from ..core.config import settings
+from .database import Database
+from .sqlite_database import SQLiteDatabase
+from .permission_manager import PermissionManager
+from .session_manager import SessionManager
+from .gateway_comm_service import GatewayCommService
+from .access_log_writer import AccessLogWriter
+from .card_dispatcher import CardUpdateDispatcher
+from .report_generator import ReportGenerator
+from .report_jobs import ReportJobQueue
+
+
+def create_database() -> Database:
+    """Create the database backend selected in the settings."""
+    if settings.database_backend == "sqlite":
+        return SQLiteDatabase(settings.database_url, pool_size=settings.database_pool_size)
+    if settings.database_backend == "memory":
+        return Database()
+    raise ValueError(f"Unsupported database backend: {settings.database_backend}")
+
+
+class ServiceContainer:
+    """Holds the single instance of every service used by the API.
+
+    The container is built once in the application lifespan and shared by
+    all routers, so every service works against the same Database.
+    """
+
+    def __init__(self, database: Optional[Database] = None):
+        self.database = database or create_database()
+        self.permission_manager = PermissionManager(self.database)
+        self.session_manager = SessionManager(self.database)
+        self.gateway_service = GatewayCommService()
+        self.card_dispatcher = CardUpdateDispatcher(
+            self.permission_manager,
+            self.gateway_service,
+            concurrency=settings.card_update_concurrency,
+            delay=settings.card_update_delay_ms / 1000,
+            max_retry_attempts=settings.max_retry_attempts
+        )
+        self.permission_manager.card_dispatcher = self.card_dispatcher
+        self.gateway_service.permission_manager = self.permission_manager
+        self.access_log_writer = AccessLogWriter(
+            self.database,
+            max_batch_size=settings.access_log_batch_size,
+            max_delay=settings.access_log_batch_delay_ms / 1000
+        )
+        self.report_jobs = ReportJobQueue(
+            ReportGenerator(self.database, self.gateway_service),
+            max_workers=settings.report_workers,
+            cache_size=settings.report_cache_size,
+            max_jobs=settings.report_job_history
+        )
+
+    async def start(self) -> None:
+        """Start background services."""
+        await self.gateway_service.start()
+        await self.access_log_writer.start()
+        await self.card_dispatcher.start()
+        self.session_manager.start_sweeper(
+            interval=settings.session_sweep_interval_seconds,
+            batch_size=settings.session_sweep_batch_size
+        )
+
+    async def stop(self) -> None:
+        """Stop background services, flushing buffered writes first."""
+        await self.session_manager.stop_sweeper()
+        await self.access_log_writer.stop()
+        await self.card_dispatcher.stop()
+        await self.gateway_service.stop()
+        self.report_jobs.shutdown()
+        self.database.close()
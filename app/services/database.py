@@ -1,19 +1,38 @@
 """Database service implementation - In-memory prototype version."""
 
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from datetime import datetime
+import heapq
+import time
 
-from ..models import User, Permission, AccessLog
+from ..models import User, Permission, PermissionChange, AccessLog
+from .access_log_store import AccessLogStore, check_access_log, normalize_timestamp
+from .access_rollup import AccessRollups, add_counts, partial_hours
+from .permission_journal import PermissionJournal
 
 
 class Database:
     """Database service for managing data persistence in memory (prototype)."""
     
+    # Whether writes go to durable storage (and block on disk I/O)
+    is_durable = False
+    
     def __init__(self, database_url: Optional[str] = None):
         # In-memory storage
         self.users: Dict[str, User] = {}
+        # Login index: lowercased username or email -> user_id
+        self.user_logins: Dict[str, str] = {}
+        self._user_login_keys: Dict[str, Tuple[str, ...]] = {}  # user_id -> indexed logins
+        self.password_hashes: Dict[str, str] = {}  # user_id -> password hash
+        self.revoked_tokens: Dict[str, float] = {}  # jti -> expiry (epoch seconds)
+        self._revocation_heap: List[Tuple[float, str]] = []
+        self.user_version = 0  # Incremented by every user change, for report caching
         self.permissions: Dict[str, Permission] = {}  # permission_id -> Permission
-        self.access_logs: List[AccessLog] = []
+        # Secondary index: user_id -> room_id -> Permission
+        self.user_permissions: Dict[str, Dict[str, Permission]] = {}
+        self.permission_journal = PermissionJournal()  # Append-only change history
+        self.access_logs = AccessLogStore()
+        self.access_rollups = AccessRollups()  # Pre-aggregated counts for reports
         self._initialize_sample_data()
     
     def _initialize_sample_data(self):
@@ -22,6 +41,7 @@ class Database:
         sample_users = [
             User(
                 user_id="1",
+                username="admin",
                 email="admin@th-owl.de",
                 full_name="System Administrator",
                 is_active=True,
@@ -29,6 +49,7 @@ class Database:
             ),
             User(
                 user_id="2", 
+                username="alice",
                 email="alice@th-owl.de",
                 full_name="Alice Johnson",
                 is_active=True,
@@ -36,6 +57,7 @@ class Database:
             ),
             User(
                 user_id="3",
+                username="bob",
                 email="bob@th-owl.de",
                 full_name="Bob Smith",
                 is_active=True,
@@ -44,60 +66,221 @@ class Database:
         ]
         
         for user in sample_users:
-            self.users[user.user_id] = user
+            self.save_user(user)
     
     def save_user(self, user: User) -> None:
         """Save a user to in-memory storage."""
-        if user.user_id:
-            self.users[user.user_id] = user
+        if not user.user_id:
+            return
+        
+        self.users[user.user_id] = user
+        self.user_version += 1
+        
+        # Re-index logins, the username or email may have changed
+        for login in self._user_login_keys.pop(user.user_id, ()):
+            if self.user_logins.get(login) == user.user_id:
+                del self.user_logins[login]
+        logins = tuple(login.lower() for login in (user.username, user.email) if login)
+        for login in logins:
+            self.user_logins[login] = user.user_id
+        self._user_login_keys[user.user_id] = logins
+    
+    def get_user_by_login(self, login: str) -> Optional[User]:
+        """Get a user by their username or email address."""
+        user_id = self.user_logins.get(login.lower())
+        return self.users.get(user_id) if user_id else None
+    
+    def save_password_hash(self, user_id: str, password_hash: str) -> None:
+        """Store the password hash of a user."""
+        self.password_hashes[user_id] = password_hash
+    
+    def get_password_hash(self, user_id: str) -> Optional[str]:
+        """Get the password hash of a user, if one was set."""
+        return self.password_hashes.get(user_id)
+    
+    def save_token_revocation(self, jti: str, expires_at: float) -> None:
+        """Record a revoked token until its expiry time (epoch seconds)."""
+        now = time.time()
+        while self._revocation_heap and self._revocation_heap[0][0] < now:
+            # Expired tokens are rejected anyway, so their entries can go
+            _, expired_jti = heapq.heappop(self._revocation_heap)
+            self.revoked_tokens.pop(expired_jti, None)
+        
+        self.revoked_tokens[jti] = expires_at
+        heapq.heappush(self._revocation_heap, (expires_at, jti))
+    
+    def is_token_revoked(self, jti: str) -> bool:
+        """Check whether a token was revoked."""
+        return jti in self.revoked_tokens
     
     def save_access_log(self, log: AccessLog) -> None:
         """Save an access log entry to in-memory storage."""
+        check_access_log(log)
         if not log.log_id:
             log.log_id = f"log_{len(self.access_logs) + 1}"
         self.access_logs.append(log)
+        self.access_rollups.add(log)
+    
+    def save_access_logs(self, logs: List[AccessLog]) -> None:
+        """Save a batch of access log entries; nothing is saved if any entry is invalid."""
+        for log in logs:
+            check_access_log(log)
+        for log in logs:
+            self.save_access_log(log)
     
     def get_permissions(self, user_id: str) -> List[Permission]:
         """Get all permissions for a specific user."""
-        return [
-            permission for permission in self.permissions.values()
-            if permission.user_id == user_id
-        ]
+        return list(self.user_permissions.get(user_id, {}).values())
+    
+    def get_permission(self, user_id: str, room_id: str) -> Optional[Permission]:
+        """Get the permission of a user for a specific room."""
+        return self.user_permissions.get(user_id, {}).get(room_id)
+    
+    def get_all_permissions(self) -> List[Permission]:
+        """Get all permissions."""
+        return list(self.permissions.values())
     
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Get a user by their ID."""
         return self.users.get(user_id)
     
     def save_permission(self, permission: Permission) -> None:
-        """Save a permission to in-memory storage."""
-        if permission.permission_id:
-            self.permissions[permission.permission_id] = permission
+        """Save a permission to in-memory storage.
+        
+        A user holds at most one permission per room, so saving a permission
+        for an existing (user_id, room_id) pair replaces the previous one.
+        """
+        if not permission.permission_id:
+            return
+        
+        # Drop index entries of a stored version whose user or room changed
+        previous = self.permissions.get(permission.permission_id)
+        if previous is not None:
+            self._unindex_permission(previous)
+        
+        # Drop the permission currently held for the same user and room
+        replaced = self.get_permission(permission.user_id, permission.room_id)
+        if replaced is not None:
+            self._unindex_permission(replaced)
+            self.permissions.pop(replaced.permission_id, None)
+        
+        self.permissions[permission.permission_id] = permission
+        self.user_permissions.setdefault(permission.user_id, {})[permission.room_id] = permission
     
     def delete_permission(self, user_id: str, room_id: str) -> None:
-        """Delete a permission by setting it as inactive."""
-        for permission in self.permissions.values():
-            if (permission.user_id == user_id and 
-                permission.room_id == room_id and 
-                permission.is_active):
-                permission.is_active = False
-                break
+        """Delete the permission of a user for a specific room."""
+        permission = self.get_permission(user_id, room_id)
+        if permission is None:
+            return
+        
+        self._unindex_permission(permission)
+        self.permissions.pop(permission.permission_id, None)
+    
+    def save_permission_change(self, change: PermissionChange) -> None:
+        """Append a change to the permission journal."""
+        self.permission_journal.append(change)
+    
+    def apply_permission_change(self, change: PermissionChange, permission: Optional[Permission]) -> None:
+        """Save the permission resulting from a change and journal the change, all or nothing.
+        
+        ``permission`` is the permission held after the change, None if the
+        change revoked it.
+        """
+        if permission is not None:
+            self.save_permission(permission)
+        else:
+            self.delete_permission(change.user_id, change.room_id)
+        self.save_permission_change(change)
+    
+    def get_permission_changes(self,
+                               user_id: str,
+                               start_date: Optional[datetime] = None,
+                               end_date: Optional[datetime] = None) -> List[PermissionChange]:
+        """Get the permission changes of a user, oldest first."""
+        return self.permission_journal.changes_for_user(user_id, start_date, end_date)
+    
+    def get_users_with_access(self, room_id: str, timestamp: datetime) -> List[str]:
+        """Get the users who held a permission for a room at a point in time."""
+        return self.permission_journal.users_with_access(room_id, timestamp)
+    
+    def get_permission_version(self) -> int:
+        """Get the ID of the latest permission change (0 if there is none)."""
+        return len(self.permission_journal)
+    
+    def get_permission_changes_since(self, version: int, until: int) -> List[PermissionChange]:
+        """Get the permission changes with IDs in (version, until], oldest first."""
+        return self.permission_journal.changes[version:until]
+    
+    def get_user_permission_version(self, user_id: str) -> int:
+        """Get the ID of the latest permission change of a user (0 if there is none)."""
+        positions = self.permission_journal.user_changes.get(user_id)
+        return self.permission_journal.changes[positions[-1]].change_id if positions else 0
+    
+    def get_access_log_version(self) -> int:
+        """Get a version that changes with every saved access log, for report caching."""
+        return len(self.access_logs)
+    
+    def get_user_version(self) -> int:
+        """Get a version that changes with every user change, for report caching."""
+        return self.user_version
     
     def get_access_logs(self, 
                        user_id: Optional[str] = None,
                        room_id: Optional[str] = None,
-                       limit: int = 100) -> List[AccessLog]:
-        """Get access logs with optional filters."""
-        filtered_logs = self.access_logs
-        
-        if user_id:
-            filtered_logs = [log for log in filtered_logs if log.user_id == user_id]
-        
-        if room_id:
-            filtered_logs = [log for log in filtered_logs if log.room_id == room_id]
+                       limit: int = 100,
+                       start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None) -> List[AccessLog]:
+        """Get access logs with optional filters, most recent first."""
+        return self.access_logs.query(user_id, room_id, start_date, end_date, limit)
+    
+    def iter_access_logs(self,
+                         user_id: Optional[str] = None,
+                         room_id: Optional[str] = None,
+                         start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None,
+                         chunk_size: int = 1000) -> Iterator[List[AccessLog]]:
+        """Iterate over access logs with optional filters in chunks, oldest first."""
+        return self.access_logs.iter_chunks(user_id, room_id, start_date, end_date, chunk_size)
+    
+    def get_denied_access_logs(self,
+                               start_date: Optional[datetime] = None,
+                               end_date: Optional[datetime] = None,
+                               offset: int = 0,
+                               limit: int = 100) -> Tuple[List[AccessLog], int]:
+        """Get a page of denied access attempts, most recent first, and their total count."""
+        return self.access_logs.query_denied(start_date, end_date, offset, limit)
+    
+    def get_access_counts(self,
+                          start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Count the accesses per room and per user within [start_date, end_date].
         
-        # Return most recent first, limited
-        return sorted(filtered_logs, key=lambda x: x.timestamp, reverse=True)[:limit]
+        Whole hours are read from the rollups and only the partial hours at
+        either end of the range are counted from the access log indexes.
+        """
+        start_date = normalize_timestamp(start_date) if start_date else None
+        end_date = normalize_timestamp(end_date) if end_date else None
+        room_counts = self.access_rollups.room_counts(start_date, end_date)
+        user_counts = self.access_rollups.user_counts(start_date, end_date)
+        for edge_start, edge_end in partial_hours(start_date, end_date):
+            add_counts(room_counts, self.access_logs.room_counts(edge_start, edge_end))
+            add_counts(user_counts, self.access_logs.user_counts(edge_start, edge_end))
+        return room_counts, user_counts
     
     def get_all_users(self) -> List[User]:
         """Get all users."""
         return list(self.users.values())
+    
+    def close(self) -> None:
+        """Release storage resources (nothing to release in memory)."""
+        pass
+    
+    def _unindex_permission(self, permission: Permission) -> None:
+        """Remove a permission from the user/room index."""
+        rooms = self.user_permissions.get(permission.user_id)
+        if rooms is None or rooms.get(permission.room_id) is not permission:
+            return
+        
+        del rooms[permission.room_id]
+        if not rooms:
+            del self.user_permissions[permission.user_id]
@@ -0,0 +1,93 @@
+"""Registry of the latest status of every lock device."""
+
+from typing import Dict, List, Optional, Set
+
+from ..models import DeviceStatus
+from .gateway_liveness import GatewayLivenessMonitor
+
+
+class DeviceRegistry:
+    """Latest status per device, indexed by device and by gateway.
+
+    The number of online, active and low battery devices is kept as
+    running counters, adjusted in O(1) by every status update, so reports
+    never scan the devices. A device is active while status messages keep
+    arriving within ``active_timeout`` seconds; activity is tracked with
+    the same deadline heap as gateway liveness.
+    """
+
+    def __init__(self, active_timeout: float, low_battery_threshold: int):
+        self.low_battery_threshold = low_battery_threshold
+        self.devices: Dict[str, DeviceStatus] = {}
+        self.gateway_devices: Dict[str, Set[str]] = {}  # gateway_id -> device_ids
+        self.online_count = 0
+        self.low_battery_count = 0
+        self.activity = GatewayLivenessMonitor(active_timeout, lambda device_id: None)
+
+    @property
+    def active_count(self) -> int:
+        """Number of devices heard from within the activity timeout."""
+        return self.activity.online_count
+
+    def update(self, status: DeviceStatus) -> None:
+        """Store the latest status of a device."""
+        previous = self.devices.get(status.device_id)
+        if previous is not None:
+            self._count(previous, -1)
+            if previous.gateway_id != status.gateway_id:
+                self._unindex(previous)
+
+        self.devices[status.device_id] = status
+        self._count(status, 1)
+        if status.gateway_id is not None:
+            self.gateway_devices.setdefault(status.gateway_id, set()).add(status.device_id)
+        self.activity.beat(status.device_id)
+
+    def remove(self, device_id: str) -> None:
+        """Forget a device."""
+        status = self.devices.pop(device_id, None)
+        if status is not None:
+            self._count(status, -1)
+            self._unindex(status)
+            self.activity.mark_offline(device_id)
+
+    def remove_gateway(self, gateway_id: str) -> None:
+        """Forget every device behind a gateway."""
+        for device_id in list(self.gateway_devices.get(gateway_id, ())):
+            self.remove(device_id)
+
+    def get_device(self, device_id: str) -> Optional[DeviceStatus]:
+        """Get the latest status of a device."""
+        return self.devices.get(device_id)
+
+    def get_gateway_devices(self, gateway_id: str) -> List[DeviceStatus]:
+        """Get the latest status of all devices behind a gateway."""
+        return [self.devices[device_id] for device_id in self.gateway_devices.get(gateway_id, ())]
+
+    def is_low_battery(self, status: DeviceStatus) -> bool:
+        """Check whether a device reported a battery level below the threshold."""
+        return status.battery_level is not None and status.battery_level < self.low_battery_threshold
+
+    def stats(self) -> Dict[str, int]:
+        """Get the device counters."""
+        return {
+            "total": len(self.devices),
+            "online": self.online_count,
+            "active": self.active_count,
+            "low_battery": self.low_battery_count
+        }
+
+    def _count(self, status: DeviceStatus, delta: int) -> None:
+        """Add a status to (delta=1) or remove it from (delta=-1) the counters."""
+        if status.is_online:
+            self.online_count += delta
+        if self.is_low_battery(status):
+            self.low_battery_count += delta
+
+    def _unindex(self, status: DeviceStatus) -> None:
+        """Remove a device from the index of its gateway."""
+        device_ids = self.gateway_devices.get(status.gateway_id)
+        if device_ids is not None:
+            device_ids.discard(status.device_id)
+            if not device_ids:
+                del self.gateway_devices[status.gateway_id]
@@ -0,0 +1,66 @@
+"""Streaming CSV and NDJSON encoding for exports."""
+
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+from datetime import datetime
+import csv
+import io
+import json
+import zlib
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def encode_rows(chunks: Iterable[List[Dict[str, Any]]],
+                export_format: str,
+                fields: Sequence[str]) -> Iterator[bytes]:
+    """Encode chunks of rows as CSV (with a header of ``fields``) or NDJSON.
+
+    Every chunk is encoded and yielded on its own, so only one chunk is
+    held in memory at a time however many rows are exported.
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    if export_format == "ndjson":
+        for rows in chunks:
+            yield "".join(json.dumps(row, default=_json_value) + "\n" for row in rows).encode()
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in chunks:
+        writer.writerows([_csv_value(row.get(field)) for field in fields] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: nothing was exported
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a stream of byte chunks into a gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None:
+        return ""
+    return value
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
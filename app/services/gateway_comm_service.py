@@ -1,68 +1,266 @@
-"""Gateway Communication Service implementation - Simplified version."""
+"""Gateway Communication Service implementation."""
 
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+from collections import deque
 from datetime import datetime
+import asyncio
+import base64
 import uuid
 
 from ..models import Gateway, AccessLog, DeviceStatus
+from ..core.config import settings
+from ..core.logging import get_logger
+from .access_log_store import normalize_timestamp
+from .card_sync import DIGEST_BUCKETS, digest_root, decode_digest
+from .device_registry import DeviceRegistry
+from .gateway_liveness import GatewayLivenessMonitor
+from .gateway_transport import GatewayConnection
+
+
+logger = get_logger(__name__)
 
 
 class GatewayCommService:
-    """Service for communicating with gateway devices (simplified)."""
+    """Service for communicating with gateway devices.
+    
+    Every registered gateway with an IP address gets one persistent
+    GatewayConnection while the service is running. Gateways that send no
+    heartbeat within ``settings.gateway_timeout`` seconds are marked offline.
+    """
     
     def __init__(self):
         self.gateway_connections: Dict[str, Gateway] = {}
-        self.sent_messages: list = []  # Store sent messages for tracking
+        self.room_gateways: Dict[str, Set[str]] = {}  # room_id -> gateway_ids
+        self.transports: Dict[str, GatewayConnection] = {}  # gateway_id -> connection
+        self.sent_messages: deque = deque(maxlen=1000)  # Recently sent messages for tracking
+        self.liveness = GatewayLivenessMonitor(settings.gateway_timeout, self.handle_connection_loss)
+        self.devices = DeviceRegistry(settings.device_active_timeout, settings.device_low_battery_percent)
+        self.permission_manager = None  # PermissionManager, attached by the container
+        self.acked_versions: Dict[str, int] = {}  # gateway_id -> last synced permission version
+        self._sync_tasks: Set[asyncio.Task] = set()
+        self._started = False
     
-    def start(self):
-        """Start the gateway communication service (simplified)."""
-        print("Gateway Communication Service started")
+    async def start(self):
+        """Start the gateway communication service and connect to all gateways."""
+        self._started = True
+        self.liveness.start()
+        self.devices.activity.start()
+        for gateway in self.gateway_connections.values():
+            self._open_transport(gateway)
+        logger.info("Gateway communication service started")
     
-    def stop(self):
-        """Stop the gateway communication service (simplified)."""
-        print("Gateway Communication Service stopped")
+    async def stop(self):
+        """Stop the gateway communication service and close all connections."""
+        self._started = False
+        for task in list(self._sync_tasks):
+            task.cancel()
+        transports = list(self.transports.values())
+        self.transports.clear()
+        await asyncio.gather(*(transport.close() for transport in transports))
+        await self.liveness.stop()
+        await self.devices.activity.stop()
+        logger.info("Gateway communication service stopped")
     
-    def register_gateway(self, gateway: Gateway) -> None:
+    async def register_gateway(self, gateway: Gateway) -> None:
         """Register a new gateway connection."""
+        await self._close_transport(gateway.gateway_id)
+        self._unindex_rooms(gateway.gateway_id)
         self.gateway_connections[gateway.gateway_id] = gateway
-        print(f"Gateway {gateway.gateway_id} registered")
+        for room_id in gateway.rooms:
+            self.room_gateways.setdefault(room_id, set()).add(gateway.gateway_id)
+        if gateway.is_online:
+            self.liveness.beat(gateway.gateway_id)
+        else:
+            self.liveness.mark_offline(gateway.gateway_id)
+        if self._started:
+            self._open_transport(gateway)
+        logger.info("Gateway registered", extra={"gateway_id": gateway.gateway_id})
     
-    def unregister_gateway(self, gateway_id: str) -> None:
+    async def unregister_gateway(self, gateway_id: str) -> None:
         """Unregister a gateway connection."""
         if gateway_id in self.gateway_connections:
+            await self._close_transport(gateway_id)
+            self._unindex_rooms(gateway_id)
+            self.liveness.mark_offline(gateway_id)
+            self.acked_versions.pop(gateway_id, None)
+            self.devices.remove_gateway(gateway_id)
             del self.gateway_connections[gateway_id]
-            print(f"Gateway {gateway_id} unregistered")
+            logger.info("Gateway unregistered", extra={"gateway_id": gateway_id})
+    
+    def record_heartbeat(self, gateway_id: str) -> None:
+        """Record that a gateway was heard from, marking it online."""
+        gateway = self.gateway_connections.get(gateway_id)
+        if gateway is not None:
+            gateway.is_online = True
+            gateway.last_heartbeat = datetime.now()
+            self.liveness.beat(gateway_id)
+    
+    def get_status_counts(self) -> Dict[str, int]:
+        """Get the number of online and offline gateways."""
+        online = self.liveness.online_count
+        return {
+            "total": len(self.gateway_connections),
+            "online": online,
+            "offline": len(self.gateway_connections) - online
+        }
+    
+    def is_reachable(self, gateway_id: str) -> bool:
+        """Check whether a gateway is online and its connection is open."""
+        gateway = self.gateway_connections.get(gateway_id)
+        transport = self.transports.get(gateway_id)
+        return (
+            gateway is not None and gateway.is_online
+            and transport is not None and transport.connected.is_set()
+        )
+    
+    def get_gateways_for_room(self, room_id: str) -> List[str]:
+        """Get the IDs of the gateways serving a room."""
+        return list(self.room_gateways.get(room_id, ()))
     
-    def send_card_update(self, gateway_id: str, card_data: bytes) -> bool:
+    async def send_card_update(self, gateway_id: str, card_data: bytes) -> bool:
         """Send card update data to a specific gateway."""
-        return True
+        reply = await self._send_message(gateway_id, "card_update", {
+            "card_data": base64.b64encode(card_data).decode("ascii")
+        })
+        return reply is not None and reply.get("status") == "ok"
+    
+    async def send_card_updates(self, gateway_id: str, cards: List[bytes]) -> List[bool]:
+        """Send many cards to a gateway, batched into messages of ``card_batch_size``.
+        
+        Returns whether each card was delivered.
+        """
+        batch_size = settings.card_batch_size
+        batches = [cards[start:start + batch_size] for start in range(0, len(cards), batch_size)]
+        
+        async def send_batch(batch: List[bytes]) -> List[bool]:
+            reply = await self._send_message(gateway_id, "card_batch", {
+                "cards": [base64.b64encode(card_data).decode("ascii") for card_data in batch]
+            })
+            if reply is None or reply.get("status") != "ok":
+                return [False] * len(batch)
+            results = reply.get("results")
+            if not isinstance(results, list) or len(results) != len(batch):
+                return [True] * len(batch)
+            return [bool(result) for result in results]
+        
+        # Batches share the multiplexed connection and are sent concurrently
+        results = await asyncio.gather(*(send_batch(batch) for batch in batches))
+        return [delivered for batch_results in results for delivered in batch_results]
     
     def receive_access_log(self, access_log_data: dict) -> AccessLog:
         """Process incoming access log from gateway."""
-        access_log = AccessLog(
-            log_id=str(uuid.uuid4()),
-            timestamp=datetime.fromisoformat(access_log_data["timestamp"]),
-            user_id=access_log_data["user_id"],
-            room_id=access_log_data["room_id"]
-        )
+        access_log = self._parse_access_log(access_log_data)
         
-        print(f"Received access log: {access_log}")
+        logger.info("Access log received", extra={
+            "event": "access_log.received",
+            "user_id": access_log.user_id,
+            "room_id": access_log.room_id
+        })
         return access_log
     
-    def receive_device_status(self, status_data: dict) -> DeviceStatus:
+    def receive_device_status(self, status_data: dict, gateway_id: Optional[str] = None) -> DeviceStatus:
         """Process incoming device status from gateway."""
-        device_status = DeviceStatus(
+        device_status = self._parse_device_status(status_data, gateway_id)
+        self.devices.update(device_status)
+        
+        logger.info("Device status received", extra={
+            "event": "device_status.received",
+            "gateway_id": gateway_id,
+            "device_id": device_status.device_id
+        })
+        return device_status
+    
+    def receive_telemetry(self, gateway_id: str, batch: dict) -> Tuple[List[AccessLog], List[DeviceStatus], List[Dict[str, Any]]]:
+        """Process a batch of access logs and device statuses from a gateway.
+        
+        Invalid events, and fields that are not lists, are reported in the
+        returned error list instead of failing the whole batch.
+        """
+        self.record_heartbeat(gateway_id)
+        access_logs: List[AccessLog] = []
+        device_statuses: List[DeviceStatus] = []
+        errors: List[Dict[str, Any]] = []
+        
+        for index, access_log_data in enumerate(self._telemetry_items(batch, "access_logs", errors)):
+            try:
+                if not isinstance(access_log_data, dict):
+                    raise TypeError("Access log must be a JSON object")
+                access_logs.append(self._parse_access_log(access_log_data))
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append({"kind": "access_log", "index": index, "error": str(e)})
+        
+        for index, status_data in enumerate(self._telemetry_items(batch, "device_status", errors)):
+            try:
+                if not isinstance(status_data, dict):
+                    raise TypeError("Device status must be a JSON object")
+                device_status = self._parse_device_status(status_data, gateway_id)
+                self.devices.update(device_status)
+                device_statuses.append(device_status)
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append({"kind": "device_status", "index": index, "error": str(e)})
+        
+        return access_logs, device_statuses, errors
+    
+    def _telemetry_items(self, batch: dict, field: str, errors: List[Dict[str, Any]]) -> list:
+        """Get a list field of a telemetry batch, recording an error if it is not a list."""
+        items = batch.get(field, [])
+        if not isinstance(items, list):
+            errors.append({"kind": field, "error": f"{field} must be a list"})
+            return []
+        return items
+    
+    def _parse_access_log(self, access_log_data: dict) -> AccessLog:
+        """Build an access log from the data sent by a gateway."""
+        return AccessLog(
+            log_id=str(uuid.uuid4()),
+            timestamp=normalize_timestamp(datetime.fromisoformat(access_log_data["timestamp"])),
+            user_id=access_log_data["user_id"],
+            room_id=access_log_data["room_id"],
+            access_granted=access_log_data.get("access_granted", True),
+            device_id=access_log_data.get("device_id")
+        )
+    
+    def _parse_device_status(self, status_data: dict, gateway_id: Optional[str] = None) -> DeviceStatus:
+        """Build a device status from the data sent by a gateway."""
+        return DeviceStatus(
             device_id=status_data["device_id"],
             is_online=status_data["status"],
-            last_heartbeat=datetime.fromisoformat(status_data["last_seen"])
+            last_heartbeat=normalize_timestamp(datetime.fromisoformat(status_data["last_seen"])),
+            gateway_id=gateway_id,
+            battery_level=status_data.get("battery_level")
         )
-        
-        print(f"Received device status: {device_status}")
-        return device_status
     
-    def sync_with_gateway(self, gateway_id: str) -> bool:
-        """Synchronize data with a specific gateway."""
-        return True
+    async def sync_with_gateway(self, gateway_id: str) -> Optional[Dict[str, Any]]:
+        """Synchronize the cards of a gateway; return sync statistics or None on failure.
+        
+        A gateway with a known acknowledged version only receives the cards
+        changed since. Drift reported by the gateway's digest root, or an
+        unknown version, is repaired by resending only mismatched buckets.
+        """
+        gateway = self.gateway_connections.get(gateway_id)
+        if gateway is None or self.permission_manager is None:
+            return None
+        
+        self.permission_manager.sync_changes()
+        version = self.permission_manager.permission_version
+        acked_version = self.acked_versions.get(gateway_id)
+        delta = None
+        if acked_version is not None:
+            delta = self.permission_manager.get_card_changes(gateway.rooms, acked_version)
+        if delta is None:
+            return await self._reconcile_cards(gateway, version)
+        
+        cards, removed = delta
+        reply = await self._send_card_sync(gateway_id, version, cards, removed)
+        if reply is None:
+            return None
+        stats = {"mode": "delta", "version": version, "cards_sent": len(cards), "cards_removed": len(removed)}
+        
+        expected = self.permission_manager.get_card_digest(gateway.rooms)
+        if reply.get("root") != digest_root(expected.buckets):
+            return await self._reconcile_cards(gateway, version)
+        self.acked_versions[gateway_id] = version
+        return stats
     
     def handle_connection_loss(self, gateway_id: str) -> None:
         """Handle connection loss with a gateway (simplified)."""
@@ -70,15 +268,137 @@ class GatewayCommService:
             gateway = self.gateway_connections[gateway_id]
             gateway.is_online = False
             gateway.last_heartbeat = None
-            print(f"Connection lost with gateway {gateway_id}")
+            self.liveness.mark_offline(gateway_id)
+            logger.warning("Connection lost with gateway", extra={"gateway_id": gateway_id})
     
-    def _send_message(self, message) -> bool:
-        """Send a message to a gateway (simplified simulation)."""
-        return True
+    async def _send_message(self, gateway_id: str, message_type: str,
+                            payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send a message to a gateway and return its reply (None on failure)."""
+        transport = self.transports.get(gateway_id)
+        if transport is None:
+            return None
+        
+        try:
+            reply = await transport.request(message_type, payload)
+        except (TimeoutError, ConnectionError):
+            return None
+        
+        self.sent_messages.append({
+            "type": message_type,
+            "gateway_id": gateway_id,
+            "sent_at": datetime.now()
+        })
+        return reply
+    
+    async def _reconcile_cards(self, gateway: Gateway, version: int) -> Optional[Dict[str, Any]]:
+        """Resend the buckets whose digest differs from the gateway's."""
+        digest = self.permission_manager.get_card_digest(gateway.rooms)
+        expected = list(digest.buckets)
+        
+        reply = await self._send_message(gateway.gateway_id, "card_digest", {"bucket_count": DIGEST_BUCKETS})
+        if reply is None or reply.get("status") != "ok":
+            return None
+        try:
+            actual = decode_digest(reply["buckets"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        
+        mismatched = {
+            index for index, bucket in enumerate(expected)
+            if index >= len(actual) or actual[index] != bucket
+        }
+        resent = {
+            user_id: self.permission_manager.generate_card_data(user_id)
+            for user_id in digest.users_in_buckets(mismatched)
+        }
+        if mismatched:
+            reply = await self._send_card_sync(
+                gateway.gateway_id, version, resent, replace_buckets=sorted(mismatched)
+            )
+            if reply is None:
+                return None
+        
+        self.acked_versions[gateway.gateway_id] = version
+        return {
+            "mode": "reconcile",
+            "version": version,
+            "buckets_resent": len(mismatched),
+            "cards_sent": len(resent),
+            "cards_removed": 0
+        }
+    
+    async def _send_card_sync(self, gateway_id: str, version: int, cards: Dict[str, bytes],
+                              removed: Set[str] = frozenset(),
+                              replace_buckets: List[int] = ()) -> Optional[Dict[str, Any]]:
+        """Send a batch of card changes; replaced buckets are cleared before storing the cards."""
+        reply = await self._send_message(gateway_id, "card_sync", {
+            "version": version,
+            "bucket_count": DIGEST_BUCKETS,
+            "cards": {
+                user_id: base64.b64encode(card_data).decode("ascii")
+                for user_id, card_data in cards.items()
+            },
+            "removed": sorted(removed),
+            "replace_buckets": list(replace_buckets)
+        })
+        if reply is None or reply.get("status") != "ok":
+            return None
+        return reply
+    
+    def _open_transport(self, gateway: Gateway) -> None:
+        """Open the persistent connection to a gateway with a known address."""
+        if not gateway.ip_address or gateway.gateway_id in self.transports:
+            return
+        transport = GatewayConnection(
+            gateway.gateway_id,
+            gateway.ip_address,
+            gateway.port or settings.gateway_port,
+            request_timeout=settings.gateway_timeout,
+            keepalive_interval=settings.gateway_keepalive_interval,
+            on_connect=self._on_gateway_connected,
+            on_disconnect=self.handle_connection_loss,
+            on_heartbeat=self.record_heartbeat
+        )
+        self.transports[gateway.gateway_id] = transport
+        transport.start()
+    
+    def _on_gateway_connected(self, gateway_id: str) -> None:
+        """Mark a (re)connected gateway online and bring its cards up to date."""
+        self.record_heartbeat(gateway_id)
+        if self.permission_manager is not None:
+            task = asyncio.create_task(self.sync_with_gateway(gateway_id))
+            self._sync_tasks.add(task)
+            task.add_done_callback(self._sync_tasks.discard)
+    
+    async def _close_transport(self, gateway_id: str) -> None:
+        """Close the connection to a gateway, if one is open."""
+        transport = self.transports.pop(gateway_id, None)
+        if transport is not None:
+            await transport.close()
+    
+    def _unindex_rooms(self, gateway_id: str) -> None:
+        """Remove a gateway from the room index."""
+        gateway = self.gateway_connections.get(gateway_id)
+        if gateway is None:
+            return
+        for room_id in gateway.rooms:
+            gateway_ids = self.room_gateways.get(room_id)
+            if gateway_ids is not None:
+                gateway_ids.discard(gateway_id)
+                if not gateway_ids:
+                    del self.room_gateways[room_id]
+        
+        # The card digest of the room set is kept as long as another gateway uses it
+        rooms = set(gateway.rooms)
+        if self.permission_manager is not None and not any(
+            set(other.rooms) == rooms
+            for other_id, other in self.gateway_connections.items() if other_id != gateway_id
+        ):
+            self.permission_manager.drop_card_digest(rooms)
     
     def get_sent_messages(self) -> list:
-        """Get all sent messages (for testing/debugging)."""
-        return self.sent_messages
+        """Get recently sent messages (for testing/debugging)."""
+        return list(self.sent_messages)
     
     def clear_sent_messages(self) -> None:
         """Clear sent messages history."""
@@ -0,0 +1,106 @@
+"""Heartbeat-based gateway liveness tracking."""
+
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import time
+
+
+class GatewayLivenessMonitor:
+    """Marks gateways offline when no heartbeat arrived within ``timeout`` seconds.
+
+    Every online gateway has one entry in a deadline heap. A heartbeat only
+    records the time it was seen; when a deadline comes due and the gateway
+    was heard from since, the entry is pushed back with the new deadline.
+    Heartbeats are therefore O(1) and a check only touches gateways whose
+    deadline passed. The background task sleeps until the earliest deadline
+    instead of scanning all gateways periodically.
+    """
+
+    def __init__(self, timeout: float, on_timeout: Callable[[str], None]):
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+        self.last_seen: Dict[str, float] = {}  # online gateway_id -> monotonic time
+        self._deadlines: List[Tuple[float, str]] = []
+        self._scheduled: Set[str] = set()  # gateway_ids with a deadline heap entry
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def online_count(self) -> int:
+        """Number of gateways currently considered online."""
+        return len(self.last_seen)
+
+    def is_online(self, gateway_id: str) -> bool:
+        """Check whether a gateway is currently considered online."""
+        return gateway_id in self.last_seen
+
+    def beat(self, gateway_id: str, now: Optional[float] = None) -> None:
+        """Record a heartbeat, marking the gateway online."""
+        now = time.monotonic() if now is None else now
+        self.last_seen[gateway_id] = now
+        if gateway_id not in self._scheduled:
+            self._scheduled.add(gateway_id)
+            heapq.heappush(self._deadlines, (now + self.timeout, gateway_id))
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def mark_offline(self, gateway_id: str) -> None:
+        """Stop tracking a gateway until its next heartbeat."""
+        # Its heap entry is dropped lazily when it comes due
+        self.last_seen.pop(gateway_id, None)
+
+    def check(self, now: Optional[float] = None) -> List[str]:
+        """Time out every gateway whose deadline passed; return their IDs."""
+        now = time.monotonic() if now is None else now
+        expired = []
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, gateway_id = heapq.heappop(self._deadlines)
+            last_seen = self.last_seen.get(gateway_id)
+            if last_seen is None:
+                # Went offline or was removed since
+                self._scheduled.discard(gateway_id)
+            elif last_seen + self.timeout > now:
+                # Heard from since the entry was pushed
+                heapq.heappush(self._deadlines, (last_seen + self.timeout, gateway_id))
+            else:
+                self._scheduled.discard(gateway_id)
+                del self.last_seen[gateway_id]
+                expired.append(gateway_id)
+
+        for gateway_id in expired:
+            self.on_timeout(gateway_id)
+        return expired
+
+    def start(self) -> None:
+        """Start the background task timing out silent gateways."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        """Sleep until the earliest deadline, then check it."""
+        while True:
+            if not self._deadlines:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            # With a fixed timeout, new deadlines are never earlier than the first one
+            delay = self._deadlines[0][0] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.check()
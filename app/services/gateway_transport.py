@@ -0,0 +1,225 @@
+"""Asyncio TCP transport for gateway connections.
+
+Messages are JSON objects sent as frames with a 4-byte big-endian length
+prefix. Every request carries an ``id``; the gateway answers with a
+message whose ``reply_to`` holds that id, so many requests can be in
+flight on one connection at the same time.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import asyncio
+import json
+import struct
+
+
+MAX_FRAME_SIZE = 1024 * 1024
+_LENGTH = struct.Struct(">I")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    """Read one length-prefixed JSON message."""
+    header = await reader.readexactly(_LENGTH.size)
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds the maximum frame size")
+    return json.loads(await reader.readexactly(length))
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    """Encode a message as a length-prefixed JSON frame."""
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return _LENGTH.pack(len(body)) + body
+
+
+class GatewayConnection:
+    """A long-lived, multiplexed connection to one gateway.
+
+    The connection is opened in the background and re-opened with
+    exponential backoff whenever it drops. Outgoing messages wait in a
+    per-gateway send queue while the gateway is unreachable. Keepalive
+    pings detect connections that died silently.
+    """
+
+    def __init__(
+        self,
+        gateway_id: str,
+        host: str,
+        port: int,
+        request_timeout: float = 30.0,
+        keepalive_interval: float = 10.0,
+        min_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        queue_size: int = 1000,
+        on_connect: Optional[Callable[[str], None]] = None,
+        on_disconnect: Optional[Callable[[str], None]] = None,
+        on_heartbeat: Optional[Callable[[str], None]] = None,
+        on_message: Optional[Callable[[str, Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]] = None
+    ):
+        self.gateway_id = gateway_id
+        self.host = host
+        self.port = port
+        self.request_timeout = request_timeout
+        self.keepalive_interval = keepalive_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.on_heartbeat = on_heartbeat
+        self.on_message = on_message
+
+        self.connected = asyncio.Event()
+        self.send_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._in_flight: Set[int] = set()  # ids of requests written to the socket
+        self._next_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start connecting in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Close the connection and stop reconnecting.
+
+        Requests still waiting for a reply, including those not yet sent,
+        fail with ConnectionError.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self.send_queue.empty():
+            self.send_queue.get_nowait()
+        error = ConnectionError(f"Connection to gateway {self.gateway_id} closed")
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, message_type: str, payload: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a request and wait for the gateway's reply.
+
+        Raises TimeoutError if no reply arrives in time, including while
+        the gateway is unreachable.
+        """
+        self._next_id += 1
+        message_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            message = {"id": message_id, "type": message_type, "payload": payload or {}}
+            async with asyncio.timeout(timeout or self.request_timeout):
+                await self.send_queue.put(message)
+                return await future
+        finally:
+            self._pending.pop(message_id, None)
+            self._in_flight.discard(message_id)
+
+    async def _run(self) -> None:
+        """Keep the connection open, reconnecting with exponential backoff."""
+        backoff = self.min_backoff
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = self.min_backoff
+            self.connected.set()
+            if self.on_connect:
+                self.on_connect(self.gateway_id)
+
+            tasks = [
+                asyncio.create_task(self._read_loop(reader)),
+                asyncio.create_task(self._write_loop(writer)),
+                asyncio.create_task(self._keepalive_loop()),
+            ]
+            try:
+                # Any of the loops ending means the connection is unusable
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.connected.clear()
+                writer.close()
+                self._fail_pending(ConnectionError(f"Connection to gateway {self.gateway_id} lost"))
+                if self.on_disconnect:
+                    self.on_disconnect(self.gateway_id)
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        """Dispatch incoming replies, pings and gateway-initiated messages."""
+        while True:
+            try:
+                message = await read_frame(reader)
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                return
+
+            if self.on_heartbeat:
+                self.on_heartbeat(self.gateway_id)
+
+            reply_to = message.get("reply_to")
+            if reply_to is not None:
+                future = self._pending.get(reply_to)
+                if future is not None and not future.done():
+                    future.set_result(message)
+            elif message.get("type") == "ping":
+                self._send_nowait({"type": "pong", "reply_to": message.get("id")})
+            elif self.on_message:
+                reply = await self.on_message(self.gateway_id, message)
+                if reply is not None:
+                    self._send_nowait({**reply, "reply_to": message.get("id")})
+
+    async def _write_loop(self, writer: asyncio.StreamWriter) -> None:
+        """Write queued messages, batching whatever is queued before each drain."""
+        while True:
+            self._write(writer, await self.send_queue.get())
+            while not self.send_queue.empty():
+                self._write(writer, self.send_queue.get_nowait())
+            try:
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    def _write(self, writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+        """Write one message unless it is a request that already timed out."""
+        message_id = message.get("id")
+        if message_id is not None:
+            if message_id not in self._pending:
+                return
+            self._in_flight.add(message_id)
+        writer.write(encode_frame(message))
+
+    async def _keepalive_loop(self) -> None:
+        """Ping the gateway regularly; return if a ping goes unanswered."""
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await self.request("ping", timeout=self.keepalive_interval)
+            except (TimeoutError, ConnectionError):
+                return
+
+    def _send_nowait(self, message: Dict[str, Any]) -> None:
+        """Queue a reply without waiting; replies are dropped if the queue is full."""
+        try:
+            self.send_queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def _fail_pending(self, error: Exception) -> None:
+        """Fail the requests that were sent but not answered.
+
+        Requests still in the send queue are sent after reconnecting.
+        """
+        for message_id in self._in_flight:
+            future = self._pending.get(message_id)
+            if future is not None and not future.done():
+                future.set_exception(error)
+        self._in_flight.clear()
@@ -0,0 +1,114 @@
+"""Incrementally maintained cache of active permissions."""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from ..models import Permission
+
+
+class ActivePermissionCache:
+    """Active permissions indexed by user and by room.
+
+    Users are loaded lazily on their first lookup, counted as a miss;
+    later lookups are hits. Users found without permissions, or whose
+    last permission was revoked, are kept in a separate LRU set of at
+    most ``max_empty_users`` entries, so repeated lookups of them hit as
+    well while probing unknown users cannot grow the cache without bound.
+    After ``warm`` has loaded every stored permission the cache is
+    complete and lookups no longer miss.
+    """
+
+    def __init__(self, max_empty_users: int = 10_000):
+        self.by_user: Dict[str, Dict[str, Permission]] = {}
+        self.by_room: Dict[str, Dict[str, Permission]] = {}
+        self.max_empty_users = max_empty_users
+        self.empty_users: "OrderedDict[str, None]" = OrderedDict()  # loaded users without permissions
+        self.complete = False
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self, permissions: Iterable[Permission]) -> None:
+        """Load every stored permission, making the cache complete."""
+        self.by_user.clear()
+        self.by_room.clear()
+        self.empty_users.clear()
+        for permission in permissions:
+            self._index(permission)
+        self.complete = True
+
+    def lookup(self, user_id: str) -> Optional[List[Permission]]:
+        """Get the cached permissions of a user, or None if they must be loaded."""
+        rooms = self.by_user.get(user_id)
+        if rooms is None and not self.complete:
+            if user_id not in self.empty_users:
+                self.misses += 1
+                return None
+            self.empty_users.move_to_end(user_id)
+        self.hits += 1
+        return list(rooms.values()) if rooms else []
+
+    def load_user(self, user_id: str, permissions: Iterable[Permission]) -> None:
+        """Store the permissions of a user loaded after a miss."""
+        loaded = False
+        for permission in permissions:
+            self._index(permission)
+            loaded = True
+        if not loaded:
+            self._add_empty(user_id)
+
+    def get_room_permissions(self, room_id: str) -> List[Permission]:
+        """Get the cached permissions granting access to a room."""
+        return list(self.by_room.get(room_id, {}).values())
+
+    def apply(self, user_id: str, room_id: str, permission: Optional[Permission]) -> None:
+        """Apply the change of one (user_id, room_id) permission.
+
+        ``permission`` is the new permission, or None if it was revoked.
+        """
+        # Users that are not loaded yet pick the change up on their next miss
+        loaded = self.complete or user_id in self.by_user or user_id in self.empty_users
+        self._unindex(user_id, room_id)
+        if permission is not None and loaded:
+            self.empty_users.pop(user_id, None)
+            self._index(permission)
+        elif loaded and user_id not in self.by_user:
+            # The user's last permission was revoked
+            self._add_empty(user_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache size and hit/miss counters."""
+        return {
+            "users": len(self.by_user),
+            "empty_users": len(self.empty_users),
+            "rooms": len(self.by_room),
+            "permissions": sum(len(rooms) for rooms in self.by_user.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _index(self, permission: Permission) -> None:
+        """Add a permission to both indexes."""
+        self.by_user.setdefault(permission.user_id, {})[permission.room_id] = permission
+        self.by_room.setdefault(permission.room_id, {})[permission.user_id] = permission
+
+    def _add_empty(self, user_id: str) -> None:
+        """Remember a loaded user without permissions, evicting the least recently used."""
+        if self.complete or self.max_empty_users <= 0:
+            return
+        self.empty_users[user_id] = None
+        self.empty_users.move_to_end(user_id)
+        if len(self.empty_users) > self.max_empty_users:
+            self.empty_users.popitem(last=False)
+
+    def _unindex(self, user_id: str, room_id: str) -> None:
+        """Remove a permission from both indexes."""
+        rooms = self.by_user.get(user_id)
+        if rooms is not None:
+            rooms.pop(room_id, None)
+            if not rooms:
+                del self.by_user[user_id]
+        users = self.by_room.get(room_id)
+        if users is not None:
+            users.pop(user_id, None)
+            if not users:
+                del self.by_room[room_id]
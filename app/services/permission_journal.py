@@ -0,0 +1,112 @@
+"""Append-only permission change journal with time indexes."""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from datetime import datetime
+
+from ..models import PermissionChange
+
+
+class RoomAccessTimeline:
+    """Grant and revoke events of one room with periodic snapshots.
+
+    A snapshot of the users holding access is taken whenever the events
+    since the previous snapshot outnumber the users in it (and at least
+    ``MIN_SNAPSHOT_INTERVAL`` events). Asking who had access at time T
+    bisects to the last snapshot before T and replays the few events
+    after it, so no query replays the full history and snapshots take
+    memory proportional to the number of events.
+    """
+
+    MIN_SNAPSHOT_INTERVAL = 64
+
+    def __init__(self):
+        self.times: List[datetime] = []
+        self.events: List[Tuple[str, bool]] = []  # (user_id, has access after the event)
+        self.active: Set[str] = set()
+        self.snapshot_positions: List[int] = []  # number of events covered by each snapshot
+        self.snapshots: List[FrozenSet[str]] = []
+
+    def record(self, timestamp: datetime, user_id: str, has_access: bool) -> None:
+        """Append an event; timestamps must not decrease."""
+        last_position = self.snapshot_positions[-1] if self.snapshot_positions else 0
+        if len(self.events) - last_position >= max(self.MIN_SNAPSHOT_INTERVAL, len(self.active)):
+            self.snapshot_positions.append(len(self.events))
+            self.snapshots.append(frozenset(self.active))
+
+        self.times.append(timestamp)
+        self.events.append((user_id, has_access))
+        if has_access:
+            self.active.add(user_id)
+        else:
+            self.active.discard(user_id)
+
+    def users_at(self, timestamp: datetime) -> Set[str]:
+        """Get the users holding access at a point in time."""
+        position = bisect_right(self.times, timestamp)
+        snapshot = bisect_right(self.snapshot_positions, position) - 1
+        if snapshot >= 0:
+            users = set(self.snapshots[snapshot])
+            start = self.snapshot_positions[snapshot]
+        else:
+            users = set()
+            start = 0
+
+        for user_id, has_access in self.events[start:position]:
+            if has_access:
+                users.add(user_id)
+            else:
+                users.discard(user_id)
+        return users
+
+
+class PermissionJournal:
+    """Append-only journal of permission changes.
+
+    Changes are indexed per user (positions in the journal, in time order)
+    and per room (a RoomAccessTimeline), so both "all changes of user U"
+    and "who had access to room R at time T" take logarithmic time plus
+    the size of the answer.
+    """
+
+    def __init__(self):
+        self.changes: List[PermissionChange] = []
+        self.user_changes: Dict[str, List[int]] = {}  # user_id -> positions in changes
+        self.rooms: Dict[str, RoomAccessTimeline] = {}
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def append(self, change: PermissionChange) -> None:
+        """Add a change to the journal and its indexes."""
+        if self.changes and change.timestamp < self.changes[-1].timestamp:
+            # Keep the journal time-ordered if the clock went backwards
+            change.timestamp = self.changes[-1].timestamp
+        if change.change_id is None:
+            change.change_id = len(self.changes) + 1
+
+        self.user_changes.setdefault(change.user_id, []).append(len(self.changes))
+        self.changes.append(change)
+        self.rooms.setdefault(change.room_id, RoomAccessTimeline()).record(
+            change.timestamp, change.user_id, change.action != "revoked"
+        )
+
+    def changes_for_user(self,
+                         user_id: str,
+                         start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None) -> List[PermissionChange]:
+        """Get the changes of a user's permissions within [start_date, end_date], oldest first."""
+        positions = self.user_changes.get(user_id, [])
+        lo = bisect_left(positions, start_date, key=self._timestamp) if start_date else 0
+        hi = bisect_right(positions, end_date, key=self._timestamp) if end_date else len(positions)
+        return [self.changes[position] for position in positions[lo:hi]]
+
+    def users_with_access(self, room_id: str, timestamp: datetime) -> List[str]:
+        """Get the users who held a permission for a room at a point in time."""
+        timeline = self.rooms.get(room_id)
+        if timeline is None:
+            return []
+        return sorted(timeline.users_at(timestamp))
+
+    def _timestamp(self, position: int) -> datetime:
+        return self.changes[position].timestamp
@@ -1,19 +1,53 @@
 """Permission Manager service implementation."""
 
-from typing import List
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 import uuid
 from datetime import datetime
 
-from ..models import Permission, PermissionCreate, PermissionUpdate, TimeSlot
+from ..models import Permission, PermissionChange, PermissionCreate, PermissionUpdate, TimeSlot
+from ..core.config import settings
+from ..core.logging import get_logger
 from .database import Database
+from .card_cache import CardCache
+from .card_format import CARD_ENCODERS, card_size_report
+from .card_sync import CardChangeFeed, CardSetDigest
+from .access_decision import AccessDecisionEngine, AccessSchedule
+from .access_log_store import normalize_timestamp
+from .permission_cache import ActivePermissionCache
+
+
+logger = get_logger(__name__)
 
 
 class PermissionManager:
-    """Service for managing user permissions."""
+    """Service for managing user permissions.
+    
+    The permission, schedule and card caches live in this process. Worker
+    processes sharing a SQLite database see each other's changes through
+    the permission journal: before a cache is trusted, the latest change
+    ID in the database is compared with ``permission_version`` and newer
+    changes are applied (see ``sync_changes``).
+    """
     
-    def __init__(self, database: Database = None):
+    def __init__(self, database: Database = None, card_dispatcher=None):
         self.database = database or Database()
-        self.active_permissions: List[Permission] = []
+        self.card_dispatcher = card_dispatcher  # CardUpdateDispatcher, attached by the container
+        # Loaded lazily, see get_user_permissions
+        self.active_permissions = ActivePermissionCache(max_empty_users=settings.permission_cache_max_empty_users)
+        self.access_engine = AccessDecisionEngine(max_denied=settings.access_engine_max_denied_pairs)
+        # ID of the latest change in the permission journal, so versions survive restarts
+        self.permission_version = self.database.get_permission_version()
+        self.user_versions: Dict[str, int] = {}  # user_id -> version of last change, loaded lazily
+        self.card_changes = CardChangeFeed(settings.card_change_history)
+        # Changes before this process started are not in the feed; older versions need a full sync
+        self.card_changes.oldest_version = self.permission_version
+        # Room set of a gateway -> digest, least recently used first
+        self.card_digests: "OrderedDict[frozenset, CardSetDigest]" = OrderedDict()
+        self.card_cache = CardCache(max_bytes=settings.card_cache_max_bytes)
+        if settings.card_format not in CARD_ENCODERS:
+            raise ValueError(f"Unsupported card format: {settings.card_format}")
+        self.encode_card = CARD_ENCODERS[settings.card_format]
     
     def create_permission(self, user_id: str, room_id: str, time_slots: List[TimeSlot]) -> Permission:
         """Create a new permission for a user."""
@@ -25,79 +59,268 @@ class PermissionManager:
             is_active=True
         )
         
-        # Save to database
-        self.database.save_permission(permission)
+        # Compile first so invalid time slots are rejected before saving
+        schedule = AccessSchedule(time_slots)
         
-        # Update active permissions cache
-        self._refresh_active_permissions()
+        # Save to database with its journal entry, replacing any permission held for the room
+        previous = self.database.get_permission(user_id, room_id)
+        version = self._save_change("updated" if previous else "granted", permission, permission)
+        
+        # Update the caches, after any earlier changes made by other processes
+        self.sync_changes(until=version - 1)
+        self.access_engine.set_schedule(user_id, room_id, schedule)
+        self._refresh_active_permissions(user_id, room_id, permission)
+        self._bump_version(user_id, room_id, version)
         
         # Schedule card update
-        self.schedule_card_update(f"card_{user_id}")
+        self.schedule_card_update(user_id, room_id)
         
         return permission
     
     def revoke_permission(self, user_id: str, room_id: str) -> None:
         """Revoke a user's permission for a specific room."""
-        # Mark permission as inactive in database
-        self.database.delete_permission(user_id, room_id)
+        # Delete from database with its journal entry
+        previous = self.database.get_permission(user_id, room_id)
+        version = self._save_change("revoked", previous, None) if previous else None
         
-        # Update active permissions cache
-        self._refresh_active_permissions()
+        # Update the caches, after any earlier changes made by other processes
+        self.sync_changes(until=version - 1 if version else None)
+        self.access_engine.set_schedule(user_id, room_id, None)
+        self._refresh_active_permissions(user_id, room_id, None)
+        if version is not None:
+            self._bump_version(user_id, room_id, version)
         
         # Schedule card update
-        self.schedule_card_update(f"card_{user_id}")
+        self.schedule_card_update(user_id, room_id)
     
     def update_permission(self, user_id: str, room_id: str, time_slots: List[TimeSlot]) -> Permission:
-        """Update an existing permission."""
-        # First revoke the old permission
-        self.revoke_permission(user_id, room_id)
+        """Update an existing permission.
         
-        # Then create a new one with updated time slots
+        The new permission replaces the old one in a single change, so the
+        journal records an update rather than a revoke and a grant.
+        """
         return self.create_permission(user_id, room_id, time_slots)
     
+    def sync_changes(self, until: Optional[int] = None) -> None:
+        """Apply permission changes made by other processes to the caches.
+        
+        Changes up to ``until`` (default: the latest change in the
+        database) that are newer than ``permission_version`` are applied
+        in order. With nothing new this costs one primary key lookup.
+        """
+        if until is None:
+            until = self.database.get_permission_version()
+        if until <= self.permission_version:
+            return
+        for change in self.database.get_permission_changes_since(self.permission_version, until):
+            permission = None
+            if change.action != "revoked":
+                permission = Permission(
+                    permission_id=change.permission_id,
+                    user_id=change.user_id,
+                    room_id=change.room_id,
+                    time_slots=change.time_slots
+                )
+            self.access_engine.load(permission, change.user_id, change.room_id)
+            self._refresh_active_permissions(change.user_id, change.room_id, permission)
+            self._bump_version(change.user_id, change.room_id, change.change_id)
+        self.permission_version = max(self.permission_version, until)
+    
+    def get_user_version(self, user_id: str) -> int:
+        """Get the permission version of a user's last change (0 if unchanged)."""
+        version = self.user_versions.get(user_id)
+        if version is None:
+            version = self.database.get_user_permission_version(user_id)
+            self.user_versions[user_id] = version
+        return version
+    
     def generate_card_data(self, user_id: str) -> bytes:
-        """Generate card data for a user based on their permissions."""
-        user_permissions = self.database.get_permissions(user_id)
-        
-        # Create a simple card data structure
-        # In a real implementation, this would be more sophisticated
-        card_data = {
-            "user_id": user_id,
-            "permissions": [],
-            "generated_at": datetime.now().isoformat()
+        """Generate card data for a user based on their permissions.
+        
+        Cards are cached per user until the user's permissions change.
+        """
+        self.sync_changes()
+        version = self.get_user_version(user_id)
+        cached = self.card_cache.get(user_id, version)
+        if cached is not None:
+            return cached
+        
+        card_bytes = self._build_card_data(user_id, version)
+        self.card_cache.put(user_id, version, card_bytes)
+        return card_bytes
+    
+    def get_cards_for_rooms(self, room_ids: Iterable[str]) -> Dict[str, bytes]:
+        """Get the cards of all users with a permission for any of the rooms."""
+        user_ids = {
+            permission.user_id
+            for room_id in room_ids
+            for permission in self.get_room_permissions(room_id)
         }
+        return {user_id: self.generate_card_data(user_id) for user_id in user_ids}
+    
+    def get_card_changes(self, room_ids: Iterable[str], since_version: int) -> Optional[Tuple[Dict[str, bytes], Set[str]]]:
+        """Get the card changes affecting the rooms after a permission version.
         
-        for permission in user_permissions:
-            card_data["permissions"].append({
-                "room_id": permission.room_id,
-                "time_slots": [
-                    {
-                        "start_time": ts.start_time.isoformat(),
-                        "end_time": ts.end_time.isoformat(),
-                        "day_of_week": ts.day_of_week
-                        
-                    }
-                    for ts in permission.time_slots
-                ]
-            })
+        Returns the changed cards and the users who no longer have a card
+        for these rooms, or None if the history no longer reaches back to
+        ``since_version``.
+        """
+        self.sync_changes()
+        changes = self.card_changes.since(since_version)
+        if changes is None:
+            return None
+        
+        room_ids = set(room_ids)
+        changed_users: Dict[str, bool] = {}  # user_id -> changed in one of the rooms
+        for user_id, room_id in changes:
+            changed_users[user_id] = changed_users.get(user_id, False) or room_id in room_ids
         
-        # Convert to bytes (in real implementation, this might be encrypted)
-        import json
-        return json.dumps(card_data).encode('utf-8')
+        cards: Dict[str, bytes] = {}
+        removed: Set[str] = set()
+        for user_id, changed_in_rooms in changed_users.items():
+            # A card holds all rooms of a user, so changes elsewhere alter it too
+            if any(p.room_id in room_ids for p in self.get_user_permissions(user_id)):
+                cards[user_id] = self.generate_card_data(user_id)
+            elif changed_in_rooms:
+                removed.add(user_id)
+        return cards, removed
     
-    def schedule_card_update(self, card_id: str) -> None:
-        """Schedule a card update to be sent to the gateway."""
-        # In a real implementation, this would add the update to a queue
-        # or send it directly to the GatewayCommService
-        print(f"Scheduled card update for card_id: {card_id}")
-        # TODO: Integrate with GatewayCommService to send actual update
+    def get_card_digest(self, room_ids: Iterable[str]) -> CardSetDigest:
+        """Get the bucket digest of the cards for a set of rooms.
+        
+        The digest of each room set is built once and then brought up to
+        date by replaying the change feed, re-hashing only the cards of
+        users changed since it was last read. At most
+        ``CARD_DIGEST_CACHE_SIZE`` digests are kept, evicting the least
+        recently used one.
+        """
+        self.sync_changes()
+        room_ids = frozenset(room_ids)
+        digest = self.card_digests.get(room_ids)
+        changes = self.card_changes.since(digest.version) if digest is not None else None
+        if changes is None:
+            # First use, or the history no longer reaches back: rebuild
+            digest = CardSetDigest()
+            for user_id, card_data in self.get_cards_for_rooms(room_ids).items():
+                digest.set_card(user_id, card_data)
+            self.card_digests[room_ids] = digest
+            self.card_digests.move_to_end(room_ids)
+            while len(self.card_digests) > settings.card_digest_cache_size:
+                self.card_digests.popitem(last=False)
+        else:
+            self.card_digests.move_to_end(room_ids)
+            for user_id in {user_id for user_id, _ in changes}:
+                if any(p.room_id in room_ids for p in self.get_user_permissions(user_id)):
+                    digest.set_card(user_id, self.generate_card_data(user_id))
+                else:
+                    digest.set_card(user_id, None)
+        digest.version = self.permission_version
+        return digest
+    
+    def drop_card_digest(self, room_ids: Iterable[str]) -> None:
+        """Forget the card digest of a room set no gateway uses any more."""
+        self.card_digests.pop(frozenset(room_ids), None)
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the size and hit/miss counters of the permission and card caches."""
+        return {
+            "active_permissions": self.active_permissions.stats(),
+            "cards": self.card_cache.stats()
+        }
+    
+    def get_card_size_report(self, user_id: str) -> Dict[str, Any]:
+        """Compare the size of a user's card in the JSON and binary encodings."""
+        user_permissions = sorted(self.get_user_permissions(user_id), key=lambda p: p.room_id)
+        return card_size_report(user_id, self.get_user_version(user_id), user_permissions)
+    
+    def _build_card_data(self, user_id: str, version: int) -> bytes:
+        """Encode the card data of a user in the configured card format."""
+        user_permissions = sorted(self.get_user_permissions(user_id), key=lambda p: p.room_id)
+        
+        # In a real implementation, the encoded card might be encrypted
+        return self.encode_card(user_id, version, user_permissions)
+    
+    def check_access(self, user_id: str, room_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Check whether a user may open a room at the given time (default: now).
+        
+        Timezone-aware times are converted to local time, the time the
+        schedules and the stored access logs use.
+        """
+        self.sync_changes()
+        return self._check_access(user_id, room_id, timestamp)
+    
+    def check_access_batch(self, checks: List[Tuple[str, str, datetime]]) -> List[bool]:
+        """Check many (user_id, room_id, timestamp) tuples in one call."""
+        self.sync_changes()
+        return [
+            self._check_access(user_id, room_id, timestamp)
+            for user_id, room_id, timestamp in checks
+        ]
+    
+    def _check_access(self, user_id: str, room_id: str, timestamp: Optional[datetime]) -> bool:
+        """Check access against the decision engine, compiling the pair's schedule on first use."""
+        timestamp = normalize_timestamp(timestamp) if timestamp else datetime.now()
+        if (user_id, room_id) not in self.access_engine:
+            permission = next(
+                (p for p in self.get_user_permissions(user_id) if p.room_id == room_id),
+                None
+            )
+            self.access_engine.load(permission, user_id, room_id)
+        return self.access_engine.is_allowed(user_id, room_id, timestamp)
+    
+    def schedule_card_update(self, user_id: str, room_id: str) -> None:
+        """Schedule a card update for the gateways serving the changed room."""
+        if self.card_dispatcher is None:
+            logger.warning("No card dispatcher attached, card update not sent", extra={
+                "user_id": user_id,
+                "room_id": room_id
+            })
+            return
+        self.card_dispatcher.schedule(user_id, [room_id])
     
     def get_user_permissions(self, user_id: str) -> List[Permission]:
-        """Get all active permissions for a user."""
-        return self.database.get_permissions(user_id)
-    
-    def _refresh_active_permissions(self) -> None:
-        """Refresh the active permissions cache."""
-        # In a real implementation, this might load all active permissions
-        # For now, we'll keep it simple
-        pass
+        """Get all active permissions for a user.
+        
+        Only the first lookup of a user reads the database; the cache is
+        kept up to date by every change afterwards.
+        """
+        self.sync_changes()
+        permissions = self.active_permissions.lookup(user_id)
+        if permissions is None:
+            permissions = self.database.get_permissions(user_id)
+            self.active_permissions.load_user(user_id, permissions)
+        return permissions
+    
+    def get_room_permissions(self, room_id: str) -> List[Permission]:
+        """Get all active permissions granting access to a room."""
+        self.sync_changes()
+        if not self.active_permissions.complete:
+            self.active_permissions.warm(self.database.get_all_permissions())
+        return self.active_permissions.get_room_permissions(room_id)
+    
+    def _bump_version(self, user_id: str, room_id: str, version: int) -> None:
+        """Record a permission change of a user under its journal ID, invalidating their card."""
+        self.permission_version = version
+        self.user_versions[user_id] = version
+        self.card_changes.record(version, user_id, room_id)
+        self.card_cache.invalidate(user_id)
+    
+    def _save_change(self, action: str, permission: Permission, saved: Optional[Permission]) -> int:
+        """Save a permission change together with its journal entry and return its change ID.
+        
+        ``saved`` is the permission held after the change, None if revoked.
+        """
+        change = PermissionChange(
+            timestamp=datetime.now(),
+            action=action,
+            user_id=permission.user_id,
+            room_id=permission.room_id,
+            permission_id=permission.permission_id,
+            time_slots=saved.time_slots if saved else []
+        )
+        self.database.apply_permission_change(change, saved)
+        return change.change_id
+    
+    def _refresh_active_permissions(self, user_id: str, room_id: str, permission: Optional[Permission]) -> None:
+        """Apply a permission change to the active permissions cache."""
+        self.active_permissions.apply(user_id, room_id, permission)
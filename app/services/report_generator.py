@@ -0,0 +1,214 @@
+"""Report data generation."""
+
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from datetime import datetime
+
+from ..models import ReportType
+from .access_log_store import normalize_timestamp
+from .database import Database
+from .gateway_comm_service import GatewayCommService
+
+
+class ReportGenerator:
+    """Builds the data of every report type from the pre-aggregated indexes.
+
+    Generation is synchronous so it can run in worker threads.
+    ``data_version`` identifies the state of the data a report type reads:
+    as long as it is unchanged, a report with the same parameters has the
+    same data.
+    """
+
+    def __init__(self, database: Database, gateway_service: GatewayCommService):
+        self.database = database
+        self.gateway_service = gateway_service
+
+    def generate(self, report_type: ReportType, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate report data based on type and parameters."""
+        if report_type == ReportType.ACCESS_SUMMARY:
+            return self._access_summary(parameters)
+        elif report_type == ReportType.PERMISSION_AUDIT:
+            return self._permission_audit(parameters)
+        elif report_type == ReportType.DEVICE_STATUS:
+            return self._device_status(parameters)
+        elif report_type == ReportType.SECURITY_INCIDENTS:
+            return self._security_incidents(parameters)
+        else:
+            raise ValueError(f"Unsupported report type: {report_type}")
+
+    def data_version(self, report_type: ReportType) -> Hashable:
+        """Get the version of the data a report type is generated from."""
+        if report_type in (ReportType.ACCESS_SUMMARY, ReportType.SECURITY_INCIDENTS):
+            # Every saved access log, granted or denied, changes the version
+            return self.database.get_access_log_version()
+        if report_type == ReportType.PERMISSION_AUDIT:
+            # The audit lists user names and details next to the permissions
+            return self.database.get_permission_version(), self.database.get_user_version()
+        if report_type == ReportType.DEVICE_STATUS:
+            # The report consists of the counters themselves
+            gateway_counts = self.gateway_service.get_status_counts()
+            device_counts = self.gateway_service.devices.stats()
+            return tuple(gateway_counts.values()) + tuple(device_counts.values())
+        raise ValueError(f"Unsupported report type: {report_type}")
+
+    def resolve_parameters(self, report_type: ReportType, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in the parameters whose default depends on the time of the request.
+
+        Parameters are part of the report cache key, so a default of "now"
+        must be resolved before the key is computed.
+        """
+        if report_type == ReportType.PERMISSION_AUDIT and parameters.get("room_id") and not parameters.get("at"):
+            return {**parameters, "at": datetime.now().isoformat()}
+        return parameters
+
+    def _access_summary(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate access summary report from the pre-aggregated access counts."""
+        start_date = parameters.get("start_date")
+        end_date = parameters.get("end_date")
+
+        room_counts, user_counts = self.database.get_access_counts(_parse_date(start_date), _parse_date(end_date))
+
+        room_stats = [
+            {"room_id": room_id, "total_accesses": count}
+            for room_id, count in sorted(room_counts.items(), key=lambda item: item[1], reverse=True)
+        ]
+        user_stats = [
+            {"user_id": user_id, "total_accesses": count}
+            for user_id, count in sorted(user_counts.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+        return {
+            "summary": {
+                "period": {"start": start_date, "end": end_date},
+                "total_rooms": len(room_stats),
+                "total_accesses": sum(room_counts.values()),
+                "room_statistics": room_stats,
+                "user_statistics": user_stats
+            }
+        }
+
+    def _permission_audit(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate permission audit report from the permission change journal.
+
+        Lists the current permissions (of ``user_id``, if given). With
+        ``user_id`` it adds the user's change history within
+        ``start_date``/``end_date``; with ``room_id`` it adds the users who had
+        access to the room at ``at`` (default: now).
+        """
+        user_id = parameters.get("user_id")
+        room_id = parameters.get("room_id")
+        database = self.database
+
+        if user_id:
+            current = database.get_permissions(user_id)
+        else:
+            current = database.get_all_permissions()
+        permissions = []
+        for permission in sorted(current, key=lambda p: (p.user_id, p.room_id)):
+            user = database.get_user_by_id(permission.user_id)
+            permissions.append({
+                "user_id": permission.user_id,
+                "username": user.username if user else None,
+                "full_name": user.full_name if user else None,
+                "room_id": permission.room_id,
+                "is_active": True
+            })
+
+        audit: Dict[str, Any] = {
+            "permissions": permissions,
+            "total_permissions": len(permissions),
+            "active_permissions": len([p for p in permissions if p["is_active"]])
+        }
+
+        if user_id:
+            changes = database.get_permission_changes(
+                user_id, _parse_date(parameters.get("start_date")), _parse_date(parameters.get("end_date"))
+            )
+            audit["changes"] = [change.model_dump(mode="json") for change in changes]
+
+        if room_id:
+            at = _parse_date(parameters.get("at")) or datetime.now()
+            audit["room_access"] = {
+                "room_id": room_id,
+                "at": at.isoformat(),
+                "user_ids": database.get_users_with_access(room_id, at)
+            }
+
+        return {"audit": audit}
+
+    def _device_status(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate device status report."""
+        gateway_counts = self.gateway_service.get_status_counts()
+        device_counts = self.gateway_service.devices.stats()
+        return {
+            "devices": {
+                "total_gateways": gateway_counts["total"],
+                "online_gateways": gateway_counts["online"],
+                "offline_gateways": gateway_counts["offline"],
+                "total_devices": device_counts["total"],
+                "online_devices": device_counts["online"],
+                "active_devices": device_counts["active"],
+                "low_battery_devices": device_counts["low_battery"]
+            }
+        }
+
+    def _security_incidents(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate security incidents report: denied access attempts, one page at a time."""
+        start_date = parameters.get("start_date")
+        end_date = parameters.get("end_date")
+        page = max(1, int(parameters.get("page", 1)))
+        page_size = min(max(1, int(parameters.get("page_size", 100))), 1000)
+
+        denied_logs, total = self.database.get_denied_access_logs(
+            _parse_date(start_date), _parse_date(end_date),
+            offset=(page - 1) * page_size, limit=page_size
+        )
+        incidents = [
+            {
+                "log_id": log.log_id,
+                "timestamp": log.timestamp.isoformat(),
+                "user_id": log.user_id,
+                "room_id": log.room_id,
+                "device_id": log.device_id
+            }
+            for log in denied_logs
+        ]
+
+        return {
+            "security_incidents": {
+                "period": {"start": start_date, "end": end_date},
+                "total_incidents": total,
+                "page": page,
+                "page_size": page_size,
+                "incidents": incidents
+            }
+        }
+
+
+def report_rows(report_type: ReportType, data: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Flatten the data of a report into columns and rows for tabular export."""
+    if report_type == ReportType.ACCESS_SUMMARY:
+        summary = data["summary"]
+        rows = [
+            {"scope": "room", "id": stats["room_id"], "total_accesses": stats["total_accesses"]}
+            for stats in summary["room_statistics"]
+        ] + [
+            {"scope": "user", "id": stats["user_id"], "total_accesses": stats["total_accesses"]}
+            for stats in summary["user_statistics"]
+        ]
+        return ["scope", "id", "total_accesses"], rows
+    if report_type == ReportType.PERMISSION_AUDIT:
+        return ["user_id", "username", "full_name", "room_id", "is_active"], data["audit"]["permissions"]
+    if report_type == ReportType.DEVICE_STATUS:
+        return list(data["devices"]), [data["devices"]]
+    if report_type == ReportType.SECURITY_INCIDENTS:
+        return ["log_id", "timestamp", "user_id", "room_id", "device_id"], data["security_incidents"]["incidents"]
+    raise ValueError(f"Unsupported report type: {report_type}")
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    """Parse an optional ISO date parameter."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    return normalize_timestamp(value)
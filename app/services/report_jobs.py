@@ -0,0 +1,155 @@
+"""Asynchronous report generation with shared, cached results."""
+
+from typing import Any, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import asyncio
+import json
+import uuid
+
+from ..core.logging import get_logger
+from ..models import Report, ReportRequest, ReportJob, ReportJobStatus
+from .report_generator import ReportGenerator
+
+logger = get_logger(__name__)
+
+ReportKey = Tuple[str, str, Hashable]  # (report type, parameters, data version)
+
+
+def report_key(request: ReportRequest, data_version: Hashable) -> ReportKey:
+    """Key identifying the data of a report request."""
+    parameters = json.dumps(request.parameters, sort_keys=True, default=str)
+    return request.report_type.value, parameters, data_version
+
+
+class ReportJobQueue:
+    """Runs report generation in worker threads, off the event loop.
+
+    Submitting returns a job at once; the job completes when its data is
+    generated. Generated data is cached by (report type, parameters, data
+    version), so a report is only generated again once the data it reads
+    changed. Requests for a report that is already being generated wait
+    for that computation instead of starting their own.
+
+    Jobs are kept for lookup up to ``max_jobs``: beyond that, the jobs
+    that finished first are forgotten first. Pending and running jobs are
+    never forgotten.
+    """
+
+    def __init__(self,
+                 generator: ReportGenerator,
+                 max_workers: int = 2,
+                 cache_size: int = 128,
+                 max_jobs: int = 1000):
+        self.generator = generator
+        self.cache_size = cache_size
+        self.max_jobs = max_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self.jobs: Dict[str, ReportJob] = {}
+        self.finished: "OrderedDict[str, None]" = OrderedDict()  # job IDs in order of completion
+        self.results: "OrderedDict[ReportKey, Dict[str, Any]]" = OrderedDict()  # LRU cache
+        self.in_progress: Dict[ReportKey, asyncio.Future] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def submit(self, request: ReportRequest, user_id: str) -> ReportJob:
+        """Submit a report for generation; must be called on the event loop."""
+        parameters = self.generator.resolve_parameters(request.report_type, request.parameters)
+        request = request.model_copy(update={"parameters": parameters})
+        job = ReportJob(
+            job_id=str(uuid.uuid4()),
+            report_type=request.report_type,
+            submitted_at=datetime.now()
+        )
+        self.jobs[job.job_id] = job
+
+        key = report_key(request, self.generator.data_version(request.report_type))
+        data = self.results.get(key)
+        if data is not None:
+            self.results.move_to_end(key)
+            self.cache_hits += 1
+            job.cached = True
+            self._complete(job, request, user_id, data)
+            return job
+
+        future = self.in_progress.get(key)
+        if future is None:
+            self.cache_misses += 1
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor, self.generator.generate, request.report_type, dict(request.parameters)
+            )
+            self.in_progress[key] = future
+            future.add_done_callback(lambda done: self._store(key, done))
+
+        job.status = ReportJobStatus.RUNNING
+        future.add_done_callback(lambda done: self._finish(job, request, user_id, done))
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """Get a submitted job."""
+        return self.jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads, dropping reports not yet started."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _store(self, key: ReportKey, future: asyncio.Future) -> None:
+        """Cache the data of a finished computation."""
+        self.in_progress.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.results[key] = future.result()
+        while len(self.results) > self.cache_size:
+            self.results.popitem(last=False)
+
+    def _finish(self,
+                job: ReportJob,
+                request: ReportRequest,
+                user_id: str,
+                future: asyncio.Future) -> None:
+        """Complete a job waiting for a computation."""
+        if future.cancelled():
+            self._fail(job, "Report generation was cancelled")
+        elif future.exception() is not None:
+            error = future.exception()
+            logger.warning(
+                "Report generation failed",
+                extra={"job_id": job.job_id, "report_type": request.report_type.value, "error": str(error)}
+            )
+            self._fail(job, str(error))
+        else:
+            self._complete(job, request, user_id, future.result())
+
+    def _complete(self,
+                  job: ReportJob,
+                  request: ReportRequest,
+                  user_id: str,
+                  data: Dict[str, Any]) -> None:
+        job.report = Report(
+            report_id=job.job_id,
+            report_type=request.report_type,
+            title=request.title,
+            generated_at=datetime.now(),
+            generated_by=user_id,
+            parameters=request.parameters,
+            data=data,
+            format=request.format
+        )
+        job.status = ReportJobStatus.COMPLETED
+        job.completed_at = job.report.generated_at
+        self._forget_finished(job)
+
+    def _fail(self, job: ReportJob, error: str) -> None:
+        job.status = ReportJobStatus.FAILED
+        job.error = error
+        job.completed_at = datetime.now()
+        self._forget_finished(job)
+
+    def _forget_finished(self, job: ReportJob) -> None:
+        """Record a finished job, forgetting the first finished jobs beyond ``max_jobs``."""
+        self.finished[job.job_id] = None
+        while len(self.jobs) > self.max_jobs and self.finished:
+            job_id, _ = self.finished.popitem(last=False)
+            self.jobs.pop(job_id, None)
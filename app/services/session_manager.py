@@ -1,12 +1,18 @@
 """Session Manager service implementation."""
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import hashlib
+import heapq
+import hmac
+import secrets
 import uuid
 from datetime import datetime, timedelta
 
 from ..models import Session, Credentials, User
 from ..core.config import settings
 from .database import Database
+from .token_service import TokenService, session_from_claims
 
 
 class SessionManager:
@@ -15,11 +21,17 @@ class SessionManager:
     def __init__(self, database: Optional[Database] = None):
         self.database = database or Database()
         self.active_sessions: Dict[str, Session] = {}
+        self.user_sessions: Dict[str, Set[str]] = {}  # user_id -> session_ids
+        # Min-heap of (expires_at, session_id). Entries of refreshed or
+        # invalidated sessions stay in the heap and are skipped when popped.
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self.tokens = TokenService(settings.secret_key, self.database, settings.algorithm)
     
-    def create_session(self, credentials: Credentials) -> Optional[Session]:
+    async def create_session(self, credentials: Credentials) -> Optional[Session]:
         """Create a new session after validating credentials."""
         # Validate credentials
-        user = self._validate_credentials(credentials)
+        user = await self._validate_credentials(credentials)
         if not user or not user.user_id:
             return None
         
@@ -37,6 +49,8 @@ class SessionManager:
         
         # Store in active sessions
         self.active_sessions[session_id] = session
+        self.user_sessions.setdefault(session.user_id, set()).add(session_id)
+        self._push_expiry(session)
         
         return session
     
@@ -55,11 +69,17 @@ class SessionManager:
     
     def invalidate_session(self, session_id: str) -> bool:
         """Invalidate a session (logout)."""
-        if session_id in self.active_sessions:
-            self.active_sessions[session_id].is_active = False
-            del self.active_sessions[session_id]
-            return True
-        return False
+        session = self.active_sessions.pop(session_id, None)
+        if session is None:
+            return False
+        
+        session.is_active = False
+        user_session_ids = self.user_sessions.get(session.user_id)
+        if user_session_ids is not None:
+            user_session_ids.discard(session_id)
+            if not user_session_ids:
+                del self.user_sessions[session.user_id]
+        return True
     
     def refresh_session(self, session_id: str) -> Optional[Session]:
         """Refresh a session's expiration time."""
@@ -70,53 +90,144 @@ class SessionManager:
         # Extend expiration time
         session.expires_at = datetime.now() + timedelta(minutes=settings.access_token_expire_minutes)
         self.active_sessions[session_id] = session
+        self._push_expiry(session)
         
         return session
     
+    def issue_token(self, session: Session) -> str:
+        """Issue a signed access token for a session."""
+        return self.tokens.issue(session)
+    
+    def verify_token(self, token: str) -> Optional[Session]:
+        """Verify a signed access token without looking up session state."""
+        return self.tokens.verify(token)
+    
+    def refresh_token(self, token: str) -> Optional[Tuple[str, Session]]:
+        """Replace a valid token with one carrying a new expiration time."""
+        claims = self.tokens.decode(token)
+        if claims is None:
+            return None
+        
+        session = self.refresh_session(claims["sid"])
+        if session is None:
+            # The session may live on another worker, so rebuild it from the claims
+            session = session_from_claims(claims)
+            session.expires_at = datetime.now() + timedelta(minutes=settings.access_token_expire_minutes)
+        self.tokens.revoke(claims)
+        return self.tokens.issue(session), session
+    
+    def revoke_token(self, token: str) -> bool:
+        """Revoke a token and invalidate its session (logout)."""
+        claims = self.tokens.decode(token)
+        if claims is None:
+            return False
+        
+        self.tokens.revoke(claims)
+        self.invalidate_session(claims["sid"])
+        return True
+    
     def get_user_sessions(self, user_id: str) -> list[Session]:
         """Get all active sessions for a user."""
         return [
-            session for session in self.active_sessions.values()
-            if session.user_id == user_id and session.is_active
+            self.active_sessions[session_id]
+            for session_id in self.user_sessions.get(user_id, ())
         ]
     
     def invalidate_user_sessions(self, user_id: str) -> int:
         """Invalidate all sessions for a user."""
-        sessions_to_remove = []
-        for session_id, session in self.active_sessions.items():
-            if session.user_id == user_id:
-                sessions_to_remove.append(session_id)
+        sessions_to_remove = list(self.user_sessions.get(user_id, ()))
         
         for session_id in sessions_to_remove:
             self.invalidate_session(session_id)
         
         return len(sessions_to_remove)
     
-    def cleanup_expired_sessions(self) -> int:
-        """Remove all expired sessions."""
+    def cleanup_expired_sessions(self, limit: Optional[int] = None) -> int:
+        """Remove expired sessions, oldest first, at most ``limit`` of them."""
         current_time = datetime.now()
-        expired_sessions = []
-        
-        for session_id, session in self.active_sessions.items():
-            if current_time > session.expires_at:
-                expired_sessions.append(session_id)
+        removed = 0
         
-        for session_id in expired_sessions:
+        while self._expiry_heap and self._expiry_heap[0][0] < current_time:
+            if limit is not None and removed >= limit:
+                break
+            expires_at, session_id = heapq.heappop(self._expiry_heap)
+            session = self.active_sessions.get(session_id)
+            # Skip entries of sessions that were invalidated or refreshed since
+            if session is None or session.expires_at != expires_at:
+                continue
             self.invalidate_session(session_id)
+            removed += 1
+        
+        # Drop stale heap entries once they outnumber the live sessions
+        if len(self._expiry_heap) > 2 * len(self.active_sessions) + 1024:
+            self._expiry_heap = [
+                (session.expires_at, session_id)
+                for session_id, session in self.active_sessions.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+        
+        return removed
+    
+    def start_sweeper(self, interval: float = 30.0, batch_size: int = 1000) -> None:
+        """Start a background task expiring sessions incrementally."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep(interval, batch_size))
+    
+    async def stop_sweeper(self) -> None:
+        """Stop the background expiry task."""
+        if self._sweeper is None:
+            return
+        self._sweeper.cancel()
+        try:
+            await self._sweeper
+        except asyncio.CancelledError:
+            pass
+        self._sweeper = None
+    
+    async def _sweep(self, interval: float, batch_size: int) -> None:
+        """Expire sessions in batches, yielding to the event loop between them."""
+        while True:
+            await asyncio.sleep(interval)
+            while self.cleanup_expired_sessions(limit=batch_size) == batch_size:
+                await asyncio.sleep(0)
+    
+    def _push_expiry(self, session: Session) -> None:
+        """Add a session's expiry time to the expiry heap."""
+        heapq.heappush(self._expiry_heap, (session.expires_at, session.session_id))
+    
+    async def set_password(self, user_id: str, password: str) -> None:
+        """Hash and store a user's password, hashing in a worker thread."""
+        password_hash = await asyncio.to_thread(self._hash_password, password)
+        self.database.save_password_hash(user_id, password_hash)
+    
+    async def _validate_credentials(self, credentials: Credentials) -> Optional[User]:
+        """Validate user credentials against the username/email index."""
+        user = self.database.get_user_by_login(credentials.username)
+        if not user or not user.is_active:
+            return None
+        
+        password_hash = self.database.get_password_hash(user.user_id)
+        if password_hash is None:
+            # For prototype: users without a stored password accept any password
+            return user
         
-        return len(expired_sessions)
-    
-    def _validate_credentials(self, credentials: Credentials) -> Optional[User]:
-        """Validate user credentials (simplified for prototype)."""
-        # For prototype: Accept any password for existing users
-        for user in self.database.get_all_users():
-            if user.is_active:
-                return user
-        return None
-    
-    def _hash_password(self, password: str) -> str:
-        """Hash a password for storage (simplified for prototype)."""
-        # In a real implementation, use proper password hashing like bcrypt
-        import hashlib
-        from ..core.config import settings
-        return hashlib.sha256((password + settings.secret_key).encode()).hexdigest()
+        # Hashing is CPU-bound, keep it off the event loop
+        if not await asyncio.to_thread(self._verify_password, credentials.password, password_hash):
+            return None
+        return user
+    
+    def _hash_password(self, password: str, salt: Optional[str] = None) -> str:
+        """Hash a password for storage with salted PBKDF2-HMAC-SHA256."""
+        salt = salt or secrets.token_hex(16)
+        iterations = settings.password_hash_iterations
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations)
+        return f"pbkdf2_sha256${iterations}${salt}${digest.hex()}"
+    
+    def _verify_password(self, password: str, password_hash: str) -> bool:
+        """Check a password against a hash created by _hash_password."""
+        try:
+            _, iterations, salt, expected = password_hash.split("$")
+        except ValueError:
+            return False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), int(iterations))
+        return hmac.compare_digest(digest.hex(), expected)
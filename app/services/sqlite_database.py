@@ -0,0 +1,721 @@
+"""Database service implementation - SQLite version."""
+
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+from queue import Queue, Empty
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from ..models import User, Permission, PermissionChange, AccessLog
+from .database import Database
+from .access_log_store import check_access_log, normalize_timestamp
+from .access_rollup import AccessRollups, add_counts, hour_index, partial_hours
+from .permission_journal import RoomAccessTimeline
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    email TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    is_active INTEGER NOT NULL,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS credentials (
+    user_id TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS permissions (
+    permission_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    room_id TEXT NOT NULL,
+    time_slots TEXT NOT NULL,
+    UNIQUE (user_id, room_id)
+);
+
+CREATE TABLE IF NOT EXISTS access_logs (
+    log_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    room_id TEXT NOT NULL,
+    access_granted INTEGER NOT NULL DEFAULT 1,
+    device_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS permission_changes (
+    change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    action TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    room_id TEXT NOT NULL,
+    permission_id TEXT,
+    time_slots TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS permission_snapshots (
+    room_id TEXT NOT NULL,
+    change_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    user_ids TEXT NOT NULL,
+    PRIMARY KEY (room_id, change_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_permission_changes_user ON permission_changes (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_permission_changes_room ON permission_changes (room_id, change_id);
+
+-- Counters of changes without a journal of their own, shared by all workers for report caching
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens (expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_access_logs_user ON access_logs (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_access_logs_room ON access_logs (room_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_access_logs_timestamp ON access_logs (timestamp);
+"""
+
+# Created after migrating databases that predate the username column
+USER_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_users_username ON users (username COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users (email COLLATE NOCASE);
+"""
+
+# Created after migrating databases that predate the access_granted column.
+# The partial index only holds denied attempts, so incident queries skip granted traffic.
+ACCESS_LOG_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_access_logs_denied ON access_logs (timestamp) WHERE access_granted = 0;
+"""
+
+# Statements are kept as constants so every pooled connection reuses
+# its prepared statement from the sqlite3 statement cache.
+UPSERT_USER = """
+    INSERT INTO users (user_id, username, email, full_name, role, is_active, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = excluded.username,
+        email = excluded.email,
+        full_name = excluded.full_name,
+        role = excluded.role,
+        is_active = excluded.is_active,
+        created_at = excluded.created_at
+"""
+BUMP_DATA_VERSION = """
+    INSERT INTO data_versions (name, version) VALUES (?, 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1
+"""
+SELECT_DATA_VERSION = "SELECT version FROM data_versions WHERE name = ?"
+SELECT_USER = "SELECT * FROM users WHERE user_id = ?"
+SELECT_ALL_USERS = "SELECT * FROM users"
+COUNT_USERS = "SELECT COUNT(*) FROM users"
+SELECT_USER_BY_USERNAME = "SELECT * FROM users WHERE username = ? COLLATE NOCASE"
+SELECT_USER_BY_EMAIL = "SELECT * FROM users WHERE email = ? COLLATE NOCASE"
+
+UPSERT_PASSWORD_HASH = """
+    INSERT INTO credentials (user_id, password_hash) VALUES (?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET password_hash = excluded.password_hash
+"""
+SELECT_PASSWORD_HASH = "SELECT password_hash FROM credentials WHERE user_id = ?"
+
+DELETE_EXPIRED_REVOCATIONS = "DELETE FROM revoked_tokens WHERE expires_at < ?"
+INSERT_REVOCATION = "INSERT OR REPLACE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)"
+SELECT_REVOCATION = "SELECT 1 FROM revoked_tokens WHERE jti = ?"
+
+DELETE_PERMISSION = "DELETE FROM permissions WHERE user_id = ? AND room_id = ?"
+INSERT_PERMISSION = """
+    INSERT OR REPLACE INTO permissions (permission_id, user_id, room_id, time_slots)
+    VALUES (?, ?, ?, ?)
+"""
+INSERT_PERMISSION_CHANGE = """
+    INSERT INTO permission_changes (timestamp, action, user_id, room_id, permission_id, time_slots)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+SELECT_LATEST_PERMISSION_CHANGE_ID = "SELECT COALESCE(MAX(change_id), 0) FROM permission_changes"
+SELECT_PERMISSION_CHANGE_RANGE = """
+    SELECT * FROM permission_changes WHERE change_id > ? AND change_id <= ? ORDER BY change_id
+"""
+SELECT_LATEST_USER_CHANGE_ID = "SELECT COALESCE(MAX(change_id), 0) FROM permission_changes WHERE user_id = ?"
+SELECT_LATEST_PERMISSION_SNAPSHOTS = """
+    SELECT s.* FROM permission_snapshots s
+    JOIN (SELECT room_id, MAX(change_id) AS change_id FROM permission_snapshots GROUP BY room_id)
+    USING (room_id, change_id)
+"""
+SELECT_PERMISSION_SNAPSHOT_AT = """
+    SELECT * FROM permission_snapshots WHERE room_id = ? AND timestamp <= ?
+    ORDER BY change_id DESC LIMIT 1
+"""
+INSERT_PERMISSION_SNAPSHOT = """
+    INSERT OR REPLACE INTO permission_snapshots (room_id, change_id, timestamp, user_ids)
+    VALUES (?, ?, ?, ?)
+"""
+SELECT_PERMISSION_CHANGES_AFTER = """
+    SELECT change_id, timestamp, action, user_id, room_id FROM permission_changes
+    WHERE change_id > ? ORDER BY change_id
+"""
+SELECT_ROOM_CHANGES_AFTER = """
+    SELECT action, user_id FROM permission_changes
+    WHERE room_id = ? AND change_id > ? AND timestamp <= ? ORDER BY change_id
+"""
+
+SELECT_LATEST_ACCESS_LOG_ROWID = "SELECT COALESCE(MAX(rowid), 0) FROM access_logs"
+COUNT_ACCESS_LOGS_BY_HOUR = """
+    SELECT user_id, room_id, substr(timestamp, 1, 13) AS hour, COUNT(*) AS count
+    FROM access_logs WHERE rowid > ? AND rowid <= ?
+    GROUP BY user_id, room_id, hour
+"""
+COUNT_ACCESS_LOGS_BY_ROOM = """
+    SELECT room_id AS key, COUNT(*) AS count FROM access_logs
+    WHERE timestamp >= ? AND timestamp <= ? GROUP BY room_id
+"""
+COUNT_ACCESS_LOGS_BY_USER = """
+    SELECT user_id AS key, COUNT(*) AS count FROM access_logs
+    WHERE timestamp >= ? AND timestamp <= ? GROUP BY user_id
+"""
+SELECT_PERMISSION = "SELECT * FROM permissions WHERE user_id = ? AND room_id = ?"
+SELECT_USER_PERMISSIONS = "SELECT * FROM permissions WHERE user_id = ?"
+SELECT_ALL_PERMISSIONS = "SELECT * FROM permissions"
+
+INSERT_ACCESS_LOG = """
+    INSERT INTO access_logs (log_id, timestamp, user_id, room_id, access_granted, device_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections opened in WAL mode."""
+
+    def __init__(self, path: str, size: int = 5, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._idle: Queue[sqlite3.Connection] = Queue(maxsize=size)
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection configured for concurrent readers and one writer."""
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Access logs are group-committed, so a full sync per commit is affordable
+        connection.execute("PRAGMA synchronous=FULL")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, waiting if all of them are in use."""
+        try:
+            connection = self._idle.get(timeout=self.timeout)
+        except Empty:
+            raise TimeoutError("No database connection available")
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+def sqlite_path(database_url: str) -> str:
+    """Convert a ``sqlite:///path`` URL into a filesystem path."""
+    prefix = "sqlite:///"
+    if database_url.startswith(prefix):
+        return database_url[len(prefix):]
+    return database_url
+
+
+class SQLiteDatabase(Database):
+    """Database service persisting users, permissions and access logs in SQLite.
+
+    The permission journal is queried in SQL. Like the in-memory
+    RoomAccessTimeline, each room gets a snapshot of its holders whenever
+    its changes since the previous snapshot outnumber the holders (and at
+    least ``MIN_SNAPSHOT_INTERVAL`` changes). Only the current holders of
+    each room and the count of changes since its snapshot are kept in
+    memory; they are rebuilt at startup from the newest snapshots and the
+    changes after them, so startup does not read the full history.
+
+    The report rollups count the access logs up to a rowid high-water
+    mark. Logs are only ever inserted, so before each summary the rollups
+    catch up on the rows past the mark, including those of other worker
+    processes sharing the file.
+    """
+
+    is_durable = True
+
+    def __init__(self, database_url: str, pool_size: int = 5):
+        self.pool = ConnectionPool(sqlite_path(database_url), size=pool_size)
+        self.access_rollups = AccessRollups()
+        self._rollup_position = 0  # rowid of the last access log counted in the rollups
+        self._rollup_lock = threading.Lock()
+        with self.pool.connection() as connection:
+            connection.executescript(SCHEMA)
+            columns = [row["name"] for row in connection.execute("PRAGMA table_info(users)")]
+            if "username" not in columns:
+                connection.execute("ALTER TABLE users ADD COLUMN username TEXT")
+            connection.executescript(USER_INDEXES)
+            columns = [row["name"] for row in connection.execute("PRAGMA table_info(access_logs)")]
+            if "access_granted" not in columns:
+                connection.execute("ALTER TABLE access_logs ADD COLUMN access_granted INTEGER NOT NULL DEFAULT 1")
+                connection.execute("ALTER TABLE access_logs ADD COLUMN device_id TEXT")
+            connection.executescript(ACCESS_LOG_INDEXES)
+            empty = connection.execute(COUNT_USERS).fetchone()[0] == 0
+            with connection:
+                self._load_journal_tail(connection)
+        if empty:
+            self._initialize_sample_data()
+        self._sync_access_rollups()
+
+    def save_user(self, user: User) -> None:
+        """Save a user to the database."""
+        if not user.user_id:
+            return
+        created_at = user.created_at.isoformat() if user.created_at else None
+        with self.pool.connection() as connection, connection:
+            connection.execute(UPSERT_USER, (
+                user.user_id, user.username, user.email, user.full_name,
+                user.role.value, int(user.is_active), created_at
+            ))
+            connection.execute(BUMP_DATA_VERSION, ("users",))
+
+    def get_user_by_login(self, login: str) -> Optional[User]:
+        """Get a user by their username or email address."""
+        with self.pool.connection() as connection:
+            row = connection.execute(SELECT_USER_BY_USERNAME, (login,)).fetchone()
+            if row is None:
+                row = connection.execute(SELECT_USER_BY_EMAIL, (login,)).fetchone()
+        return User(**dict(row)) if row else None
+
+    def save_password_hash(self, user_id: str, password_hash: str) -> None:
+        """Store the password hash of a user."""
+        with self.pool.connection() as connection, connection:
+            connection.execute(UPSERT_PASSWORD_HASH, (user_id, password_hash))
+
+    def get_password_hash(self, user_id: str) -> Optional[str]:
+        """Get the password hash of a user, if one was set."""
+        with self.pool.connection() as connection:
+            row = connection.execute(SELECT_PASSWORD_HASH, (user_id,)).fetchone()
+        return row["password_hash"] if row else None
+
+    def save_token_revocation(self, jti: str, expires_at: float) -> None:
+        """Record a revoked token until its expiry time (epoch seconds).
+
+        Revocations are shared through the database file, so a token
+        revoked by one worker process is rejected by all of them.
+        """
+        with self.pool.connection() as connection, connection:
+            # Expired tokens are rejected anyway, so their rows can go
+            connection.execute(DELETE_EXPIRED_REVOCATIONS, (time.time(),))
+            connection.execute(INSERT_REVOCATION, (jti, expires_at))
+
+    def is_token_revoked(self, jti: str) -> bool:
+        """Check whether a token was revoked."""
+        with self.pool.connection() as connection:
+            return connection.execute(SELECT_REVOCATION, (jti,)).fetchone() is not None
+
+    def save_access_log(self, log: AccessLog) -> None:
+        """Save an access log entry to the database."""
+        check_access_log(log)
+        if not log.log_id:
+            log.log_id = str(uuid.uuid4())
+        with self.pool.connection() as connection, connection:
+            connection.execute(INSERT_ACCESS_LOG, self._access_log_row(log))
+
+    def save_access_logs(self, logs: List[AccessLog]) -> None:
+        """Save a batch of access log entries in a single transaction."""
+        for log in logs:
+            check_access_log(log)
+            if not log.log_id:
+                log.log_id = str(uuid.uuid4())
+        with self.pool.connection() as connection, connection:
+            connection.executemany(INSERT_ACCESS_LOG, [self._access_log_row(log) for log in logs])
+
+    def get_permissions(self, user_id: str) -> List[Permission]:
+        """Get all permissions for a specific user."""
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_USER_PERMISSIONS, (user_id,)).fetchall()
+        return [self._permission_from_row(row) for row in rows]
+
+    def get_permission(self, user_id: str, room_id: str) -> Optional[Permission]:
+        """Get the permission of a user for a specific room."""
+        with self.pool.connection() as connection:
+            row = connection.execute(SELECT_PERMISSION, (user_id, room_id)).fetchone()
+        return self._permission_from_row(row) if row else None
+
+    def get_all_permissions(self) -> List[Permission]:
+        """Get all permissions."""
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_ALL_PERMISSIONS).fetchall()
+        return [self._permission_from_row(row) for row in rows]
+
+    def get_user_by_id(self, user_id: str) -> Optional[User]:
+        """Get a user by their ID."""
+        with self.pool.connection() as connection:
+            row = connection.execute(SELECT_USER, (user_id,)).fetchone()
+        return User(**dict(row)) if row else None
+
+    def save_permission(self, permission: Permission) -> None:
+        """Save a permission, replacing the one held for the same user and room."""
+        if not permission.permission_id:
+            return
+        with self.pool.connection() as connection, connection:
+            self._write_permission(connection, permission)
+
+    def delete_permission(self, user_id: str, room_id: str) -> None:
+        """Delete the permission of a user for a specific room."""
+        with self.pool.connection() as connection, connection:
+            connection.execute(DELETE_PERMISSION, (user_id, room_id))
+
+    def save_permission_change(self, change: PermissionChange) -> None:
+        """Append a change to the permission journal."""
+        self._save_permission_change(change, None, update_permissions=False)
+
+    def apply_permission_change(self, change: PermissionChange, permission: Optional[Permission]) -> None:
+        """Save the permission resulting from a change and journal the change in one transaction.
+
+        Other workers rebuild their caches from the journal, so the
+        permissions table must never disagree with it.
+        """
+        self._save_permission_change(change, permission, update_permissions=True)
+
+    def _save_permission_change(self, change: PermissionChange, permission: Optional[Permission],
+                                update_permissions: bool) -> None:
+        """Append a change to the permission journal, optionally saving or deleting its permission."""
+        time_slots = json.dumps([ts.model_dump(mode="json") for ts in change.time_slots])
+        with self.pool.connection() as connection:
+            try:
+                with connection:
+                    # Take the write lock first so changes of other processes are applied in order
+                    connection.execute("BEGIN IMMEDIATE")
+                    self._apply_journal_tail(connection)
+                    if update_permissions and permission is not None:
+                        self._write_permission(connection, permission)
+                    elif update_permissions:
+                        connection.execute(DELETE_PERMISSION, (change.user_id, change.room_id))
+                    timestamp = self._timestamp(change.timestamp)
+                    if self._journal_timestamp is not None and timestamp < self._journal_timestamp:
+                        # Keep the journal time-ordered if the clock went backwards
+                        timestamp = self._journal_timestamp
+                        change.timestamp = datetime.fromisoformat(timestamp)
+                    cursor = connection.execute(INSERT_PERMISSION_CHANGE, (
+                        timestamp, change.action, change.user_id,
+                        change.room_id, change.permission_id, time_slots
+                    ))
+                    change.change_id = cursor.lastrowid
+                    self._apply_journal_change(connection, change.change_id, timestamp,
+                                               change.user_id, change.room_id, change.action)
+            except Exception:
+                # The rolled back change may already be applied in memory
+                with connection:
+                    self._load_journal_tail(connection)
+                raise
+
+    def get_permission_changes(self,
+                               user_id: str,
+                               start_date: Optional[datetime] = None,
+                               end_date: Optional[datetime] = None) -> List[PermissionChange]:
+        """Get the permission changes of a user, oldest first."""
+        conditions = ["user_id = ?"]
+        params: list = [user_id]
+        if start_date:
+            conditions.append("timestamp >= ?")
+            params.append(self._timestamp(start_date))
+        if end_date:
+            conditions.append("timestamp <= ?")
+            params.append(self._timestamp(end_date))
+        query = "SELECT * FROM permission_changes WHERE " + " AND ".join(conditions) + " ORDER BY change_id"
+
+        with self.pool.connection() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return [PermissionChange(**{**dict(row), "time_slots": json.loads(row["time_slots"])}) for row in rows]
+
+    def get_users_with_access(self, room_id: str, timestamp: datetime) -> List[str]:
+        """Get the users who held a permission for a room at a point in time.
+
+        Starts from the room's last snapshot before the time and replays
+        the room's changes after it.
+        """
+        timestamp = self._timestamp(timestamp)
+        with self.pool.connection() as connection:
+            snapshot = connection.execute(SELECT_PERMISSION_SNAPSHOT_AT, (room_id, timestamp)).fetchone()
+            users = set(json.loads(snapshot["user_ids"])) if snapshot else set()
+            position = snapshot["change_id"] if snapshot else 0
+            for row in connection.execute(SELECT_ROOM_CHANGES_AFTER, (room_id, position, timestamp)):
+                if row["action"] != "revoked":
+                    users.add(row["user_id"])
+                else:
+                    users.discard(row["user_id"])
+        return sorted(users)
+
+    def get_permission_version(self) -> int:
+        """Get the ID of the latest permission change (0 if there is none)."""
+        with self.pool.connection() as connection:
+            return connection.execute(SELECT_LATEST_PERMISSION_CHANGE_ID).fetchone()[0]
+
+    def get_permission_changes_since(self, version: int, until: int) -> List[PermissionChange]:
+        """Get the permission changes with IDs in (version, until], oldest first."""
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_PERMISSION_CHANGE_RANGE, (version, until)).fetchall()
+        return [PermissionChange(**{**dict(row), "time_slots": json.loads(row["time_slots"])}) for row in rows]
+
+    def get_user_permission_version(self, user_id: str) -> int:
+        """Get the ID of the latest permission change of a user (0 if there is none)."""
+        with self.pool.connection() as connection:
+            return connection.execute(SELECT_LATEST_USER_CHANGE_ID, (user_id,)).fetchone()[0]
+
+    def get_access_log_version(self) -> int:
+        """Get the rowid of the latest access log, shared by all workers for report caching."""
+        with self.pool.connection() as connection:
+            return connection.execute(SELECT_LATEST_ACCESS_LOG_ROWID).fetchone()[0]
+
+    def get_user_version(self) -> int:
+        """Get the count of user changes, shared by all workers for report caching."""
+        with self.pool.connection() as connection:
+            row = connection.execute(SELECT_DATA_VERSION, ("users",)).fetchone()
+        return row["version"] if row else 0
+
+    def get_access_logs(self,
+                        user_id: Optional[str] = None,
+                        room_id: Optional[str] = None,
+                        limit: int = 100,
+                        start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None) -> List[AccessLog]:
+        """Get access logs with optional filters, most recent first."""
+        conditions = []
+        params: list = []
+        if user_id:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if room_id:
+            conditions.append("room_id = ?")
+            params.append(room_id)
+        if start_date:
+            conditions.append("timestamp >= ?")
+            params.append(self._timestamp(start_date))
+        if end_date:
+            conditions.append("timestamp <= ?")
+            params.append(self._timestamp(end_date))
+
+        query = "SELECT * FROM access_logs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp DESC LIMIT ?"
+        params.append(limit)
+
+        with self.pool.connection() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return [AccessLog(**dict(row)) for row in rows]
+
+    def iter_access_logs(self,
+                         user_id: Optional[str] = None,
+                         room_id: Optional[str] = None,
+                         start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None,
+                         chunk_size: int = 1000) -> Iterator[List[AccessLog]]:
+        """Iterate over access logs with optional filters in chunks, oldest first.
+
+        Chunks are read with keyset pagination on (timestamp, rowid), the
+        order of the timestamp indexes, so every chunk is an index range
+        scan and no connection is held between chunks.
+        """
+        conditions = []
+        params: list = []
+        if user_id:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if room_id:
+            conditions.append("room_id = ?")
+            params.append(room_id)
+        if start_date:
+            conditions.append("timestamp >= ?")
+            params.append(self._timestamp(start_date))
+        if end_date:
+            conditions.append("timestamp <= ?")
+            params.append(self._timestamp(end_date))
+
+        query = "SELECT rowid AS row_key, * FROM access_logs WHERE " + " AND ".join(
+            conditions + ["(timestamp, rowid) > (?, ?)"]
+        ) + " ORDER BY timestamp, rowid LIMIT ?"
+        position = ("", 0)
+        while True:
+            with self.pool.connection() as connection:
+                rows = connection.execute(query, params + [*position, chunk_size]).fetchall()
+            if not rows:
+                return
+            position = (rows[-1]["timestamp"], rows[-1]["row_key"])
+            yield [AccessLog(**dict(row)) for row in rows]
+            if len(rows) < chunk_size:
+                return
+
+    def get_denied_access_logs(self,
+                               start_date: Optional[datetime] = None,
+                               end_date: Optional[datetime] = None,
+                               offset: int = 0,
+                               limit: int = 100) -> Tuple[List[AccessLog], int]:
+        """Get a page of denied access attempts, most recent first, and their total count."""
+        conditions = ["access_granted = 0"]
+        params: list = []
+        if start_date:
+            conditions.append("timestamp >= ?")
+            params.append(self._timestamp(start_date))
+        if end_date:
+            conditions.append("timestamp <= ?")
+            params.append(self._timestamp(end_date))
+        where = " WHERE " + " AND ".join(conditions)
+
+        with self.pool.connection() as connection:
+            total = connection.execute("SELECT COUNT(*) FROM access_logs" + where, params).fetchone()[0]
+            rows = connection.execute(
+                "SELECT * FROM access_logs" + where + " ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [AccessLog(**dict(row)) for row in rows], total
+
+    def get_access_counts(self,
+                          start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Count the accesses per room and per user within [start_date, end_date].
+
+        Whole hours are read from the rollups, after they caught up on the
+        logs saved since the last summary, and only the partial hours at
+        either end of the range are counted in SQL.
+        """
+        start_date = normalize_timestamp(start_date) if start_date else None
+        end_date = normalize_timestamp(end_date) if end_date else None
+        self._sync_access_rollups()
+        room_counts = self.access_rollups.room_counts(start_date, end_date)
+        user_counts = self.access_rollups.user_counts(start_date, end_date)
+        edges = partial_hours(start_date, end_date)
+        if edges:
+            with self.pool.connection() as connection:
+                for edge_start, edge_end in edges:
+                    params = (self._timestamp(edge_start), self._timestamp(edge_end))
+                    add_counts(room_counts, {
+                        row["key"]: row["count"] for row in connection.execute(COUNT_ACCESS_LOGS_BY_ROOM, params)
+                    })
+                    add_counts(user_counts, {
+                        row["key"]: row["count"] for row in connection.execute(COUNT_ACCESS_LOGS_BY_USER, params)
+                    })
+        return room_counts, user_counts
+
+    def get_all_users(self) -> List[User]:
+        """Get all users."""
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_ALL_USERS).fetchall()
+        return [User(**dict(row)) for row in rows]
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.pool.close()
+
+    def _sync_access_rollups(self) -> None:
+        """Count the access logs inserted since the rollups were last brought up to date."""
+        with self._rollup_lock, self.pool.connection() as connection:
+            position = connection.execute(SELECT_LATEST_ACCESS_LOG_ROWID).fetchone()[0]
+            if position == self._rollup_position:
+                return
+            # Inserts are serialized, so every row up to the latest rowid is committed
+            for row in connection.execute(COUNT_ACCESS_LOGS_BY_HOUR, (self._rollup_position, position)):
+                hour = hour_index(datetime.fromisoformat(row["hour"] + ":00"))
+                self.access_rollups.add_count(row["user_id"], row["room_id"], hour, row["count"])
+            self._rollup_position = position
+
+    def _load_journal_tail(self, connection: sqlite3.Connection) -> None:
+        """Rebuild the current room holders from the newest snapshots and the changes after them."""
+        self._room_holders: Dict[str, Set[str]] = {}
+        self._room_pending: Dict[str, int] = {}  # room_id -> changes since the room's snapshot
+        self._journal_position = 0
+        self._journal_timestamp: Optional[str] = None
+        snapshot_positions: Dict[str, int] = {}
+        for row in connection.execute(SELECT_LATEST_PERMISSION_SNAPSHOTS):
+            self._room_holders[row["room_id"]] = set(json.loads(row["user_ids"]))
+            snapshot_positions[row["room_id"]] = row["change_id"]
+            if row["change_id"] > self._journal_position:
+                self._journal_position = row["change_id"]
+                self._journal_timestamp = row["timestamp"]
+        # Replay from the oldest of the newest snapshots, skipping changes a room's snapshot covers
+        start = min(snapshot_positions.values(), default=0)
+        for row in connection.execute(SELECT_PERMISSION_CHANGES_AFTER, (start,)):
+            if row["change_id"] > snapshot_positions.get(row["room_id"], 0):
+                self._apply_journal_change(connection, row["change_id"], row["timestamp"],
+                                           row["user_id"], row["room_id"], row["action"])
+
+    def _apply_journal_tail(self, connection: sqlite3.Connection) -> None:
+        """Apply the journal changes appended by other processes since the last one applied."""
+        rows = connection.execute(SELECT_PERMISSION_CHANGES_AFTER, (self._journal_position,)).fetchall()
+        for row in rows:
+            self._apply_journal_change(connection, row["change_id"], row["timestamp"],
+                                       row["user_id"], row["room_id"], row["action"])
+
+    def _apply_journal_change(self, connection: sqlite3.Connection, change_id: int, timestamp: str,
+                              user_id: str, room_id: str, action: str) -> None:
+        """Apply a change to its room's holders, writing a snapshot once enough changes piled up."""
+        holders = self._room_holders.setdefault(room_id, set())
+        if action != "revoked":
+            holders.add(user_id)
+        else:
+            holders.discard(user_id)
+        self._journal_position = max(self._journal_position, change_id)
+        self._journal_timestamp = max(self._journal_timestamp or timestamp, timestamp)
+
+        pending = self._room_pending.get(room_id, 0) + 1
+        if pending >= max(RoomAccessTimeline.MIN_SNAPSHOT_INTERVAL, len(holders)):
+            connection.execute(INSERT_PERMISSION_SNAPSHOT, (
+                room_id, change_id, timestamp, json.dumps(sorted(holders))
+            ))
+            pending = 0
+        self._room_pending[room_id] = pending
+
+    def _write_permission(self, connection: sqlite3.Connection, permission: Permission) -> None:
+        """Replace the permission held for the same user and room, within the caller's transaction."""
+        time_slots = json.dumps([ts.model_dump(mode="json") for ts in permission.time_slots])
+        connection.execute(DELETE_PERMISSION, (permission.user_id, permission.room_id))
+        connection.execute(INSERT_PERMISSION, (
+            permission.permission_id, permission.user_id,
+            permission.room_id, time_slots
+        ))
+
+    def _access_log_row(self, log: AccessLog) -> tuple:
+        """Convert an access log into the parameters of INSERT_ACCESS_LOG."""
+        return (
+            log.log_id, self._timestamp(log.timestamp), log.user_id, log.room_id,
+            int(log.access_granted), log.device_id
+        )
+
+    def _permission_from_row(self, row: sqlite3.Row) -> Permission:
+        """Build a Permission from a permissions table row."""
+        return Permission(
+            permission_id=row["permission_id"],
+            user_id=row["user_id"],
+            room_id=row["room_id"],
+            time_slots=json.loads(row["time_slots"])
+        )
+
+    @staticmethod
+    def _timestamp(value: datetime) -> str:
+        """Format timestamps with a fixed width so they sort as text."""
+        return normalize_timestamp(value).isoformat(timespec="microseconds")
@@ -0,0 +1,96 @@
+"""Signed, stateless access tokens."""
+
+from typing import Any, Dict, Optional
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from datetime import datetime
+
+from ..models import Session
+from .database import Database
+
+
+class TokenService:
+    """Issues and verifies HS256-signed JWT access tokens.
+
+    A token carries everything needed to rebuild its Session, so any
+    worker holding the secret key can verify it without session state.
+    Logged out and refreshed tokens are recorded as revoked in the
+    database until they expire; with the SQLite backend every worker
+    sharing the database file rejects them.
+    """
+
+    def __init__(self, secret_key: str, database: Database, algorithm: str = "HS256"):
+        if algorithm != "HS256":
+            raise ValueError(f"Unsupported token algorithm: {algorithm}")
+        self.secret_key = secret_key.encode("utf-8")
+        self.database = database
+        self.algorithm = algorithm
+        self._header = _b64encode(json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode())
+
+    def issue(self, session: Session) -> str:
+        """Issue a token for a session."""
+        claims = {
+            "sub": session.user_id,
+            "sid": session.session_id,
+            "jti": uuid.uuid4().hex,
+            "iat": int(session.created_at.timestamp()),
+            "exp": int(session.expires_at.timestamp()),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = f"{self._header}.{payload}"
+        return f"{signing_input}.{self._sign(signing_input)}"
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        """Get the claims of a valid, unexpired and unrevoked token."""
+        try:
+            signing_input, signature = token.rsplit(".", 1)
+            header, payload = signing_input.split(".")
+            # Compare bytes: compare_digest rejects non-ASCII str operands with TypeError
+            expected = self._sign(signing_input).encode("ascii")
+            if header != self._header or not hmac.compare_digest(signature.encode("utf-8"), expected):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            # Malformed tokens (UnicodeError is a ValueError as well)
+            return None
+        if claims["exp"] < time.time() or self.database.is_token_revoked(claims["jti"]):
+            return None
+        return claims
+
+    def verify(self, token: str) -> Optional[Session]:
+        """Rebuild the session of a valid token."""
+        claims = self.decode(token)
+        if claims is None:
+            return None
+        return session_from_claims(claims)
+
+    def revoke(self, claims: Dict[str, Any]) -> None:
+        """Revoke a token until it expires."""
+        self.database.save_token_revocation(claims["jti"], claims["exp"])
+
+    def _sign(self, signing_input: str) -> str:
+        digest = hmac.new(self.secret_key, signing_input.encode("ascii"), hashlib.sha256).digest()
+        return _b64encode(digest)
+
+
+def session_from_claims(claims: Dict[str, Any]) -> Session:
+    """Build a Session from token claims."""
+    return Session(
+        session_id=claims["sid"],
+        user_id=claims["sub"],
+        created_at=datetime.fromtimestamp(claims["iat"]),
+        expires_at=datetime.fromtimestamp(claims["exp"]),
+        is_active=True
+    )
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
@@ -4,6 +4,7 @@ from typing import List, Optional
 from ..models import Session, Credentials, AccessLog, Report
 from .session_manager import SessionManager
 from .permission_manager import PermissionManager
+from .report_jobs import ReportJobQueue
 
 
 class WebServer:
@@ -20,19 +21,22 @@ class WebInterface:
     def __init__(
         self,
         session_manager: SessionManager,
-        permission_manager: PermissionManager
+        permission_manager: PermissionManager,
+        report_jobs: Optional[ReportJobQueue] = None
     ):
         """Initialize the WebInterface.
         
         Args:
             session_manager: The session manager service
             permission_manager: The permission manager service
+            report_jobs: The report job queue holding generated reports
         """
         self.server = WebServer()
         self.session_manager = session_manager
         self.permission_manager = permission_manager
+        self.report_jobs = report_jobs
     
-    def handle_login(self, cred: Credentials) -> Optional[Session]:
+    async def handle_login(self, cred: Credentials) -> Optional[Session]:
         """Handle user login with provided credentials.
         
         Args:
@@ -43,7 +47,7 @@ class WebInterface:
         """
         # Method stub - delegate to session manager
         try:
-            session = self.session_manager.create_session(cred)
+            session = await self.session_manager.create_session(cred)
             return session
         except Exception:
             return None
@@ -70,9 +74,15 @@ class WebInterface:
     def export_reports(self) -> List[Report]:
         """Export reports through the web interface.
         
+        Completed reports are streamed as CSV or NDJSON by
+        ``GET /reports/{job_id}/export``.
+        
         Returns:
-            List of available reports for export
+            List of available reports for export, most recent first
         """
-        # Method stub - would generate and export reports
-        # For prototype, return empty list
-        return []
+        if self.report_jobs is None:
+            return []
+        return [
+            job.report for job in reversed(self.report_jobs.jobs.values())
+            if job.report is not None
+        ]
@@ -0,0 +1,57 @@
+"""Benchmark comparing the JSON and binary card encodings."""
+
+import random
+import timeit
+from datetime import time
+
+from app.models import Permission, TimeSlot
+from app.services.card_format import (
+    encode_card_json,
+    encode_card_binary,
+    decode_card_binary,
+)
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri"]
+
+
+def build_permissions(room_count: int) -> list[Permission]:
+    """Build a realistic set of permissions: weekday office hours per room."""
+    permissions = []
+    for room in range(room_count):
+        start = random.choice([7, 8, 9])
+        end = random.choice([16, 17, 18, 20])
+        permissions.append(Permission(
+            permission_id=str(room),
+            user_id="benchmark_user",
+            room_id=f"building_a_room_{room:03d}",
+            time_slots=[
+                TimeSlot(start_time=time(start), end_time=time(end), day_of_week=day)
+                for day in WEEKDAYS
+            ]
+        ))
+    return permissions
+
+
+def benchmark(room_count: int, iterations: int = 2000) -> None:
+    """Print size and encode time of both encodings for one card."""
+    permissions = build_permissions(room_count)
+
+    json_card = encode_card_json("benchmark_user", 1, permissions)
+    binary_card = encode_card_binary("benchmark_user", 1, permissions)
+    assert decode_card_binary(binary_card)["permissions"][0]["room_id"] == permissions[0].room_id
+
+    json_time = timeit.timeit(lambda: encode_card_json("benchmark_user", 1, permissions), number=iterations)
+    binary_time = timeit.timeit(lambda: encode_card_binary("benchmark_user", 1, permissions), number=iterations)
+
+    print(f"{room_count:>5} rooms | "
+          f"json {len(json_card):>7} B {json_time / iterations * 1e6:>8.1f} us | "
+          f"binary {len(binary_card):>6} B {binary_time / iterations * 1e6:>8.1f} us | "
+          f"size ratio {len(binary_card) / len(json_card):.3f}")
+
+
+if __name__ == "__main__":
+    print("Card encoding benchmark (bytes per card, encode time per card)")
+    print("-" * 80)
+    random.seed(42)
+    for room_count in (1, 5, 20, 100):
+        benchmark(room_count)
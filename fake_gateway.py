@@ -0,0 +1,92 @@
+"""A minimal gateway simulator for local development.
+
+Listens for connections from the backend, stores the cards it receives
+and answers card updates, card batches, card syncs, digest requests and keepalive pings
+using the framed protocol of app/services/gateway_transport.py.
+
+Usage: uv run python fake_gateway.py [port]
+"""
+
+from typing import Any, Dict
+import asyncio
+import base64
+import sys
+
+from app.services.card_format import decode_card
+from app.services.card_sync import DIGEST_BUCKETS, card_bucket, card_digest, digest_root, encode_digest
+from app.services.gateway_transport import read_frame, encode_frame
+
+
+class FakeGateway:
+    """Card storage of a simulated gateway."""
+
+    def __init__(self):
+        self.cards: Dict[str, bytes] = {}  # user_id -> card data
+        self.version = 0
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one request from the backend."""
+        message_type = message.get("type")
+        payload = message.get("payload", {})
+        if message_type == "ping":
+            return {"type": "pong"}
+        if message_type == "card_update":
+            card_data = base64.b64decode(payload["card_data"])
+            self.cards[decode_card(card_data)["user_id"]] = card_data
+            return {"type": "ack", "status": "ok"}
+        if message_type == "card_batch":
+            for card_data in payload.get("cards", []):
+                card_data = base64.b64decode(card_data)
+                self.cards[decode_card(card_data)["user_id"]] = card_data
+            return {"type": "ack", "status": "ok", "results": [True] * len(payload.get("cards", []))}
+        if message_type == "card_sync":
+            bucket_count = payload.get("bucket_count", DIGEST_BUCKETS)
+            replaced = set(payload.get("replace_buckets", []))
+            if replaced:
+                self.cards = {
+                    user_id: card_data for user_id, card_data in self.cards.items()
+                    if card_bucket(user_id, bucket_count) not in replaced
+                }
+            for user_id in payload.get("removed", []):
+                self.cards.pop(user_id, None)
+            for user_id, card_data in payload.get("cards", {}).items():
+                self.cards[user_id] = base64.b64decode(card_data)
+            self.version = payload.get("version", self.version)
+            print(f"Card sync to version {self.version}: {len(payload.get('cards', {}))} cards, "
+                  f"{len(replaced)} buckets replaced, {len(self.cards)} cards stored")
+            return {"type": "ack", "status": "ok", "root": digest_root(card_digest(self.cards, bucket_count))}
+        if message_type == "card_digest":
+            bucket_count = payload.get("bucket_count", DIGEST_BUCKETS)
+            return {"type": "digest", "status": "ok", "buckets": encode_digest(card_digest(self.cards, bucket_count))}
+        return {"type": "ack", "status": "error", "error": f"Unknown message type: {message_type}"}
+
+
+async def serve(gateway: FakeGateway, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Answer requests from one backend connection until it closes."""
+    peer = writer.get_extra_info("peername")
+    print(f"Backend connected from {peer}")
+    try:
+        while True:
+            message = await read_frame(reader)
+            reply = gateway.handle(message)
+            writer.write(encode_frame({**reply, "reply_to": message.get("id")}))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+        print(f"Backend {peer} disconnected")
+
+
+async def main(port: int) -> None:
+    gateway = FakeGateway()
+    server = await asyncio.start_server(
+        lambda reader, writer: serve(gateway, reader, writer), "127.0.0.1", port
+    )
+    print(f"Fake gateway listening on 127.0.0.1:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 7000))
@@ -5,11 +5,12 @@ with separated data models, business logic, and API endpoints.
 """
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 
 from app.core.config import settings
+from app.core.logging import setup_logging, shutdown_logging
 from app.api import (
     auth_router,
     permissions_router,
@@ -18,22 +19,23 @@ from app.api import (
     gateways_router,
     reports_router
 )
-from app.services import GatewayCommService
-
-# Global gateway service instance
-gateway_service = GatewayCommService()
+from app.services import ServiceContainer
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management."""
-    # Startup
-    gateway_service.start()
+    # Startup: build every service exactly once and share it with all routers
+    setup_logging()
+    services = ServiceContainer()
+    app.state.services = services
+    await services.start()
     
     yield
     
     # Shutdown
-    gateway_service.stop()
+    await services.stop()
+    shutdown_logging()
 
 
 # Create FastAPI application
@@ -77,12 +79,14 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint."""
     return {
         "status": "healthy",
         "timestamp": "2025-07-28T12:00:00Z",
-        "version": "0.1.0"
+        "version": "0.1.0",
+        "gateways": request.app.state.services.gateway_service.get_status_counts(),
+        "caches": request.app.state.services.permission_manager.get_cache_stats()
     }
 
 
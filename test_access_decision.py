@@ -0,0 +1,141 @@
+"""Tests for compiled weekly access schedules."""
+
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+
+from app.models import TimeSlot
+from app.services import Database, PermissionManager
+from app.services.access_decision import AccessDecisionEngine, AccessSchedule, day_index
+
+
+# 2026-01-05 is a Monday
+MONDAY = datetime(2026, 1, 5)
+
+
+def _at(day, hour, minute=0, second=0):
+    """Get a timestamp in the week starting on MONDAY (day 0 is Monday)."""
+    return MONDAY.replace(day=MONDAY.day + day, hour=hour, minute=minute, second=second)
+
+
+def _slot(day, start, end, is_active=True):
+    return TimeSlot(start_time=start, end_time=end, day_of_week=day, is_active=is_active)
+
+
+def test_slots_are_half_open():
+    """Access starts at start_time and ends just before end_time."""
+    schedule = AccessSchedule([_slot("wednesday", time(8), time(17))])
+
+    assert not schedule.allows(_at(2, 7, 59, 59))
+    assert schedule.allows(_at(2, 8))
+    assert schedule.allows(_at(2, 16, 59, 59))
+    assert not schedule.allows(_at(2, 17))
+    assert not schedule.allows(_at(1, 12))
+    assert not schedule.allows(_at(3, 12))
+
+
+def test_slots_ending_before_they_start_wrap_past_midnight():
+    """A night slot continues into the next day."""
+    schedule = AccessSchedule([_slot("Fri", time(22), time(6))])
+
+    assert not schedule.allows(_at(4, 21, 59))
+    assert schedule.allows(_at(4, 23, 30))
+    assert schedule.allows(_at(5, 0))
+    assert schedule.allows(_at(5, 5, 59, 59))
+    assert not schedule.allows(_at(5, 6))
+    assert not schedule.allows(_at(3, 23))
+
+
+def test_sunday_night_slots_wrap_to_monday_morning():
+    """Slots running past the end of the week continue at the start of it."""
+    schedule = AccessSchedule([_slot("sunday", time(20), time(2))])
+
+    assert schedule.allows(_at(6, 20))
+    assert schedule.allows(_at(6, 23, 59, 59))
+    assert schedule.allows(_at(0, 0))
+    assert schedule.allows(_at(7, 1, 59))  # the following Monday
+    assert not schedule.allows(_at(0, 2))
+    assert not schedule.allows(_at(6, 19, 59))
+
+
+def test_equal_start_and_end_cover_the_whole_day():
+    """A slot from a time to the same time grants access for 24 hours."""
+    schedule = AccessSchedule([_slot("tuesday", time(6), time(6))])
+
+    assert schedule.allows(_at(1, 6))
+    assert schedule.allows(_at(2, 5, 59, 59))
+    assert not schedule.allows(_at(2, 6))
+    assert not schedule.allows(_at(1, 5, 59))
+
+
+def test_overlapping_slots_are_merged_and_inactive_slots_ignored():
+    """Overlapping and touching slots merge into one interval."""
+    schedule = AccessSchedule([
+        _slot("monday", time(8), time(12)),
+        _slot("monday", time(10), time(14)),
+        _slot("monday", time(14), time(16)),
+        _slot("monday", time(18), time(20), is_active=False),
+        _slot("sunday", time(23), time(1)),
+    ])
+
+    assert schedule.starts == [0, 8 * 3600, 6 * 86400 + 23 * 3600]
+    assert schedule.ends == [3600, 16 * 3600, 7 * 86400]
+    assert not schedule.allows(_at(0, 19))
+
+
+def test_invalid_day_names_are_rejected():
+    """Unknown days fail compilation instead of never matching."""
+    assert day_index(" Sunday ") == 6
+    with pytest.raises(ValueError):
+        AccessSchedule([_slot("someday", time(8), time(9))])
+
+
+def test_engine_keeps_bounded_negative_entries():
+    """Pairs without a permission are denied from a bounded LRU set."""
+    engine = AccessDecisionEngine(max_denied=2)
+    engine.set_schedule("u", "r", AccessSchedule([_slot("monday", time(8), time(9))]))
+    engine.set_schedule("u", "other", None)
+
+    assert engine.is_allowed("u", "r", _at(0, 8, 30))
+    assert not engine.is_allowed("u", "other", _at(0, 8, 30))
+    assert ("u", "other") in engine
+    engine.set_schedule("u", "r", None)
+    assert not engine.is_allowed("u", "r", _at(0, 8, 30))
+    assert engine.schedules == {}
+
+    engine.is_allowed("u", "other", _at(0, 8, 30))  # most recently used
+    engine.set_schedule("v", "r", None)
+    assert list(engine.denied) == [("u", "other"), ("v", "r")]
+    engine.set_schedule("v", "r", AccessSchedule([_slot("monday", time(8), time(9))]))
+    assert ("v", "r") not in engine.denied and engine.is_allowed("v", "r", _at(0, 8, 30))
+
+
+def test_denied_checks_do_not_reload_permissions():
+    """Repeated checks of a pair without a permission load the user's permissions once."""
+    database = Database()
+    permission_manager = PermissionManager(database)
+    loads = []
+    get_user_permissions = permission_manager.get_user_permissions
+    permission_manager.get_user_permissions = lambda user_id: loads.append(user_id) or get_user_permissions(user_id)
+
+    for _ in range(3):
+        assert not permission_manager.check_access("2", "lab", _at(0, 12))
+    assert loads == ["2"]
+
+    permission_manager.create_permission("2", "lab", [_slot("monday", time(8), time(17))])
+    assert permission_manager.check_access("2", "lab", _at(0, 12))
+    permission_manager.revoke_permission("2", "lab")
+    assert not permission_manager.check_access("2", "lab", _at(0, 12))
+    assert loads == ["2"]
+
+
+def test_aware_times_are_checked_in_local_time():
+    """Single and batch checks convert timezone-aware times like stored logs."""
+    permission_manager = PermissionManager(Database())
+    permission_manager.create_permission("2", "lab", [_slot("monday", time(8), time(17))])
+    local = _at(0, 12, 30)
+    aware = local.astimezone(timezone(timedelta(hours=-5)))
+
+    assert permission_manager.check_access("2", "lab", aware)
+    assert permission_manager.check_access_batch([("2", "lab", aware), ("2", "lab", local)]) == [True, True]
+    assert not permission_manager.check_access("2", "lab", _at(0, 7, 30).astimezone(timezone.utc))
@@ -0,0 +1,107 @@
+"""Tests for the time-ordered access log store and its range queries."""
+
+from datetime import datetime, timedelta
+
+from app.models import AccessLog
+from app.services.access_log_store import AccessLogStore, LogSeries
+
+
+START = datetime(2026, 1, 1, 8)
+
+
+def _log(minute, user_id="u", room_id="r", access_granted=True, log_id=None):
+    return AccessLog(
+        log_id=log_id,
+        timestamp=START + timedelta(minutes=minute),
+        user_id=user_id,
+        room_id=room_id,
+        access_granted=access_granted
+    )
+
+
+def test_late_arrivals_are_inserted_after_equal_timestamps():
+    """Out-of-order logs keep the series sorted and stable for equal timestamps."""
+    series = LogSeries()
+    for minute, log_id in [(0, "a"), (10, "b"), (5, "c"), (10, "d"), (5, "e"), (-1, "f")]:
+        series.append(_log(minute, log_id=log_id))
+
+    assert series.timestamps == sorted(series.timestamps)
+    assert [log.log_id for log in series.logs] == ["f", "a", "c", "e", "b", "d"]
+
+
+def test_bounds_are_inclusive_at_both_ends():
+    """Logs exactly at start_date or end_date are within the range."""
+    series = LogSeries()
+    for minute in [0, 5, 5, 10, 15]:
+        series.append(_log(minute))
+
+    assert series.bounds() == (0, 5)
+    assert series.bounds(START + timedelta(minutes=5), START + timedelta(minutes=10)) == (1, 4)
+    assert series.bounds(START + timedelta(minutes=6)) == (3, 5)
+    assert series.bounds(end_date=START - timedelta(minutes=1)) == (0, 0)
+    assert series.bounds(START + timedelta(minutes=20)) == (5, 5)
+
+
+def test_newest_and_chunks_slice_the_range():
+    """Queries return the newest logs first; chunks return the range oldest first."""
+    series = LogSeries()
+    for minute in range(10):
+        series.append(_log(minute, log_id=str(minute)))
+    start, end = START + timedelta(minutes=2), START + timedelta(minutes=8)
+
+    assert [log.log_id for log in series.newest(start, end, limit=3)] == ["8", "7", "6"]
+    assert [log.log_id for log in series.newest(start, end, limit=100)] == [str(m) for m in range(8, 1, -1)]
+    chunks = list(series.chunks(start, end, chunk_size=3))
+    assert [[log.log_id for log in chunk] for chunk in chunks] == [["2", "3", "4"], ["5", "6", "7"], ["8"]]
+    assert list(series.chunks(START + timedelta(minutes=20))) == []
+
+
+def test_chunks_neither_skip_nor_repeat_logs_under_late_inserts():
+    """Late logs inserted while a chunked export is consumed do not shift the stream."""
+    series = LogSeries()
+    for minute, log_id in [(0, "a"), (1, "b"), (1, "c"), (1, "d"), (2, "e"), (3, "f")]:
+        series.append(_log(minute, log_id=log_id))
+
+    returned = []
+    for chunk in series.chunks(chunk_size=2):
+        returned.extend(log.log_id for log in chunk)
+        if len(returned) == 2:
+            series.append(_log(0, log_id="late-0"))
+            series.append(_log(1, log_id="late-1"))
+            series.append(_log(4, log_id="late-4"))
+
+    assert returned == ["a", "b", "c", "d", "late-1", "e", "f", "late-4"]
+
+
+def test_store_queries_the_most_selective_index():
+    """User, room and user/room filters give the same result as filtering all logs."""
+    store = AccessLogStore()
+    logs = [
+        _log(minute, user_id=f"u{minute % 3}", room_id=f"r{minute % 2}", log_id=str(minute))
+        for minute in range(30)
+    ]
+    for log in logs:
+        store.append(log)
+    start, end = START + timedelta(minutes=4), START + timedelta(minutes=25)
+
+    for user_id, room_id in [(None, None), ("u1", None), (None, "r0"), ("u2", "r1"), ("missing", None)]:
+        expected = [
+            log for log in reversed(logs)
+            if (user_id is None or log.user_id == user_id)
+            and (room_id is None or log.room_id == room_id)
+            and start <= log.timestamp <= end
+        ]
+        assert store.query(user_id, room_id, start, end, limit=100) == expected
+
+
+def test_denied_attempts_are_paged_with_a_total():
+    """Denied attempts are counted within the range and paged newest first."""
+    store = AccessLogStore()
+    for minute in range(20):
+        store.append(_log(minute, access_granted=minute % 4 == 0, log_id=str(minute)))
+
+    page, total = store.query_denied(START + timedelta(minutes=2), START + timedelta(minutes=13), offset=3, limit=4)
+    assert total == 9
+    assert [log.log_id for log in page] == ["9", "7", "6", "5"]
+    page, total = store.query_denied(offset=100)
+    assert (page, total) == ([], 15)
@@ -0,0 +1,82 @@
+"""Tests for access log storage and the group-committing writer."""
+
+from datetime import datetime, timezone
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.models import AccessLog
+from app.services import AccessLogWriter, Database
+
+
+def _log(user_id="u", room_id="r", timestamp=None):
+    return AccessLog(timestamp=timestamp or datetime.now(), user_id=user_id, room_id=room_id)
+
+
+def test_failing_writer_does_not_affect_others():
+    """Only the writer with a bad entry gets the error of a grouped commit."""
+    async def run():
+        database = Database()
+        writer = AccessLogWriter(database, max_delay=0.05)
+        await writer.start()
+        good = [_log("good") for _ in range(3)]
+        bad = [_log("bad"), _log("bad")]
+        bad[1].timestamp = "not a timestamp"  # assignment is not validated
+        results = await asyncio.gather(writer.write(good), writer.write(bad), return_exceptions=True)
+        await writer.stop()
+        return database, results
+
+    database, results = asyncio.run(run())
+    assert results[0] is None
+    assert isinstance(results[1], TypeError)
+    assert len(database.access_logs) == 3
+    assert database.access_rollups.user_counts() == {"good": 3}
+
+
+def test_batch_save_is_all_or_nothing():
+    """A batch with an invalid entry stores none of its entries."""
+    database = Database()
+    logs = [_log(), _log()]
+    logs[1].room_id = None
+    with pytest.raises(TypeError):
+        database.save_access_logs(logs)
+    assert len(database.access_logs) == 0
+    assert database.access_rollups.room_counts() == {}
+
+
+def test_aware_timestamps_are_stored_as_naive_local_time():
+    """Timezone-aware timestamps can be stored and queried next to naive ones."""
+    database = Database()
+    aware = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    database.save_access_logs([_log(timestamp=datetime(2026, 1, 1, 11)), _log(timestamp=aware)])
+
+    expected = aware.astimezone().replace(tzinfo=None)
+    logs = database.get_access_logs(start_date=aware, end_date=aware)
+    assert [log.timestamp for log in logs] == [expected]
+    assert logs[0].timestamp.tzinfo is None
+
+
+def test_ndjson_errors_report_the_committed_part():
+    """A bad line after committed batches reports where the client can resume."""
+    lines = [json.dumps({"user_id": f"u{i}", "room_id": "ndjson"}) for i in range(8)]
+    lines.insert(2, "")
+    lines[8] = "{not json"
+    with TestClient(app) as client:
+        token = client.post("/auth/login", json={"username": "bob", "password": "x"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"}
+        app.state.services.access_log_writer.max_batch_size = 3
+
+        response = client.post("/access-logs/batch", content="\n".join(lines), headers=headers)
+        detail = response.json()["detail"]
+        assert response.status_code == 400
+        assert "line 9" in detail["message"]
+        assert (detail["committed"], detail["committed_through_line"]) == (6, 7)
+
+        lines[8] = json.dumps({"user_id": "u7", "room_id": "ndjson"})
+        resumed = client.post("/access-logs/batch", content="\n".join(lines[7:]), headers=headers)
+        stored = app.state.services.database.get_access_logs(room_id="ndjson", limit=100)
+    assert resumed.json()["count"] == 2
+    assert sorted(log.user_id for log in stored) == [f"u{i}" for i in range(8)]
@@ -0,0 +1,118 @@
+"""Tests for the hourly and daily access rollups."""
+
+from datetime import datetime, timedelta
+import random
+
+from app.models import AccessLog
+from app.services import Database
+from app.services.access_rollup import AccessRollups, RollupSeries, hour_index, hour_start, partial_hours
+
+
+START = datetime(2026, 3, 1)
+
+
+def _expected(logs, start_date, end_date, key, whole_hours=False):
+    """Count the logs by brute force, optionally only within the hours entirely in the range."""
+    counts = {}
+    for log in logs:
+        if start_date and log.timestamp < start_date:
+            continue
+        if end_date and log.timestamp > end_date:
+            continue
+        hour = hour_index(log.timestamp)
+        if whole_hours and start_date and hour_start(hour) < start_date:
+            continue
+        if whole_hours and end_date and hour_start(hour + 1) - timedelta(microseconds=1) > end_date:
+            continue
+        counts[getattr(log, key)] = counts.get(getattr(log, key), 0) + 1
+    return counts
+
+
+def _random_logs(seed):
+    rng = random.Random(seed)
+    return [
+        AccessLog(
+            timestamp=START + timedelta(minutes=rng.randrange(10 * 24 * 60)),
+            user_id=f"u{rng.randrange(4)}",
+            room_id=f"r{rng.randrange(3)}"
+        )
+        for _ in range(3000)
+    ]
+
+
+RANGES = [
+        (None, None),
+        (START + timedelta(hours=5, minutes=30), START + timedelta(hours=5, minutes=45)),  # one hour
+        (START + timedelta(hours=7), START + timedelta(hours=19, minutes=59)),  # within a day
+        (START + timedelta(hours=23), START + timedelta(days=1, hours=1)),  # across midnight
+        (START + timedelta(days=2, hours=13), START + timedelta(days=7, hours=4)),  # whole days between
+        (START + timedelta(days=3), START + timedelta(days=5, hours=23, minutes=59)),  # whole days only
+        (START + timedelta(days=4, hours=12), None),
+        (None, START + timedelta(days=1, hours=12)),
+        (START - timedelta(days=30), START + timedelta(days=30)),
+        (START + timedelta(days=3), START + timedelta(days=2)),  # empty range
+        (START + timedelta(hours=10, minutes=50), START + timedelta(hours=11, minutes=5)),  # no whole hour
+        (START + timedelta(hours=10, minutes=50), START + timedelta(days=1, hours=11, minutes=5)),
+        (START + timedelta(hours=2, microseconds=1), START + timedelta(hours=3, microseconds=-1)),
+    ]
+
+
+def test_counts_match_a_scan_for_partial_day_ranges():
+    """Ranges starting and ending mid-day combine hour and day buckets correctly."""
+    logs = _random_logs(21)
+    rollups = AccessRollups()
+    for log in logs:
+        rollups.add(log)
+
+    for start_date, end_date in RANGES:
+        assert rollups.room_counts(start_date, end_date) == _expected(logs, start_date, end_date, "room_id", True)
+        assert rollups.user_counts(start_date, end_date) == _expected(logs, start_date, end_date, "user_id", True)
+
+
+def test_partial_hours_are_counted_from_the_logs():
+    """Summaries over sub-hour ranges count exactly the logs within the range."""
+    database = Database()
+    for minute in range(0, 120, 5):
+        database.save_access_log(AccessLog(
+            timestamp=START + timedelta(hours=10, minutes=minute), user_id="u", room_id="r"
+        ))
+    start_date, end_date = START + timedelta(hours=10, minutes=50), START + timedelta(hours=11, minutes=5)
+
+    assert len(database.get_access_logs(start_date=start_date, end_date=end_date)) == 4
+    assert database.get_access_counts(start_date, end_date) == ({"r": 4}, {"u": 4})
+    assert partial_hours(start_date, end_date) == [(start_date, end_date)]
+
+    logs = _random_logs(22)
+    database = Database()
+    database.save_access_logs(logs)
+    for start_date, end_date in RANGES:
+        assert database.get_access_counts(start_date, end_date) == (
+            _expected(logs, start_date, end_date, "room_id"),
+            _expected(logs, start_date, end_date, "user_id")
+        )
+
+
+def test_sparse_series_over_long_ranges():
+    """A few stored days within a range of years are summed from the stored days."""
+    series = RollupSeries()
+    first = hour_index(START)
+    series.add(first + 3)
+    series.add(first + 30, count=4)
+    series.add(first + 400 * 24 + 2, count=2)
+
+    assert series.count(first + 4, first + 500 * 24) == 6
+    assert series.count(first - 1000 * 24, first + 3) == 1
+    assert series.count(first + 31, first + 400 * 24 + 1) == 0
+    assert series.count() == series.total == 7
+    assert RollupSeries().count(first, first + 48) == 0
+
+
+def test_logs_and_hourly_counts_share_the_buckets():
+    """Counted logs and added hourly counts are summed in the same buckets."""
+    rollups = AccessRollups()
+    rollups.add(AccessLog(timestamp=START, user_id="u", room_id="r"))
+    rollups.add_count("u", "r", hour_index(START), count=5)
+
+    assert rollups.room_counts(START, START + timedelta(minutes=59, seconds=59.999999)) == {"r": 6}
+    assert rollups.room_counts(START, START + timedelta(minutes=59)) == {}
+    assert rollups.user_counts(START + timedelta(hours=1)) == {}
@@ -0,0 +1,57 @@
+"""Tests for the card data cache."""
+
+from datetime import time
+
+from app.models import TimeSlot
+from app.services import CardCache, Database, PermissionManager
+
+
+SLOTS = [TimeSlot(start_time=time(8), end_time=time(17), day_of_week="monday")]
+
+
+def test_least_recently_used_cards_are_evicted_first():
+    """Storing past the byte cap evicts the cards read least recently."""
+    cache = CardCache(max_bytes=30)
+    cache.put("a", 1, b"a" * 10)
+    cache.put("b", 1, b"b" * 10)
+    cache.put("c", 1, b"c" * 10)
+    assert cache.get("a", 1) == b"a" * 10  # "b" is now the least recently used
+
+    cache.put("d", 1, b"d" * 10)
+    assert cache.get("b", 1) is None
+    assert [cache.get(user_id, 1) is not None for user_id in "acd"] == [True, True, True]
+    assert cache.stats()["bytes"] == 30 and len(cache) == 3
+
+
+def test_oversized_cards_are_not_stored():
+    """A card larger than the cap is not cached and does not evict others."""
+    cache = CardCache(max_bytes=10)
+    cache.put("a", 1, b"a" * 5)
+    cache.put("b", 1, b"b" * 11)
+    assert cache.get("b", 1) is None and cache.get("a", 1) == b"a" * 5
+
+
+def test_cards_of_other_versions_miss():
+    """A card is only returned for the version it was built for, and replacing it frees its bytes."""
+    cache = CardCache()
+    cache.put("a", 1, b"old")
+    assert cache.get("a", 2) is None
+    cache.put("a", 2, b"newer")
+    assert cache.get("a", 2) == b"newer" and cache.get("a", 1) is None
+    assert cache.stats()["bytes"] == 5
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_permission_changes_invalidate_only_the_changed_user():
+    """Cards are rebuilt after a change of the user's permissions and served from the cache otherwise."""
+    permission_manager = PermissionManager(Database())
+    permission_manager.create_permission("2", "lab", SLOTS)
+    permission_manager.create_permission("3", "lab", SLOTS)
+    alice, bob = permission_manager.generate_card_data("2"), permission_manager.generate_card_data("3")
+    assert permission_manager.generate_card_data("2") is alice
+
+    permission_manager.create_permission("2", "office", SLOTS)
+    assert permission_manager.generate_card_data("2") != alice
+    assert permission_manager.generate_card_data("3") is bob
+    stats = permission_manager.card_cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 3
@@ -0,0 +1,213 @@
+"""Tests for the card update dispatcher, run against fake_gateway.py."""
+
+from datetime import time
+import asyncio
+import base64
+
+from fake_gateway import FakeGateway, serve
+from app.core.config import settings
+from app.models import CardUpdateItem, Gateway, TimeSlot
+from app.services import CardUpdateDispatcher, Database, GatewayCommService, PermissionManager
+from app.services.card_format import decode_card
+
+
+SLOTS = [TimeSlot(start_time=time(8), end_time=time(17), day_of_week="monday")]
+
+
+async def _hung(reader, writer):
+    """Accept a connection and never answer."""
+    await reader.read()
+
+
+async def _setup(monkeypatch, gateways):
+    """Start a gateway service whose card updates go through a dispatcher.
+
+    ``gateways`` maps gateway IDs to (room, handler) pairs; a handler of
+    None registers a gateway on a port nobody listens on.
+    """
+    monkeypatch.setattr(settings, "gateway_timeout", 1)
+    permission_manager = PermissionManager(Database())
+    service = GatewayCommService()
+    dispatcher = CardUpdateDispatcher(permission_manager, service, delay=0.01, retry_delay=0.01)
+    permission_manager.card_dispatcher = dispatcher
+    await service.start()
+    servers = []
+    for gateway_id, (room_id, handler) in gateways.items():
+        port = 1
+        if handler is not None:
+            server = await asyncio.start_server(handler, "127.0.0.1", 0)
+            servers.append(server)
+            port = server.sockets[0].getsockname()[1]
+        await service.register_gateway(Gateway(
+            gateway_id=gateway_id, name=gateway_id, location="Lab", is_online=True,
+            ip_address="127.0.0.1", port=port, rooms=[room_id]
+        ))
+    await dispatcher.start()
+    return permission_manager, service, dispatcher, servers
+
+
+async def _teardown(service, dispatcher, servers):
+    await service.stop()
+    await dispatcher.stop()
+    for server in servers:
+        server.close()
+
+
+def test_unreachable_gateways_do_not_delay_others(monkeypatch):
+    """Updates for a healthy gateway arrive while other gateways are dead or hang."""
+    async def run():
+        fake = FakeGateway()
+        permission_manager, service, dispatcher, servers = await _setup(monkeypatch, {
+            "dead": ("r_dead", None),
+            "hung": ("r_hung", _hung),
+            "ok": ("r_ok", lambda reader, writer: serve(fake, reader, writer)),
+        })
+        try:
+            async with asyncio.timeout(5):
+                while not (service.transports["ok"].connected.is_set()
+                           and service.transports["hung"].connected.is_set()):
+                    await asyncio.sleep(0.01)
+            permission_manager.create_permission("u1", "r_dead", SLOTS)
+            permission_manager.create_permission("u1", "r_hung", SLOTS)
+            await asyncio.sleep(0.05)
+            permission_manager.create_permission("u2", "r_ok", SLOTS)
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            async with asyncio.timeout(5):
+                while "u2" not in fake.cards:
+                    await asyncio.sleep(0.01)
+            elapsed = loop.time() - started
+            in_flight = set(dispatcher._senders)
+        finally:
+            await _teardown(service, dispatcher, servers)
+        return dispatcher, elapsed, in_flight
+
+    dispatcher, elapsed, in_flight = asyncio.run(run())
+    assert elapsed < 0.5
+    assert ("hung", "u1") in in_flight
+    assert dispatcher.skipped == 1  # the dead gateway never connected
+    assert dispatcher.sent == 1
+
+
+def test_latest_card_replaces_queued_ones(monkeypatch):
+    """Changes made while a card is being sent result in sending the latest card."""
+    async def run():
+        fake = FakeGateway()
+        permission_manager, service, dispatcher, servers = await _setup(monkeypatch, {
+            "ok": ("r", lambda reader, writer: serve(fake, reader, writer)),
+        })
+        try:
+            async with asyncio.timeout(5):
+                await service.transports["ok"].connected.wait()
+            for hour in range(8, 16):
+                permission_manager.create_permission(
+                    "u", "r", [TimeSlot(start_time=time(hour), end_time=time(17), day_of_week="monday")]
+                )
+                await asyncio.sleep(0.02)
+            await dispatcher.flush()
+        finally:
+            await _teardown(service, dispatcher, servers)
+        return permission_manager, fake, dispatcher
+
+    permission_manager, fake, dispatcher = asyncio.run(run())
+    assert fake.cards["u"] == permission_manager.generate_card_data("u")
+    assert dispatcher.stats()["in_flight"] == 0
+    assert dispatcher.failed == 0
+
+
+class FlakyGateway(FakeGateway):
+    """Rejects the cards of some users in card batches, once or always."""
+
+    def __init__(self, rejected_once=(), rejected_always=()):
+        super().__init__()
+        self.rejected_once = set(rejected_once)
+        self.rejected_always = set(rejected_always)
+        self.batches = []  # users of every card batch received
+
+    def handle(self, message):
+        if message.get("type") != "card_batch":
+            return super().handle(message)
+        users = [decode_card(base64.b64decode(card))["user_id"] for card in message["payload"]["cards"]]
+        self.batches.append(users)
+        results = []
+        for card, user_id in zip(message["payload"]["cards"], users):
+            if user_id in self.rejected_always or user_id in self.rejected_once:
+                self.rejected_once.discard(user_id)
+                results.append(False)
+            else:
+                self.cards[user_id] = base64.b64decode(card)
+                results.append(True)
+        return {"type": "ack", "status": "ok", "results": results}
+
+
+def test_bulk_updates_report_results_per_item_and_gateway(monkeypatch):
+    """Invalid items, unreachable gateways and rejected cards are reported per item."""
+    async def run():
+        flaky = FlakyGateway(rejected_once={"u2"})
+        permission_manager, service, dispatcher, servers = await _setup(monkeypatch, {
+            "ok": ("r_ok", lambda reader, writer: serve(flaky, reader, writer)),
+            "dead": ("r_dead", None),
+        })
+        try:
+            async with asyncio.timeout(5):
+                await service.transports["ok"].connected.wait()
+            for user_id in ("u1", "u2", "u3"):
+                permission_manager.create_permission(user_id, "r_ok", SLOTS)
+            permission_manager.create_permission("u3", "r_dead", SLOTS)
+            await dispatcher.flush()
+            flaky.batches.clear()
+            sent, failed = dispatcher.sent, dispatcher.failed
+
+            results = await dispatcher.send_bulk([
+                CardUpdateItem(user_id="u1"),
+                CardUpdateItem(),
+                CardUpdateItem(card_data="not hex"),
+                CardUpdateItem(card_data=permission_manager.generate_card_data("u2").hex()),
+                CardUpdateItem(user_id="u3"),
+                CardUpdateItem(user_id="nobody"),
+            ])
+        finally:
+            await _teardown(service, dispatcher, servers)
+        return flaky, dispatcher, results, sent, failed
+
+    flaky, dispatcher, results, sent, failed = asyncio.run(run())
+    assert [result.index for result in results] == list(range(6))
+    assert results[0].delivered == {"ok": True} and results[0].error is None
+    assert results[1].error.startswith("Invalid card update") and results[1].delivered == {}
+    assert results[2].error.startswith("Invalid card update") and results[2].delivered == {}
+    # Rejected on the first attempt, delivered by the retry
+    assert results[3].user_id == "u2" and results[3].delivered == {"ok": True}
+    assert results[4].delivered == {"ok": True, "dead": False}
+    assert results[5].error == "No gateway serves the rooms of this card"
+
+    # One batch for the gateway, then a retry carrying only the rejected card
+    assert flaky.batches == [["u1", "u2", "u3"], ["u2"]]
+    assert dispatcher.sent - sent == 3 and dispatcher.failed - failed == 1
+
+
+def test_bulk_updates_give_up_after_the_retry_limit(monkeypatch):
+    """A card rejected on every attempt is reported as not delivered."""
+    async def run():
+        flaky = FlakyGateway()
+        permission_manager, service, dispatcher, servers = await _setup(monkeypatch, {
+            "ok": ("r_ok", lambda reader, writer: serve(flaky, reader, writer)),
+        })
+        try:
+            async with asyncio.timeout(5):
+                await service.transports["ok"].connected.wait()
+            permission_manager.create_permission("u1", "r_ok", SLOTS)
+            permission_manager.create_permission("u2", "r_ok", SLOTS)
+            await dispatcher.flush()
+            flaky.batches.clear()
+            flaky.rejected_always.add("u2")
+
+            results = await dispatcher.send_bulk([CardUpdateItem(user_id="u1"), CardUpdateItem(user_id="u2")])
+        finally:
+            await _teardown(service, dispatcher, servers)
+        return flaky, dispatcher, results
+
+    flaky, dispatcher, results = asyncio.run(run())
+    assert results[0].delivered == {"ok": True}
+    assert results[1].delivered == {"ok": False}
+    assert flaky.batches == [["u1", "u2"]] + [["u2"]] * (dispatcher.max_retry_attempts - 1)
@@ -0,0 +1,93 @@
+"""Tests for the JSON and binary card encodings."""
+
+from datetime import time
+import json
+
+import pytest
+
+from app.models import Permission, TimeSlot
+from app.services.access_decision import day_index
+from app.services.card_format import (
+    decode_card,
+    decode_card_binary,
+    encode_card_binary,
+    encode_card_json,
+)
+
+
+def _permissions():
+    return [
+        Permission(
+            permission_id="p1",
+            user_id="user-ä",
+            room_id="lab",
+            time_slots=[
+                TimeSlot(start_time=time(8), end_time=time(17), day_of_week="monday"),
+                TimeSlot(start_time=time(8), end_time=time(17), day_of_week="friday"),
+                TimeSlot(start_time=time(18, 30), end_time=time(20), day_of_week="friday"),
+            ]
+        ),
+        Permission(
+            permission_id="p2",
+            user_id="user-ä",
+            room_id="office",
+            time_slots=[TimeSlot(start_time=time(0), end_time=time(23, 59), day_of_week="sunday")]
+        ),
+    ]
+
+
+def _normalized(card):
+    """Compare days by index and sort time slots; the binary encoding keeps neither day names nor slot order."""
+    for permission in card["permissions"]:
+        for ts in permission["time_slots"]:
+            ts["day_of_week"] = day_index(ts["day_of_week"])
+        permission["time_slots"].sort(key=lambda ts: (ts["day_of_week"], ts["start_time"]))
+    return card
+
+
+def test_binary_round_trip_matches_json_encoding():
+    """Decoding a binary card gives the structure of the JSON encoding."""
+    permissions = _permissions()
+    binary = encode_card_binary("user-ä", 300, permissions)
+    expected = json.loads(encode_card_json("user-ä", 300, permissions))
+
+    assert _normalized(decode_card_binary(binary)) == _normalized(expected)
+    assert len(binary) < len(encode_card_json("user-ä", 300, permissions))
+
+
+def test_inactive_slots_are_skipped_by_both_encodings():
+    """Inactive time slots are not encoded, so both encodings describe the same card."""
+    permission = Permission(
+        permission_id="p",
+        user_id="u",
+        room_id="r",
+        time_slots=[TimeSlot(start_time=time(8), end_time=time(9), day_of_week="monday", is_active=False)]
+    )
+    for card in (decode_card_binary(encode_card_binary("u", 1, [permission])),
+                 decode_card(encode_card_json("u", 1, [permission]))):
+        assert card["permissions"] == [{"room_id": "r", "time_slots": []}]
+
+
+def test_decode_card_detects_encoding():
+    """decode_card accepts both encodings."""
+    permissions = _permissions()
+    for encode in (encode_card_json, encode_card_binary):
+        card = decode_card(encode("user-ä", 7, permissions))
+        assert card["user_id"] == "user-ä"
+        assert card["version"] == 7
+        assert [p["room_id"] for p in card["permissions"]] == ["lab", "office"]
+
+
+@pytest.mark.parametrize("data", [b"[]", b"{}", b'{"user_id": "u", "permissions": [1]}', b"not json"])
+def test_decode_card_rejects_non_cards(data):
+    """JSON that is not a card is rejected with ValueError."""
+    with pytest.raises(ValueError):
+        decode_card(data)
+
+
+def test_truncated_binary_cards_are_rejected():
+    """Every truncation of a binary card is rejected with ValueError."""
+    binary = encode_card_binary("user-ä", 300, _permissions())
+    for length in range(2, len(binary)):
+        with pytest.raises(ValueError):
+            decode_card(binary[:length])
@@ -0,0 +1,125 @@
+"""Tests for delta card sync and digest repair, run against fake_gateway.py."""
+
+from datetime import time
+import asyncio
+
+from fake_gateway import FakeGateway, serve
+from app.core.config import settings
+from app.models import Gateway, TimeSlot
+from app.services import CardUpdateDispatcher, Database, GatewayCommService, PermissionManager
+from app.services.card_sync import card_digest
+
+
+SLOTS = [TimeSlot(start_time=time(8), end_time=time(17), day_of_week="monday")]
+
+
+def _permission_manager(users=200):
+    permission_manager = PermissionManager(Database())
+    for i in range(users):
+        permission_manager.create_permission(f"user{i}", f"r{i % 3}", SLOTS)
+    return permission_manager
+
+
+def test_card_digest_is_updated_incrementally():
+    """The kept digest equals a digest rebuilt from all cards after changes."""
+    permission_manager = _permission_manager()
+    rooms = ["r0", "r1"]
+    permission_manager.get_card_digest(rooms)
+
+    permission_manager.create_permission("user1", "r0", SLOTS)  # second room of a user
+    permission_manager.revoke_permission("user3", "r0")  # loses the last room of the set
+    permission_manager.create_permission("user2", "r1", SLOTS)  # joins the set
+    permission_manager.create_permission("newcomer", "r9", SLOTS)  # outside the set
+
+    digest = permission_manager.get_card_digest(rooms)
+    cards = permission_manager.get_cards_for_rooms(rooms)
+    assert digest.buckets == card_digest(cards)
+    assert set(digest.hashes) == set(cards)
+
+
+def test_card_digests_are_bounded_and_dropped_with_their_gateways(monkeypatch):
+    """Only the most recently used digests are kept, and unused room sets are dropped."""
+    permission_manager = _permission_manager(users=30)
+    monkeypatch.setattr(settings, "card_digest_cache_size", 2)
+    for rooms in (["r0"], ["r1"], ["r0"], ["r2"]):
+        permission_manager.get_card_digest(rooms)
+    assert list(permission_manager.card_digests) == [frozenset({"r0"}), frozenset({"r2"})]
+
+    service = GatewayCommService()
+    service.permission_manager = permission_manager
+
+    def gateway(gateway_id):
+        return Gateway(gateway_id=gateway_id, name="Gateway", location="Lab", is_online=False,
+                       ip_address="127.0.0.1", port=1, rooms=["r0"])
+
+    async def scenario():
+        await service.register_gateway(gateway("a"))
+        await service.register_gateway(gateway("b"))
+        await service.unregister_gateway("a")
+        assert frozenset({"r0"}) in permission_manager.card_digests  # still used by "b"
+        await service.unregister_gateway("b")
+        assert frozenset({"r0"}) not in permission_manager.card_digests
+
+    asyncio.run(scenario())
+
+
+async def _synced_gateway(permission_manager):
+    """Start a fake gateway and a service that has completed the initial sync."""
+    fake = FakeGateway()
+    server = await asyncio.start_server(lambda reader, writer: serve(fake, reader, writer), "127.0.0.1", 0)
+    service = GatewayCommService()
+    service.permission_manager = permission_manager
+    permission_manager.card_dispatcher = CardUpdateDispatcher(permission_manager, service)
+    await service.start()
+    await service.register_gateway(Gateway(
+        gateway_id="g", name="Gateway", location="Lab", is_online=True,
+        ip_address="127.0.0.1", port=server.sockets[0].getsockname()[1], rooms=["r0", "r1"]
+    ))
+    async with asyncio.timeout(5):
+        while "g" not in service.acked_versions:
+            await asyncio.sleep(0.01)
+    return fake, server, service
+
+
+def test_delta_sync_sends_only_changed_cards():
+    """After the initial sync, only cards changed since the acknowledged version are sent."""
+    async def run():
+        permission_manager = _permission_manager()
+        fake, server, service = await _synced_gateway(permission_manager)
+        try:
+            permission_manager.create_permission("user0", "r1", SLOTS)
+            permission_manager.revoke_permission("user1", "r1")
+            stats = await service.sync_with_gateway("g")
+        finally:
+            await service.stop()
+            server.close()
+        return permission_manager, fake, stats
+
+    permission_manager, fake, stats = asyncio.run(run())
+    assert stats["mode"] == "delta"
+    assert stats["cards_sent"] == 1
+    assert stats["cards_removed"] == 1
+    assert fake.cards == permission_manager.get_cards_for_rooms(["r0", "r1"])
+
+
+def test_digest_repair_resends_only_mismatched_buckets():
+    """Drift on the gateway is found by the digest root and repaired bucket by bucket."""
+    async def run():
+        permission_manager = _permission_manager()
+        fake, server, service = await _synced_gateway(permission_manager)
+        try:
+            del fake.cards["user0"]
+            fake.cards["ghost"] = b"stale"
+            stats = await service.sync_with_gateway("g")
+            again = await service.sync_with_gateway("g")
+        finally:
+            await service.stop()
+            server.close()
+        return permission_manager, fake, stats, again
+
+    permission_manager, fake, stats, again = asyncio.run(run())
+    assert stats["mode"] == "reconcile"
+    assert 1 <= stats["buckets_resent"] <= 2
+    assert stats["cards_sent"] < len(fake.cards)
+    assert fake.cards == permission_manager.get_cards_for_rooms(["r0", "r1"])
+    assert again == {"mode": "delta", "version": again["version"], "cards_sent": 0, "cards_removed": 0}
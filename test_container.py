@@ -0,0 +1,46 @@
+"""Tests for the shared service container."""
+
+from fastapi.testclient import TestClient
+
+from main import app
+from app.services import Database, ServiceContainer
+
+
+def test_services_share_one_database():
+    """Every service is built once and works against the container's database."""
+    database = Database()
+    services = ServiceContainer(database)
+
+    assert services.permission_manager.database is database
+    assert services.session_manager.database is database
+    assert services.access_log_writer.database is database
+    assert services.permission_manager.card_dispatcher is services.card_dispatcher
+    assert services.gateway_service.permission_manager is services.permission_manager
+    services.report_jobs.shutdown()
+
+
+def test_routers_see_each_others_writes():
+    """A user created through one router can log in through another and get permissions."""
+    with TestClient(app) as client:
+        services = app.state.services
+        admin = client.post("/auth/login", json={"username": "admin", "password": "x"}).json()
+        headers = {"Authorization": f"Bearer {admin['access_token']}"}
+
+        created = client.post("/users/", headers=headers, json={
+            "username": "carol", "email": "carol@th-owl.de", "full_name": "Carol", "password": "secret"
+        })
+        assert created.status_code == 200
+        user_id = created.json()["user_id"]
+        assert services.database.get_user_by_id(user_id).username == "carol"
+
+        assert client.post("/auth/login", json={"username": "carol", "password": "wrong"}).status_code == 401
+        assert client.post("/auth/login", json={"username": "carol", "password": "secret"}).status_code == 200
+
+        granted = client.post("/permissions/", headers=headers, json={
+            "user_id": user_id, "room_id": "lab",
+            "time_slots": [{"start_time": "08:00:00", "end_time": "17:00:00", "day_of_week": "mon"}]
+        })
+        assert granted.status_code == 200
+        listed = client.get(f"/permissions/user/{user_id}", headers=headers).json()
+        assert [permission["room_id"] for permission in listed] == ["lab"]
+        assert services.permission_manager.get_user_permissions(user_id)[0].room_id == "lab"
@@ -0,0 +1,56 @@
+"""Tests for the secondary indexes of the in-memory Database."""
+
+from datetime import datetime, timedelta
+
+from app.models import AccessLog, Permission
+from app.services import Database
+
+
+START = datetime(2026, 1, 1, 8)
+
+
+def _permission(permission_id, user_id, room_id):
+    return Permission(permission_id=permission_id, user_id=user_id, room_id=room_id, time_slots=[])
+
+
+def test_permission_index_follows_saves_and_deletes():
+    """The user/room index stays consistent with the permissions by ID."""
+    database = Database()
+    database.save_permission(_permission("p1", "2", "lab"))
+    database.save_permission(_permission("p2", "2", "office"))
+    database.save_permission(_permission("p3", "3", "lab"))
+
+    # Same user and room: the new permission replaces the old one
+    database.save_permission(_permission("p4", "2", "lab"))
+    assert {p.permission_id for p in database.get_permissions("2")} == {"p4", "p2"}
+    assert "p1" not in database.permissions
+
+    # Same permission ID, moved to another room
+    database.save_permission(_permission("p2", "2", "garage"))
+    assert database.get_permission("2", "office") is None
+    assert database.get_permission("2", "garage").permission_id == "p2"
+
+    database.delete_permission("3", "lab")
+    database.delete_permission("3", "missing")
+    assert database.get_permissions("3") == [] and "3" not in database.user_permissions
+    assert {p.permission_id for p in database.get_all_permissions()} == {"p2", "p4"}
+
+
+def test_access_log_queries_use_the_user_and_room_indexes():
+    """Filtered queries return the matching logs, most recent first."""
+    database = Database()
+    for minute in range(10):
+        database.save_access_log(AccessLog(
+            timestamp=START + timedelta(minutes=minute),
+            user_id=f"u{minute % 2}",
+            room_id=f"r{minute % 3}"
+        ))
+
+    by_user = database.get_access_logs(user_id="u1")
+    assert [log.timestamp.minute for log in by_user] == [9, 7, 5, 3, 1]
+    by_both = database.get_access_logs(user_id="u0", room_id="r0")
+    assert [log.timestamp.minute for log in by_both] == [6, 0]
+    ranged = database.get_access_logs(room_id="r1", start_date=START + timedelta(minutes=2), limit=1)
+    assert [log.timestamp.minute for log in ranged] == [7]
+    assert database.get_access_logs(user_id="nobody") == []
+    assert len({log.log_id for log in database.get_access_logs(limit=100)}) == 10
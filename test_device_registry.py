@@ -0,0 +1,76 @@
+"""Tests for the device status registry and its running counters."""
+
+from datetime import datetime
+import asyncio
+import time
+
+from app.models import DeviceStatus, Gateway
+from app.services import DeviceRegistry, GatewayCommService
+
+
+SEEN = datetime(2026, 1, 1, 8)
+
+
+def _status(device_id, gateway_id="g1", is_online=True, battery_level=None):
+    return DeviceStatus(device_id=device_id, is_online=is_online, last_heartbeat=SEEN,
+                        gateway_id=gateway_id, battery_level=battery_level)
+
+
+def test_counters_follow_status_updates():
+    """Replacing a device's status moves it between the counters."""
+    registry = DeviceRegistry(active_timeout=60, low_battery_threshold=20)
+    registry.update(_status("d1", battery_level=10))
+    registry.update(_status("d2", is_online=False, battery_level=80))
+    registry.update(_status("d3"))
+    assert registry.stats() == {"total": 3, "online": 2, "active": 3, "low_battery": 1}
+
+    registry.update(_status("d1", is_online=False, battery_level=90))
+    registry.update(_status("d2", battery_level=5))
+    assert registry.stats() == {"total": 3, "online": 2, "active": 3, "low_battery": 1}
+
+    registry.remove("d2")
+    registry.remove("unknown")
+    assert registry.stats() == {"total": 2, "online": 1, "active": 2, "low_battery": 0}
+
+
+def test_devices_are_indexed_by_their_current_gateway():
+    """A device reported by another gateway moves to that gateway's index."""
+    registry = DeviceRegistry(active_timeout=60, low_battery_threshold=20)
+    registry.update(_status("d1"))
+    registry.update(_status("d2"))
+    registry.update(_status("d1", gateway_id="g2"))
+
+    assert [status.device_id for status in registry.get_gateway_devices("g1")] == ["d2"]
+    assert [status.device_id for status in registry.get_gateway_devices("g2")] == ["d1"]
+    registry.remove_gateway("g1")
+    assert registry.get_gateway_devices("g1") == []
+    assert registry.stats() == {"total": 1, "online": 1, "active": 1, "low_battery": 0}
+
+
+def test_silent_devices_stop_counting_as_active():
+    """Devices without a status within the timeout are no longer active."""
+    registry = DeviceRegistry(active_timeout=60, low_battery_threshold=20)
+    registry.update(_status("d1"))
+    registry.update(_status("d2"))
+    start = time.monotonic()
+    registry.activity.beat("d2", now=start + 50)
+
+    assert registry.activity.check(now=start + 70) == ["d1"]
+    assert registry.stats()["active"] == 1 and registry.stats()["online"] == 2
+
+
+def test_unregistering_a_gateway_forgets_its_devices():
+    """Devices behind an unregistered gateway leave the counters."""
+
+    async def run():
+        service = GatewayCommService()
+        for gateway_id in ("g1", "g2"):
+            await service.register_gateway(Gateway(gateway_id=gateway_id, name=gateway_id, location="Lab"))
+        service.devices.update(_status("d1", battery_level=5))
+        service.devices.update(_status("d2", gateway_id="g2"))
+        await service.unregister_gateway("g1")
+        return service.devices
+
+    devices = asyncio.run(run())
+    assert devices.get_device("d1") is None
+    assert devices.stats() == {"total": 1, "online": 1, "active": 1, "low_battery": 0}
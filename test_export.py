@@ -0,0 +1,56 @@
+"""Tests for the streamed report and access log exports."""
+
+import csv
+import io
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.models import ReportType
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        token = client.post("/auth/login", json={"username": "bob", "password": "x"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def _completed_job(client, report_type, **request):
+    job = client.post("/reports/", json={
+        "report_type": report_type, "title": "Export", "parameters": {}, **request
+    }).json()
+    deadline = time.monotonic() + 5
+    while job["status"] in ("pending", "running") and time.monotonic() < deadline:
+        time.sleep(0.01)
+        job = client.get(f"/reports/{job['job_id']}").json()
+    assert job["status"] == "completed"
+    return job
+
+
+@pytest.mark.parametrize("report_type", [report_type.value for report_type in ReportType])
+def test_reports_requested_as_json_export_as_csv(client, report_type):
+    """Reports submitted with the default format are exported as CSV."""
+    job = _completed_job(client, report_type)
+    assert job["report"]["format"] == "json"
+
+    response = client.get(f"/reports/{job['job_id']}/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert next(csv.reader(io.StringIO(response.text)))
+
+
+def test_report_format_and_query_select_the_export_format(client):
+    """NDJSON reports export as NDJSON; the query overrides it; unknown formats fail."""
+    client.post("/access-logs/", json={"user_id": "2", "room_id": "lab"})
+    job = _completed_job(client, "access_summary", format="ndjson")
+
+    response = client.get(f"/reports/{job['job_id']}/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()]
+    assert client.get(f"/reports/{job['job_id']}/export?format=csv").headers["content-type"].startswith("text/csv")
+    assert client.get(f"/reports/{job['job_id']}/export?format=pdf").status_code == 400
@@ -0,0 +1,77 @@
+"""Tests for the heartbeat deadline heap of the gateway liveness monitor."""
+
+import asyncio
+
+from app.services import GatewayLivenessMonitor
+
+
+def _monitor(timeout=10):
+    timed_out = []
+    return GatewayLivenessMonitor(timeout, timed_out.append), timed_out
+
+
+def test_silent_gateways_time_out_at_their_deadline():
+    """A gateway without heartbeats goes offline once its deadline passed."""
+    monitor, timed_out = _monitor()
+    monitor.beat("a", now=0)
+    monitor.beat("b", now=5)
+
+    assert monitor.check(now=9) == []
+    assert monitor.check(now=10) == ["a"]
+    assert monitor.check(now=15) == ["b"]
+    assert timed_out == ["a", "b"]
+    assert monitor.online_count == 0 and monitor._deadlines == []
+
+
+def test_heartbeats_reschedule_stale_heap_entries():
+    """Heartbeats push no entries; a due entry of a gateway heard from since is moved back."""
+    monitor, timed_out = _monitor()
+    monitor.beat("a", now=0)
+    for now in range(1, 10):
+        monitor.beat("a", now=now)
+    assert len(monitor._deadlines) == 1
+
+    assert monitor.check(now=10) == []
+    assert monitor._deadlines == [(19, "a")]
+    assert monitor.is_online("a")
+    assert monitor.check(now=19) == ["a"]
+    assert timed_out == ["a"]
+
+
+def test_offline_gateways_drop_their_entries_lazily():
+    """Entries of gateways marked offline are discarded when due, and a new beat reschedules."""
+    monitor, timed_out = _monitor()
+    monitor.beat("a", now=0)
+    monitor.mark_offline("a")
+    assert not monitor.is_online("a") and len(monitor._deadlines) == 1
+
+    assert monitor.check(now=10) == []
+    assert monitor._deadlines == [] and timed_out == []
+
+    monitor.beat("a", now=12)
+    assert monitor._deadlines == [(22, "a")]
+    # Marked offline and back online before the old entry came due
+    monitor.mark_offline("a")
+    monitor.beat("a", now=15)
+    assert len(monitor._deadlines) == 1
+    assert monitor.check(now=22) == []
+    assert monitor.check(now=25) == ["a"]
+
+
+def test_background_task_times_out_gateways():
+    """The running monitor wakes up for new deadlines and times gateways out."""
+    async def run():
+        monitor, timed_out = _monitor(timeout=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.01)  # idle with no deadlines
+            monitor.beat("a")
+            async with asyncio.timeout(1):
+                while not timed_out:
+                    await asyncio.sleep(0.01)
+        finally:
+            await monitor.stop()
+        return monitor, timed_out
+
+    monitor, timed_out = asyncio.run(run())
+    assert timed_out == ["a"] and monitor.online_count == 0
@@ -0,0 +1,112 @@
+"""Tests for the gateway telemetry WebSocket."""
+
+import asyncio
+import json
+
+from app.api.gateways import gateway_telemetry
+from app.core.config import settings
+from app.models import Credentials, Gateway
+from app.services import AccessLogWriter, Database, GatewayCommService, SessionManager
+
+
+class HalfClosedWebSocket:
+    """A socket whose peer stopped reading: frames arrive, sending fails."""
+
+    def __init__(self, frames):
+        self.headers = {}
+        self.frames = list(frames)
+        self.closed_with = None
+        self.closed = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if self.frames:
+            return {"type": "websocket.receive", "text": self.frames.pop(0)}
+        await self.closed.wait()  # the peer sends nothing more until the server closes
+        return {"type": "websocket.disconnect", "code": self.closed_with}
+
+    async def send_json(self, data):
+        raise RuntimeError("Cannot send on a closed connection")
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+        self.closed.set()
+
+
+class RecordingWebSocket(HalfClosedWebSocket):
+    """A socket that records acknowledgements and disconnects once all are sent."""
+
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.sent = []
+        self.expected = len(frames)
+
+    async def send_json(self, data):
+        self.sent.append(data)
+        if len(self.sent) == self.expected:
+            self.closed.set()
+
+
+class FailingWriter(AccessLogWriter):
+    """A writer whose storage fails."""
+
+    async def write(self, logs):
+        raise OSError("disk full")
+
+
+def test_failed_log_writes_still_acknowledge_applied_statuses():
+    """Only the access logs are reported as not accepted when storing them fails."""
+
+    async def run():
+        database = Database()
+        session_manager = SessionManager(database)
+        session = await session_manager.create_session(Credentials(username="bob", password="x"))
+        gateway_service = GatewayCommService()
+        await gateway_service.register_gateway(Gateway(gateway_id="g", name="g", location="Lab", is_online=True))
+        frame = json.dumps({
+            "seq": 1,
+            "access_logs": [{"user_id": "u", "room_id": "r", "timestamp": "2026-01-01T08:00:00"}],
+            "device_status": [{"device_id": "d", "status": True, "last_seen": "2026-01-01T08:00:00"}]
+        })
+        websocket = RecordingWebSocket([frame])
+        async with asyncio.timeout(2):
+            await gateway_telemetry(
+                websocket, "g", session_manager.issue_token(session),
+                session_manager, gateway_service, FailingWriter(database)
+            )
+        return websocket, gateway_service
+
+    websocket, gateway_service = asyncio.run(run())
+    ack = websocket.sent[0]
+    assert ack["accepted"] == 1
+    assert ack["access_logs_accepted"] == 0 and ack["device_status_accepted"] == 1
+    assert "disk full" in ack["errors"][0]["error"]
+    assert gateway_service.devices.stats()["total"] == 1
+
+
+def test_failed_acknowledgements_close_the_connection(monkeypatch):
+    """A failing acknowledger ends the connection instead of blocking the receiver."""
+    monkeypatch.setattr(settings, "gateway_ingest_window", 1)
+
+    async def run():
+        database = Database()
+        session_manager = SessionManager(database)
+        session = await session_manager.create_session(Credentials(username="bob", password="x"))
+        gateway_service = GatewayCommService()
+        await gateway_service.register_gateway(Gateway(gateway_id="g", name="g", location="Lab", is_online=True))
+        frames = [
+            json.dumps({"seq": seq, "access_logs": [{"user_id": "u", "room_id": "r", "timestamp": "2026-01-01T08:00:00"}]})
+            for seq in range(5)
+        ]
+        websocket = HalfClosedWebSocket(frames)
+        async with asyncio.timeout(2):
+            await gateway_telemetry(
+                websocket, "g", session_manager.issue_token(session),
+                session_manager, gateway_service, AccessLogWriter(database)
+            )
+        return websocket
+
+    websocket = asyncio.run(run())
+    assert websocket.closed_with == 1011
@@ -0,0 +1,116 @@
+"""Tests for the framed gateway connection, run against fake_gateway.py."""
+
+import asyncio
+import base64
+import time
+
+from fastapi.testclient import TestClient
+
+from fake_gateway import FakeGateway, serve
+from main import app
+from app.services.card_format import decode_card, encode_card_json
+from app.services.gateway_transport import GatewayConnection
+
+
+async def _start_gateway(gateway, drop_first=0):
+    """Serve a fake gateway on a free port; the first ``drop_first`` connections are closed at once."""
+    dropped = []
+
+    async def handle(reader, writer):
+        if len(dropped) < drop_first:
+            dropped.append(writer)
+            writer.close()
+            return
+        await serve(gateway, reader, writer)
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_requests_are_multiplexed_on_one_connection():
+    """Concurrent requests on one connection get their own replies."""
+    async def run():
+        gateway = FakeGateway()
+        server, port = await _start_gateway(gateway)
+        connection = GatewayConnection("g", "127.0.0.1", port, request_timeout=5)
+        connection.start()
+        try:
+            cards = [encode_card_json(f"user{i}", 1, []) for i in range(20)]
+            replies = await asyncio.gather(
+                connection.request("ping"),
+                *(
+                    connection.request("card_update", {"card_data": base64.b64encode(card).decode("ascii")})
+                    for card in cards
+                )
+            )
+        finally:
+            await connection.close()
+            server.close()
+        return gateway, replies
+
+    gateway, replies = asyncio.run(run())
+    assert replies[0]["type"] == "pong"
+    assert all(reply["status"] == "ok" for reply in replies[1:])
+    assert sorted(gateway.cards) == sorted(f"user{i}" for i in range(20))
+    assert decode_card(gateway.cards["user3"])["user_id"] == "user3"
+
+
+def test_reconnects_after_connection_drops():
+    """A dropped connection is re-opened with backoff and serves requests again."""
+    async def run():
+        server, port = await _start_gateway(FakeGateway(), drop_first=2)
+        connects = []
+        connection = GatewayConnection(
+            "g", "127.0.0.1", port, request_timeout=5, min_backoff=0.01,
+            on_connect=connects.append
+        )
+        connection.start()
+        try:
+            async with asyncio.timeout(5):
+                while len(connects) < 3:
+                    await asyncio.sleep(0.01)
+                await connection.connected.wait()
+            reply = await connection.request("ping")
+        finally:
+            await connection.close()
+            server.close()
+        return reply, connects
+
+    reply, connects = asyncio.run(run())
+    assert reply["type"] == "pong"
+    assert len(connects) >= 3
+
+
+def test_closing_fails_requests_waiting_to_be_sent():
+    """Requests queued while the gateway is unreachable fail when the connection closes."""
+    async def run():
+        connection = GatewayConnection("g", "127.0.0.1", 1, request_timeout=30, min_backoff=0.01)
+        connection.start()
+        requests = [asyncio.create_task(connection.request("ping")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await connection.close()
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        return results, time.monotonic() - started, connection
+
+    results, elapsed, connection = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert elapsed < 1
+    assert connection.send_queue.empty() and not connection._pending
+
+
+def test_card_updates_to_unconnected_gateways_fail_fast():
+    """The card update endpoint does not wait for a gateway that is not connected."""
+    with TestClient(app) as client:
+        token = client.post("/auth/login", json={"username": "admin", "password": "x"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        client.post("/gateways/", headers=headers, json={
+            "gateway_id": "offline", "name": "Offline", "location": "Lab",
+            "ip_address": "127.0.0.1", "port": 1, "rooms": ["lab"]
+        })
+        started = time.monotonic()
+        response = client.post("/gateways/offline/card-update", headers=headers, json={
+            "card_data": encode_card_json("2", 1, []).hex()
+        })
+        assert response.status_code == 503
+        assert time.monotonic() - started < 5
@@ -0,0 +1,67 @@
+"""Tests for sampled, queue-based structured logging."""
+
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+
+from app.core.logging import RecordQueueHandler, SamplingFilter, StructuredFormatter
+
+
+class RecordingHandler(logging.Handler):
+    """Keeps formatted lines and the threads that formatted them."""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(StructuredFormatter())
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+        self.threads.add(threading.current_thread())
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def test_sampling_keeps_one_record_per_interval():
+    """Sampled events are kept once per interval; other records always pass."""
+    sampling = SamplingFilter({"frequent": 0.25, "muted": 0})
+    records = [logging.makeLogRecord({"event": "frequent"}) for _ in range(10)]
+    kept = [record for record in records if sampling.filter(record)]
+
+    assert kept == [records[0], records[4], records[8]]
+    assert kept[0].sample_rate == 0.25
+    assert not sampling.filter(logging.makeLogRecord({"event": "muted"}))
+    assert sampling.filter(logging.makeLogRecord({"event": "rare"}))
+    assert sampling.filter(logging.makeLogRecord({}))
+
+
+def test_records_are_formatted_by_the_writer_thread():
+    """Queued records keep their arguments and traceback until the listener formats them."""
+    log_queue = queue.SimpleQueue()
+    handler = RecordingHandler()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    logger = _logger("app.test_logging", RecordQueueHandler(log_queue))
+    listener.start()
+    try:
+        logger.info("gateway %s registered", "g1", extra={"gateway_id": "g1"})
+        try:
+            raise ValueError("bad frame")
+        except ValueError:
+            logger.exception("boom")
+    finally:
+        listener.stop()
+
+    info, error = [json.loads(line) for line in handler.lines]
+    assert info["message"] == "gateway g1 registered" and info["gateway_id"] == "g1"
+    assert error["message"] == "boom"
+    assert "ValueError: bad frame" in error["exception"]
+    assert handler.threads and threading.current_thread() not in handler.threads
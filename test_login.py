@@ -0,0 +1,58 @@
+"""Tests for login through the in-memory credential index."""
+
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.models import Credentials
+from app.services import Database, SessionManager
+
+
+def _login(session_manager, username, password="x"):
+    return asyncio.run(session_manager.create_session(Credentials(username=username, password=password)))
+
+
+def test_logins_are_found_by_username_or_email():
+    """The index matches usernames and emails case-insensitively and follows changes."""
+    database = Database()
+    assert database.get_user_by_login("ALICE").user_id == "2"
+    assert database.get_user_by_login("Bob@TH-OWL.de").user_id == "3"
+    assert database.get_user_by_login("carol") is None
+
+    alice = database.get_user_by_id("2")
+    database.save_user(alice.model_copy(update={"username": "alice2", "email": "a2@th-owl.de"}))
+    assert database.get_user_by_login("alice") is None
+    assert database.get_user_by_login("alice@th-owl.de") is None
+    assert database.get_user_by_login("A2@th-owl.de").user_id == "2"
+
+
+def test_stored_passwords_are_verified_in_a_worker_thread(monkeypatch):
+    """Only the right password logs in, and PBKDF2 runs off the event loop thread."""
+    monkeypatch.setattr(settings, "password_hash_iterations", 1000)
+    session_manager = SessionManager(Database())
+    asyncio.run(session_manager.set_password("2", "correct horse"))
+    assert session_manager.database.get_password_hash("2").startswith("pbkdf2_sha256$1000$")
+
+    threads = []
+    verify_password = session_manager._verify_password
+
+    def recording_verify(password, password_hash):
+        threads.append(threading.current_thread())
+        return verify_password(password, password_hash)
+    monkeypatch.setattr(session_manager, "_verify_password", recording_verify)
+
+    assert _login(session_manager, "alice", "wrong") is None
+    assert _login(session_manager, "alice@th-owl.de", "correct horse").user_id == "2"
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+
+def test_users_without_a_stored_password_accept_any_password():
+    """Prototype users without a password hash log in with any password; unknown or inactive users do not."""
+    database = Database()
+    session_manager = SessionManager(database)
+    assert database.get_password_hash("3") is None
+    assert _login(session_manager, "bob", "anything").user_id == "3"
+
+    assert _login(session_manager, "nobody") is None
+    database.save_user(database.get_user_by_id("3").model_copy(update={"is_active": False}))
+    assert _login(session_manager, "bob") is None
@@ -0,0 +1,123 @@
+"""Tests for the active permission cache."""
+
+from datetime import time
+
+from fastapi.testclient import TestClient
+
+from main import app
+from app.models import Permission, TimeSlot
+from app.services import Database, PermissionManager
+
+
+SLOTS = [TimeSlot(start_time=time(8), end_time=time(17), day_of_week="monday")]
+
+
+class CountingDatabase(Database):
+    """In-memory database counting permission reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_permissions(self, user_id):
+        self.reads += 1
+        return super().get_permissions(user_id)
+
+    def get_all_permissions(self):
+        self.reads += 1
+        return super().get_all_permissions()
+
+
+def _database_with_permissions():
+    database = CountingDatabase()
+    for user_id, room_id in [("2", "lab"), ("2", "office"), ("3", "lab")]:
+        database.save_permission(Permission(permission_id=f"{user_id}-{room_id}", user_id=user_id,
+                                            room_id=room_id, time_slots=SLOTS))
+    database.reads = 0
+    return database
+
+
+def test_users_are_loaded_once_and_then_served_from_the_cache():
+    """Only the first lookup of a user reads the database."""
+    database = _database_with_permissions()
+    permission_manager = PermissionManager(database)
+    assert database.reads == 0
+
+    for _ in range(3):
+        assert {p.room_id for p in permission_manager.get_user_permissions("2")} == {"lab", "office"}
+        permission_manager.generate_card_data("2")
+    assert database.reads == 1
+    assert permission_manager.active_permissions.stats()["misses"] == 1
+    assert permission_manager.active_permissions.stats()["hits"] == 3  # two lookups, one card build
+
+
+def test_users_without_permissions_are_cached_up_to_the_limit():
+    """Users without permissions are read once, and only the most recent ones are kept."""
+    database = _database_with_permissions()
+    permission_manager = PermissionManager(database)
+    permission_manager.active_permissions.max_empty_users = 10
+    for i in range(100):
+        assert permission_manager.get_user_permissions(f"unknown{i}") == []
+    for _ in range(3):
+        assert permission_manager.get_user_permissions("unknown99") == []
+
+    stats = permission_manager.active_permissions.stats()
+    assert stats["users"] == 0 and stats["empty_users"] == 10
+    assert stats["misses"] == 100 and stats["hits"] == 3
+    assert database.reads == 100
+
+
+def test_grants_to_cached_users_without_permissions_are_applied():
+    """A grant moves a user from the empty set into the permission index."""
+    database = _database_with_permissions()
+    permission_manager = PermissionManager(database)
+    assert permission_manager.get_user_permissions("4") == []
+
+    permission_manager.create_permission("4", "lab", SLOTS)
+    assert [p.room_id for p in permission_manager.get_user_permissions("4")] == ["lab"]
+    assert permission_manager.active_permissions.stats()["empty_users"] == 0
+    assert database.reads == 1
+
+
+def test_changes_are_applied_without_reloading():
+    """Grants and revocations update loaded users and the room index in place."""
+    database = _database_with_permissions()
+    permission_manager = PermissionManager(database)
+    permission_manager.get_user_permissions("2")
+    assert [p.user_id for p in permission_manager.get_room_permissions("lab")] == ["2", "3"]
+    reads = database.reads
+
+    permission_manager.revoke_permission("2", "lab")
+    permission_manager.create_permission("2", "garage", SLOTS)
+    permission_manager.create_permission("4", "lab", SLOTS)
+
+    assert {p.room_id for p in permission_manager.get_user_permissions("2")} == {"office", "garage"}
+    assert [p.user_id for p in permission_manager.get_room_permissions("lab")] == ["3", "4"]
+    assert permission_manager.get_user_permissions("4")[0].room_id == "lab"
+    assert database.reads == reads
+    assert permission_manager.active_permissions.complete
+    assert permission_manager.active_permissions.stats()["misses"] == 1
+
+
+def test_users_whose_last_permission_is_revoked_are_not_counted():
+    """Revoking a user's last permission moves the user to the empty set."""
+    database = _database_with_permissions()
+    permission_manager = PermissionManager(database)
+    assert [p.room_id for p in permission_manager.get_user_permissions("3")] == ["lab"]
+    users = permission_manager.active_permissions.stats()["users"]
+
+    permission_manager.revoke_permission("3", "lab")
+    stats = permission_manager.active_permissions.stats()
+    assert stats["users"] == users - 1 and stats["empty_users"] == 1
+    assert "3" not in permission_manager.active_permissions.by_user
+    reads = database.reads
+    assert permission_manager.get_user_permissions("3") == []
+    assert database.reads == reads
+
+
+def test_health_reports_cache_counters():
+    """The health check exposes the permission and card cache counters."""
+    with TestClient(app) as client:
+        caches = client.get("/health").json()["caches"]
+    assert {"users", "hits", "misses"} <= set(caches["active_permissions"])
+    assert {"entries", "bytes", "hits", "misses"} <= set(caches["cards"])
@@ -0,0 +1,82 @@
+"""Tests for the permission change journal and its snapshots."""
+
+from datetime import datetime, timedelta
+import random
+
+from app.models import PermissionChange
+from app.services.permission_journal import PermissionJournal, RoomAccessTimeline
+
+
+START = datetime(2026, 1, 1)
+
+
+def _change(minute, action, user_id, room_id="r"):
+    return PermissionChange(
+        timestamp=START + timedelta(minutes=minute),
+        action=action,
+        user_id=user_id,
+        room_id=room_id,
+        time_slots=[]
+    )
+
+
+def test_snapshots_answer_like_a_full_replay():
+    """users_at matches replaying every event, across many snapshots."""
+    rng = random.Random(7)
+    timeline = RoomAccessTimeline()
+    events = []
+    for minute in range(2000):
+        user_id = f"user{rng.randrange(50)}"
+        has_access = rng.random() < 0.6
+        timeline.record(START + timedelta(minutes=minute), user_id, has_access)
+        events.append((minute, user_id, has_access))
+
+    assert len(timeline.snapshots) >= 2000 // (2 * RoomAccessTimeline.MIN_SNAPSHOT_INTERVAL)
+    for minute in [-1, 0, 63, 64, 65, 500, 1234, 1999, 5000]:
+        expected = set()
+        for event_minute, user_id, has_access in events:
+            if event_minute > minute:
+                break
+            if has_access:
+                expected.add(user_id)
+            else:
+                expected.discard(user_id)
+        assert timeline.users_at(START + timedelta(minutes=minute)) == expected
+
+
+def test_changes_for_user_within_range():
+    """A user's changes are returned oldest first, limited to the date range."""
+    journal = PermissionJournal()
+    for minute, action, user_id in [(0, "granted", "a"), (1, "granted", "b"), (2, "updated", "a"),
+                                    (3, "revoked", "a"), (4, "granted", "a")]:
+        journal.append(_change(minute, action, user_id))
+
+    actions = [change.action for change in journal.changes_for_user("a")]
+    assert actions == ["granted", "updated", "revoked", "granted"]
+    ranged = journal.changes_for_user("a", START + timedelta(minutes=1), START + timedelta(minutes=3))
+    assert [change.action for change in ranged] == ["updated", "revoked"]
+    assert [change.change_id for change in journal.changes] == [1, 2, 3, 4, 5]
+
+
+def test_users_with_access_at_a_point_in_time():
+    """Revocations and later grants are reflected per room."""
+    journal = PermissionJournal()
+    journal.append(_change(0, "granted", "a"))
+    journal.append(_change(1, "granted", "b"))
+    journal.append(_change(2, "granted", "c", room_id="other"))
+    journal.append(_change(3, "revoked", "a"))
+
+    assert journal.users_with_access("r", START + timedelta(minutes=2)) == ["a", "b"]
+    assert journal.users_with_access("r", START + timedelta(minutes=3)) == ["b"]
+    assert journal.users_with_access("r", START - timedelta(minutes=1)) == []
+    assert journal.users_with_access("missing", START) == []
+
+
+def test_out_of_order_changes_keep_the_journal_ordered():
+    """A change with an earlier timestamp is moved to the journal's latest time."""
+    journal = PermissionJournal()
+    journal.append(_change(5, "granted", "a"))
+    journal.append(_change(1, "revoked", "a"))
+
+    assert journal.changes[1].timestamp == START + timedelta(minutes=5)
+    assert journal.users_with_access("r", START + timedelta(minutes=5)) == []
@@ -0,0 +1,157 @@
+"""Tests for background report jobs and their result cache."""
+
+from datetime import datetime
+import asyncio
+import threading
+
+from app.models import AccessLog, ReportJobStatus, ReportRequest, ReportType
+from app.services import Database, GatewayCommService, PermissionManager, ReportGenerator, ReportJobQueue
+
+
+class CountingGenerator(ReportGenerator):
+    """Report generator counting how often reports are generated."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.calls = 0
+
+    def generate(self, report_type, parameters):
+        self.calls += 1
+        return super().generate(report_type, parameters)
+
+
+def _request(report_type=ReportType.ACCESS_SUMMARY, **parameters):
+    return ReportRequest(report_type=report_type, title="Report", parameters=parameters)
+
+
+async def _wait(job):
+    async with asyncio.timeout(5):
+        while job.status in (ReportJobStatus.PENDING, ReportJobStatus.RUNNING):
+            await asyncio.sleep(0.01)
+    return job
+
+
+class BlockingGenerator(CountingGenerator):
+    """Report generator waiting for a signal before generating."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.release = threading.Event()
+
+    def generate(self, report_type, parameters):
+        self.release.wait(5)
+        return super().generate(report_type, parameters)
+
+
+def _run(scenario, generator_class=CountingGenerator, max_jobs=1000):
+    """Run a scenario with a fresh database and report queue."""
+    async def run():
+        database = Database()
+        generator = generator_class(database, GatewayCommService())
+        queue = ReportJobQueue(generator, max_workers=2, max_jobs=max_jobs)
+        try:
+            return await scenario(database, generator, queue)
+        finally:
+            queue.shutdown()
+    return asyncio.run(run())
+
+
+def test_identical_requests_share_one_computation():
+    """Concurrent identical requests are answered by a single generation."""
+    async def scenario(database, generator, queue):
+        jobs = [queue.submit(_request(), "1") for _ in range(5)]
+        for job in jobs:
+            await _wait(job)
+        return generator, jobs
+
+    generator, jobs = _run(scenario)
+    assert generator.calls == 1
+    assert {job.status for job in jobs} == {ReportJobStatus.COMPLETED}
+    assert len({job.job_id for job in jobs}) == 5
+    assert all(job.report.report_id == job.job_id for job in jobs)
+
+
+def test_cache_is_invalidated_by_new_access_logs():
+    """Cached reports are served until the access logs change."""
+    async def scenario(database, generator, queue):
+        first = await _wait(queue.submit(_request(), "1"))
+        cached = queue.submit(_request(), "1")
+        other_parameters = await _wait(queue.submit(_request(start_date="2026-01-01T00:00:00"), "1"))
+        database.save_access_log(AccessLog(timestamp=datetime.now(), user_id="u", room_id="r"))
+        refreshed = await _wait(queue.submit(_request(), "1"))
+        return generator, first, cached, other_parameters, refreshed
+
+    generator, first, cached, other_parameters, refreshed = _run(scenario)
+    assert cached.cached and cached.status == ReportJobStatus.COMPLETED
+    assert not other_parameters.cached
+    assert not refreshed.cached
+    assert generator.calls == 3
+    assert first.report.data["summary"]["total_accesses"] == 0
+    assert refreshed.report.data["summary"]["total_accesses"] == 1
+
+
+def test_permission_audit_is_invalidated_by_user_changes():
+    """Editing a user regenerates the audit that lists the user's name."""
+    async def scenario(database, generator, queue):
+        PermissionManager(database).create_permission("2", "r", [])
+        request = _request(ReportType.PERMISSION_AUDIT)
+        await _wait(queue.submit(request, "1"))
+        cached = queue.submit(request, "1")
+        user = database.get_user_by_id("2")
+        user.full_name = "Alice Renamed"
+        database.save_user(user)
+        refreshed = await _wait(queue.submit(request, "1"))
+        return cached, refreshed
+
+    cached, refreshed = _run(scenario)
+    assert cached.cached
+    assert cached.report.data["audit"]["permissions"][0]["full_name"] == "Alice Johnson"
+    assert not refreshed.cached
+    assert refreshed.report.data["audit"]["permissions"][0]["full_name"] == "Alice Renamed"
+
+
+def test_failed_generation_is_reported_and_not_cached():
+    """Invalid parameters fail the job with the error; a retry generates again."""
+    async def scenario(database, generator, queue):
+        request = _request(ReportType.SECURITY_INCIDENTS, start_date="not a date")
+        failed = await _wait(queue.submit(request, "1"))
+        retried = await _wait(queue.submit(request, "1"))
+        return generator, failed, retried
+
+    generator, failed, retried = _run(scenario)
+    assert failed.status == ReportJobStatus.FAILED
+    assert "not a date" in failed.error
+    assert retried.status == ReportJobStatus.FAILED
+    assert generator.calls == 2
+
+
+def test_only_finished_jobs_are_forgotten():
+    """Jobs beyond max_jobs are forgotten once finished, the first finished first."""
+    async def scenario(database, generator, queue):
+        jobs = [queue.submit(_request(page=page), "1") for page in range(3)]
+        running = sorted(queue.jobs) == sorted(job.job_id for job in jobs)
+        generator.release.set()
+        for job in jobs:
+            await _wait(job)
+        return jobs, running, list(queue.jobs)
+
+    jobs, running, kept = _run(scenario, BlockingGenerator, max_jobs=2)
+    assert running
+    assert len(kept) == 2
+    assert {job.job_id for job in jobs} > set(kept)
+
+
+def test_room_audits_are_taken_at_the_time_of_the_request():
+    """A room audit without ``at`` is not answered from the cache of an earlier request."""
+    async def scenario(database, generator, queue):
+        PermissionManager(database).create_permission("2", "r", [])
+        first = await _wait(queue.submit(_request(ReportType.PERMISSION_AUDIT, room_id="r"), "1"))
+        await asyncio.sleep(0.01)
+        second = await _wait(queue.submit(_request(ReportType.PERMISSION_AUDIT, room_id="r"), "1"))
+        return generator, first, second
+
+    generator, first, second = _run(scenario)
+    assert not second.cached and generator.calls == 2
+    for job in (first, second):
+        assert job.report.data["audit"]["room_access"]["at"] == job.report.parameters["at"]
+    assert first.report.parameters["at"] < second.report.parameters["at"]
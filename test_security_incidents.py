@@ -0,0 +1,74 @@
+"""Tests for the SECURITY_INCIDENTS report over the persisted access outcome."""
+
+from datetime import datetime, timedelta
+import time
+
+from fastapi.testclient import TestClient
+
+from main import app
+from app.models import AccessLog, ReportType
+from app.services import GatewayCommService, ReportGenerator, SQLiteDatabase
+
+
+START = datetime(2026, 1, 1, 8)
+
+
+def _wait_for_report(client, headers, job):
+    deadline = time.monotonic() + 5
+    while job["status"] not in ("completed", "failed") and time.monotonic() < deadline:
+        time.sleep(0.01)
+        job = client.get(f"/reports/{job['job_id']}", headers=headers).json()
+    return job
+
+
+def test_denied_attempts_logged_through_the_api_are_reported():
+    """access_granted=false entries posted to /access-logs are the report's incidents."""
+    with TestClient(app) as client:
+        token = client.post("/auth/login", json={"username": "admin", "password": "x"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for minute, granted in [(0, True), (1, False), (2, True), (3, False)]:
+            response = client.post("/access-logs/", headers=headers, json={
+                "user_id": "3", "room_id": "vault", "access_granted": granted, "device_id": f"lock{minute}",
+                "timestamp": (START + timedelta(minutes=minute)).isoformat()
+            })
+            assert response.status_code == 200 and response.json()["access_granted"] is granted
+
+        job = client.post("/reports/", headers=headers, json={
+            "report_type": ReportType.SECURITY_INCIDENTS.value, "title": "Incidents",
+            "parameters": {"start_date": START.isoformat(), "end_date": (START + timedelta(hours=1)).isoformat()}
+        }).json()
+        job = _wait_for_report(client, headers, job)
+        assert job["status"] == "completed"
+        incidents = job["report"]["data"]["security_incidents"]
+        assert incidents["total_incidents"] == 2
+        assert [incident["device_id"] for incident in incidents["incidents"]] == ["lock3", "lock1"]
+
+        csv = client.get(f"/reports/{job['job_id']}/export", headers=headers).text.splitlines()
+        assert csv[0] == "log_id,timestamp,user_id,room_id,device_id"
+        assert len(csv) == 3 and csv[1].endswith(",3,vault,lock3")
+
+
+def test_incidents_are_paged_from_persisted_outcomes(tmp_path):
+    """The SQLite backend keeps the outcome, and incident pages follow the denied index."""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    database = SQLiteDatabase(url, pool_size=2)
+    database.save_access_logs([
+        AccessLog(log_id=f"l{minute}", timestamp=START + timedelta(minutes=minute),
+                  user_id="3", room_id="vault", access_granted=minute % 3 != 0)
+        for minute in range(10)
+    ])
+    database.close()
+
+    database = SQLiteDatabase(url, pool_size=2)
+    try:
+        generator = ReportGenerator(database, GatewayCommService())
+        pages = [
+            generator.generate(ReportType.SECURITY_INCIDENTS, {"page": page, "page_size": 3})["security_incidents"]
+            for page in (1, 2)
+        ]
+    finally:
+        database.close()
+
+    assert [page["total_incidents"] for page in pages] == [4, 4]
+    assert [incident["log_id"] for incident in pages[0]["incidents"]] == ["l9", "l6", "l3"]
+    assert [incident["log_id"] for incident in pages[1]["incidents"]] == ["l0"]
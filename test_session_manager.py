@@ -0,0 +1,67 @@
+"""Tests for session expiry through the expiry heap."""
+
+from datetime import datetime, timedelta
+import asyncio
+
+from app.core.config import settings
+from app.models import Credentials
+from app.services import Database, SessionManager
+
+
+def _create_sessions(session_manager, count, username="alice"):
+    async def create():
+        return [await session_manager.create_session(Credentials(username=username, password="x"))
+                for _ in range(count)]
+    return asyncio.run(create())
+
+
+def test_cleanup_expires_oldest_sessions_first(monkeypatch):
+    """Expired sessions are removed in expiry order, at most ``limit`` per call."""
+    session_manager = SessionManager(Database())
+    monkeypatch.setattr(settings, "access_token_expire_minutes", -1)
+    expired = _create_sessions(session_manager, 5)
+    monkeypatch.setattr(settings, "access_token_expire_minutes", 30)
+    live = _create_sessions(session_manager, 2, username="bob")
+
+    assert session_manager.cleanup_expired_sessions(limit=2) == 2
+    remaining = {session.session_id for session in expired} & set(session_manager.active_sessions)
+    oldest_first = sorted(expired, key=lambda session: session.expires_at)
+    assert remaining == {session.session_id for session in oldest_first[2:]}
+
+    assert session_manager.cleanup_expired_sessions() == 3
+    assert set(session_manager.active_sessions) == {session.session_id for session in live}
+    assert session_manager.user_sessions == {"3": {session.session_id for session in live}}
+    assert session_manager.cleanup_expired_sessions() == 0
+
+
+def test_refreshed_and_invalidated_sessions_are_skipped(monkeypatch):
+    """Stale heap entries of refreshed or logged out sessions do not expire them again."""
+    session_manager = SessionManager(Database())
+    monkeypatch.setattr(settings, "access_token_expire_minutes", -1)
+    refreshed, logged_out, expired = _create_sessions(session_manager, 3)
+
+    # As after a refresh: the heap entry of the old expiry time is stale
+    refreshed.expires_at = datetime.now() + timedelta(hours=1)
+    session_manager.invalidate_session(logged_out.session_id)
+
+    assert session_manager.cleanup_expired_sessions() == 1
+    assert expired.session_id not in session_manager.active_sessions
+    assert set(session_manager.active_sessions) == {refreshed.session_id}
+    assert session_manager.get_user_sessions("2") == [refreshed]
+
+
+def test_stale_heap_entries_are_compacted():
+    """The heap is rebuilt once stale entries outnumber the live sessions."""
+    session_manager = SessionManager(Database())
+    sessions = _create_sessions(session_manager, 10)
+    for _ in range(110):
+        for session in sessions:
+            assert session_manager.refresh_session(session.session_id) is session
+    assert len(session_manager._expiry_heap) == 10 * 111
+
+    assert session_manager.cleanup_expired_sessions() == 0
+    assert sorted(session_manager._expiry_heap) == sorted(
+        (session.expires_at, session.session_id) for session in sessions
+    )
+    assert session_manager.invalidate_user_sessions("2") == 10
+    assert session_manager.active_sessions == {} and session_manager.user_sessions == {}
@@ -0,0 +1,300 @@
+"""Tests for the durable SQLite Database backend."""
+
+from datetime import datetime, timedelta
+import random
+import sqlite3
+
+import pytest
+
+from app.models import AccessLog, Permission, PermissionChange, ReportType, TimeSlot
+from app.services import GatewayCommService, PermissionManager, ReportGenerator, SQLiteDatabase
+from app.services.permission_journal import PermissionJournal
+
+
+START = datetime(2026, 1, 1, 8)
+
+
+def _open(tmp_path):
+    return SQLiteDatabase(f"sqlite:///{tmp_path / 'test.db'}", pool_size=2)
+
+
+def test_data_survives_reopening(tmp_path):
+    """Users, permissions, access logs and rollups are read back after a restart."""
+    database = _open(tmp_path)
+    database.save_permission(Permission(
+        permission_id="p1", user_id="2", room_id="lab",
+        time_slots=[TimeSlot(start_time="08:00", end_time="17:00", day_of_week="monday")]
+    ))
+    database.save_access_logs([
+        AccessLog(timestamp=START, user_id="2", room_id="lab"),
+        AccessLog(timestamp=START + timedelta(hours=2), user_id="2", room_id="lab", access_granted=False),
+    ])
+    database.close()
+
+    database = _open(tmp_path)
+    try:
+        assert sorted(user.username for user in database.get_all_users()) == ["admin", "alice", "bob"]
+        assert database.get_user_by_login("ALICE@th-owl.de").user_id == "2"
+        permission = database.get_permission("2", "lab")
+        assert permission.permission_id == "p1"
+        assert permission.time_slots[0].day_of_week == "monday"
+        assert len(database.get_access_logs()) == 2
+        assert database.get_access_counts() == ({"lab": 2}, {"2": 2})
+        denied, total = database.get_denied_access_logs()
+        assert total == 1 and denied[0].timestamp == START + timedelta(hours=2)
+    finally:
+        database.close()
+
+
+def test_saving_a_permission_replaces_the_one_for_the_same_room(tmp_path):
+    """A user holds at most one permission per room."""
+    database = _open(tmp_path)
+    try:
+        database.save_permission(Permission(permission_id="p1", user_id="2", room_id="lab", time_slots=[]))
+        database.save_permission(Permission(permission_id="p2", user_id="2", room_id="lab", time_slots=[]))
+        assert [p.permission_id for p in database.get_permissions("2")] == ["p2"]
+        database.delete_permission("2", "lab")
+        assert database.get_permission("2", "lab") is None
+    finally:
+        database.close()
+
+
+def test_databases_without_newer_columns_are_migrated(tmp_path):
+    """Opening a database of an older schema adds the missing columns and indexes."""
+    path = tmp_path / "test.db"
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE users (
+            user_id TEXT PRIMARY KEY, email TEXT NOT NULL, full_name TEXT NOT NULL,
+            role TEXT NOT NULL, is_active INTEGER NOT NULL, created_at TEXT
+        );
+        CREATE TABLE access_logs (
+            log_id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, user_id TEXT NOT NULL, room_id TEXT NOT NULL
+        );
+        INSERT INTO users VALUES ('7', 'old@th-owl.de', 'Old User', 'student', 1, NULL);
+        INSERT INTO access_logs VALUES ('l1', '2026-01-01T08:30:00.000000', '7', 'lab');
+    """)
+    connection.commit()
+    connection.close()
+
+    database = _open(tmp_path)
+    try:
+        with database.pool.connection() as connection:
+            user_columns = {row["name"] for row in connection.execute("PRAGMA table_info(users)")}
+            log_columns = {row["name"] for row in connection.execute("PRAGMA table_info(access_logs)")}
+            indexes = {row["name"] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "username" in user_columns
+        assert {"access_granted", "device_id"} <= log_columns
+        assert {"idx_users_username", "idx_users_email", "idx_access_logs_denied"} <= indexes
+
+        # Existing rows are kept and read with the column defaults
+        assert database.get_user_by_login("old@th-owl.de").full_name == "Old User"
+        assert database.get_user_by_id("1") is None  # not empty, so no sample data
+        log = database.get_access_logs()[0]
+        assert log.access_granted and log.device_id is None
+        assert database.get_access_counts()[1] == {"7": 1}
+    finally:
+        database.close()
+
+
+def test_keyset_chunks_return_every_log_once(tmp_path):
+    """Chunks split runs of equal timestamps without skipping or repeating logs."""
+    database = _open(tmp_path)
+    try:
+        logs = [
+            AccessLog(log_id=f"l{i}", timestamp=START + timedelta(minutes=i // 4), user_id=f"u{i % 2}", room_id="lab")
+            for i in range(23)
+        ]
+        database.save_access_logs(logs[::-1])
+
+        chunks = list(database.iter_access_logs(chunk_size=3))
+        assert [len(chunk) for chunk in chunks] == [3] * 7 + [2]
+        exported = [log for chunk in chunks for log in chunk]
+        assert sorted(log.log_id for log in exported) == sorted(log.log_id for log in logs)
+        assert [log.timestamp for log in exported] == sorted(log.timestamp for log in logs)
+
+        filtered = [
+            log.log_id
+            for chunk in database.iter_access_logs(
+                user_id="u1", start_date=START + timedelta(minutes=1), end_date=START + timedelta(minutes=3), chunk_size=2
+            )
+            for log in chunk
+        ]
+        assert sorted(filtered) == sorted(
+            log.log_id for log in logs if log.user_id == "u1" and 1 <= (log.timestamp - START).seconds // 60 <= 3
+        )
+    finally:
+        database.close()
+
+
+def test_journal_queries_match_the_in_memory_journal_across_restarts(tmp_path):
+    """Two processes appending to one journal answer like a full replay, before and after reopening."""
+    rng = random.Random(3)
+    first, second = _open(tmp_path), _open(tmp_path)
+    expected = PermissionJournal()
+    try:
+        for minute in range(400):
+            change = dict(
+                timestamp=START + timedelta(minutes=minute),
+                action=rng.choice(["granted", "updated", "revoked"]),
+                user_id=f"u{rng.randrange(12)}",
+                room_id=rng.choice(["lab", "office"]),
+                time_slots=[]
+            )
+            rng.choice([first, second]).save_permission_change(PermissionChange(**change))
+            expected.append(PermissionChange(**change))
+    finally:
+        first.close()
+        second.close()
+
+    database = _open(tmp_path)
+    try:
+        with database.pool.connection() as connection:
+            assert connection.execute("SELECT COUNT(*) FROM permission_snapshots").fetchone()[0] >= 4
+        # Only the changes after each room's newest snapshot were replayed
+        assert all(pending < 64 for pending in database._room_pending.values())
+        assert database.get_permission_version() == 400
+
+        for minute in [-1, 0, 63, 64, 200, 399, 1000]:
+            at = START + timedelta(minutes=minute)
+            for room_id in ["lab", "office", "missing"]:
+                assert database.get_users_with_access(room_id, at) == expected.users_with_access(room_id, at)
+        changes = database.get_permission_changes("u1", START + timedelta(minutes=100), START + timedelta(minutes=200))
+        assert [c.timestamp for c in changes] == [
+            c.timestamp for c in expected.changes_for_user("u1", START + timedelta(minutes=100), START + timedelta(minutes=200))
+        ]
+
+        # A change with an earlier timestamp is moved to the journal's latest time
+        database.save_permission_change(PermissionChange(
+            timestamp=START, action="revoked", user_id="u1", room_id="lab", time_slots=[]
+        ))
+        assert "u1" not in database.get_users_with_access("lab", START + timedelta(minutes=399))
+    finally:
+        database.close()
+
+
+def test_permission_versions_survive_restarts(tmp_path):
+    """Versions continue from the journal after a restart and old deltas need a full sync."""
+    slots = [TimeSlot(start_time="08:00", end_time="17:00", day_of_week="monday")]
+    database = _open(tmp_path)
+    permission_manager = PermissionManager(database)
+    permission_manager.create_permission("2", "lab", slots)
+    permission_manager.create_permission("3", "lab", slots)
+    permission_manager.create_permission("2", "office", slots)
+    permission_manager.revoke_permission("3", "garage")  # held no permission, so nothing changed
+    assert permission_manager.permission_version == 3
+    database.close()
+
+    database = _open(tmp_path)
+    try:
+        permission_manager = PermissionManager(database)
+        assert permission_manager.permission_version == 3
+        assert permission_manager.get_user_version("2") == 3
+        assert permission_manager.get_user_version("3") == 2
+        assert permission_manager.get_card_changes(["lab"], 1) is None
+        assert permission_manager.get_card_changes(["lab"], 3) == ({}, set())
+
+        permission_manager.revoke_permission("3", "lab")
+        assert permission_manager.permission_version == 4
+        assert permission_manager.get_card_changes(["lab"], 3) == ({}, {"3"})
+    finally:
+        database.close()
+
+
+def test_changes_of_other_workers_invalidate_the_caches(tmp_path):
+    """A permission revoked in one worker is denied by another that already cached it."""
+    slots = [TimeSlot(start_time="00:00", end_time="00:00", day_of_week="monday")]
+    monday = datetime(2026, 1, 5, 12)
+    first, second = _open(tmp_path), _open(tmp_path)
+    try:
+        writer, reader = PermissionManager(first), PermissionManager(second)
+        writer.create_permission("2", "lab", slots)
+        assert reader.check_access("2", "lab", monday)
+        assert [p.room_id for p in reader.get_room_permissions("lab")] == ["lab"]
+        card = reader.generate_card_data("2")
+
+        writer.revoke_permission("2", "lab")
+        assert not reader.check_access("2", "lab", monday)
+        assert reader.get_user_permissions("2") == []
+        assert reader.get_room_permissions("lab") == []
+        assert reader.generate_card_data("2") != card
+        assert reader.permission_version == writer.permission_version == 2
+
+        # A local change is applied after the earlier changes of other workers
+        writer.create_permission("2", "office", slots)
+        reader.create_permission("3", "lab", slots)
+        assert reader.permission_version == 4
+        assert {p.room_id for p in reader.get_user_permissions("2")} == {"office"}
+        assert reader.check_access_batch([("2", "office", monday), ("3", "lab", monday)]) == [True, True]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_access_counts_include_the_logs_of_other_workers(tmp_path):
+    """Summaries count the logs saved by another worker, with exact partial hours."""
+    first, second = _open(tmp_path), _open(tmp_path)
+    try:
+        first.save_access_log(AccessLog(timestamp=START, user_id="2", room_id="lab"))
+        assert first.get_access_counts() == ({"lab": 1}, {"2": 1})
+
+        second.save_access_logs([
+            AccessLog(timestamp=START + timedelta(minutes=minute), user_id="3", room_id="lab")
+            for minute in range(5, 120, 5)
+        ])
+        assert first.get_access_counts() == ({"lab": 24}, {"2": 1, "3": 23})
+        start_date, end_date = START + timedelta(minutes=50), START + timedelta(hours=1, minutes=5)
+        assert first.get_access_counts(start_date, end_date) == ({"lab": 4}, {"3": 4})
+        assert first.get_access_counts(START + timedelta(minutes=50)) == ({"lab": 14}, {"3": 14})
+        assert first.get_access_counts(end_date=START + timedelta(minutes=7)) == ({"lab": 2}, {"2": 1, "3": 1})
+    finally:
+        first.close()
+        second.close()
+
+
+def test_report_data_versions_change_with_writes_of_other_workers(tmp_path):
+    """Cached reports of one worker are invalidated by the writes of another."""
+    first, second = _open(tmp_path), _open(tmp_path)
+    try:
+        generator = ReportGenerator(first, GatewayCommService())
+        incidents = generator.data_version(ReportType.SECURITY_INCIDENTS)
+        audit = generator.data_version(ReportType.PERMISSION_AUDIT)
+
+        second.save_access_log(AccessLog(timestamp=START, user_id="2", room_id="lab", access_granted=False))
+        assert generator.data_version(ReportType.SECURITY_INCIDENTS) != incidents
+
+        user = second.get_user_by_id("2")
+        user.full_name = "Alice Renamed"
+        second.save_user(user)
+        assert generator.data_version(ReportType.PERMISSION_AUDIT) != audit
+        audit = generator.data_version(ReportType.PERMISSION_AUDIT)
+        PermissionManager(second).create_permission("2", "lab", [])
+        assert generator.data_version(ReportType.PERMISSION_AUDIT) != audit
+    finally:
+        first.close()
+        second.close()
+
+
+def test_permissions_and_the_journal_are_written_together(tmp_path):
+    """A permission change whose journal entry fails is not saved either."""
+    slots = [TimeSlot(start_time="08:00", end_time="17:00", day_of_week="monday")]
+    database = _open(tmp_path)
+    try:
+        manager = PermissionManager(database)
+        manager.create_permission("2", "lab", slots)
+        with database.pool.connection() as connection, connection:
+            connection.execute("""
+                CREATE TRIGGER journal_full BEFORE INSERT ON permission_changes
+                BEGIN SELECT RAISE(ABORT, 'journal full'); END
+            """)
+
+        with pytest.raises(sqlite3.IntegrityError):
+            manager.create_permission("2", "office", slots)
+        with pytest.raises(sqlite3.IntegrityError):
+            manager.revoke_permission("2", "lab")
+
+        assert [p.room_id for p in database.get_permissions("2")] == ["lab"]
+        assert database.get_permission_version() == 1
+        assert database.get_users_with_access("lab", datetime.now()) == ["2"]
+    finally:
+        database.close()
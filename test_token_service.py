@@ -0,0 +1,84 @@
+"""Tests for signed access tokens and their revocation."""
+
+from datetime import datetime, timedelta
+import time
+
+import pytest
+
+from app.models import Session
+from app.services import Database, SQLiteDatabase
+from app.services.token_service import TokenService
+
+
+def _session(expires_in=timedelta(minutes=30)):
+    now = datetime.now()
+    return Session(session_id="s1", user_id="2", created_at=now, expires_at=now + expires_in)
+
+
+def test_tokens_rebuild_their_session():
+    """A valid token verifies to the session it was issued for."""
+    tokens = TokenService("secret", Database())
+    session = _session()
+    verified = tokens.verify(tokens.issue(session))
+
+    assert (verified.session_id, verified.user_id) == ("s1", "2")
+    assert verified.expires_at == session.expires_at.replace(microsecond=0)
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: token[:-2] + ("AA" if token[-2:] != "AA" else "BB"),  # signature
+    lambda token: token.replace(token.split(".")[1], token.split(".")[1][:-1] + "x"),  # payload
+    lambda token: "eyJhbGciOiJub25lIn0." + token.split(".", 1)[1],  # header
+    lambda token: token[:-1] + "ä",  # non-ASCII signature
+    lambda token: token.split(".", 1)[1],  # missing part
+    lambda token: "",
+])
+def test_tampered_tokens_are_rejected(tamper):
+    """Any change to a token invalidates its signature."""
+    tokens = TokenService("secret", Database())
+    assert tokens.verify(tamper(tokens.issue(_session()))) is None
+
+
+def test_tokens_of_another_key_or_expired_are_rejected():
+    """Tokens signed with another key or past their expiry are invalid."""
+    database = Database()
+    session = _session()
+    assert TokenService("other", database).verify(TokenService("secret", database).issue(session)) is None
+
+    tokens = TokenService("secret", database)
+    assert tokens.verify(tokens.issue(_session(expires_in=timedelta(seconds=-1)))) is None
+
+
+def test_revocations_are_shared_by_workers_using_one_database_file(tmp_path):
+    """A token revoked by one worker is rejected by another one."""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    first, second = SQLiteDatabase(url, pool_size=1), SQLiteDatabase(url, pool_size=1)
+    try:
+        worker_a, worker_b = TokenService("secret", first), TokenService("secret", second)
+        token, other = worker_a.issue(_session()), worker_a.issue(_session())
+        assert worker_b.verify(token) is not None
+
+        worker_a.revoke(worker_a.decode(token))
+        assert worker_b.verify(token) is None
+        assert worker_b.verify(other) is not None
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_expired_revocations_are_dropped(backend, tmp_path):
+    """Revocations are kept only until the revoked tokens expire."""
+    if backend == "sqlite":
+        database = SQLiteDatabase(f"sqlite:///{tmp_path / 'test.db'}", pool_size=1)
+    else:
+        database = Database()
+    try:
+        database.save_token_revocation("expired", time.time() - 1)
+        database.save_token_revocation("live", time.time() + 60)
+        database.save_token_revocation("next", time.time() + 60)
+
+        assert not database.is_token_revoked("expired")
+        assert database.is_token_revoked("live") and database.is_token_revoked("next")
+    finally:
+        database.close()